@@ -1,16 +1,25 @@
 # 1. Importing necessary libraries:
-import numpy as np
 import cv2
 import os
 import time
 
 # 2. Importing custom utility functions for gaze tracking and UI handling:
-from ad_tracking.calibrate import estimate_distance
+from gaze_tracking.pipeline import GazePipeline
+from ad_tracking.gaze_filter import DEFAULT_FILTER, make_gaze_filter
+from ad_tracking.heatmap import GazeLog, IncrementalHeatmap, blend_heatmap, build_heatmap
+from ad_tracking.mapping import GazeMapper
+from ad_tracking.thumbnails import ThumbnailCache
+from ad_tracking.ad_images import get_ad_cache
+from ad_tracking.video_ad import PresentationClock, VideoAdReader, is_video, VIDEO_EXTENSIONS
+from utils.camera_utils import get_camera
 from utils.ui_utils import (
     get_screen_resolution,
     draw_exit_and_home,
     detect_button_click,
     init_fullscreen_window,
+    show_message_screen,
+    Screen,
+    IDLE_WAIT_MS,
     WINDOW_NAME
 )
 
@@ -22,137 +31,338 @@ from utils.ui_utils import (
 def resize_to_fullscreen(img, screen_width, screen_height):
     return cv2.resize(img, (screen_width, screen_height), interpolation=cv2.INTER_LINEAR)
 
-# 3.2 - A function to map gaze position (from tracker) to screen/pixel coordinates using the transformation matrix
-#       from the calibration phase:
-def map_gaze_to_screen(gaze_tracking, screen_width, screen_height, transformation_matrix, distance_factor):
-    horizontal_ratio = gaze_tracking.horizontal_ratio()
-    vertical_ratio = gaze_tracking.vertical_ratio()
-    
-    # 3.2.1 - If gaze ratios are valid, apply perspective transform to map them to screen coordinates:
-    if horizontal_ratio is not None and vertical_ratio is not None:
-        gaze_point = np.array([[horizontal_ratio, vertical_ratio]], dtype=np.float32).reshape(-1, 1, 2)
-        screen_point = cv2.perspectiveTransform(gaze_point, transformation_matrix).reshape(-1, 2)[0]
-        screen_x = int(screen_point[0] * screen_width * distance_factor)
-        screen_y = int(screen_point[1] * screen_height * distance_factor)
-        return screen_x, screen_y
-        
-    # 3.2.2 - If gaze tracking fails, return None:
-    return None, None
-
-# 3.3 - A function for creating a blank heatmap (initializing the heatmap):
-def create_heatmap(screen_height, screen_width):
-    return np.zeros((screen_height, screen_width), dtype=np.float32)
-
-# 3.4 - A function for displaying an ad image and tracking gaze points to generate a heatmap:
-def show_ad(ad_path, gaze_tracking, screen_width, screen_height, transformation_matrix, avg_distance, duration=10, window_name="Gaze Tracker"):
-    ad_img = cv2.imread(ad_path) # 3.4.1 - Loading ad image from file.
-    ad_img = resize_to_fullscreen(ad_img, screen_width, screen_height)
-    heatmap = create_heatmap(screen_height, screen_width)
-
-    # 3.4.2 - Starting webcam:
-    webcam = cv2.VideoCapture(0)
+# 3.2 - Gaze positions are mapped to screen/pixel coordinates with a GazeMapper built from the transformation matrix
+#       of the calibration phase (see mapping.py).
+
+# 3.3 - Heatmaps are built at reduced resolution from the recorded gaze points, at the end of a session or live
+#       while it plays (see heatmap.py).
+
+# 3.4 - A function for displaying an ad image and tracking gaze points to generate a heatmap (video ads are played
+#       by show_video_ad). With workers > 0, frames are captured and analyzed in a pipeline (see show_ad_pipelined).
+#       Gaze points are recorded in gaze_log (a new GazeLog if None) and the heatmap is built from it at the end.
+#       With live_overlay=True the heatmap is blended over the ad while it plays, refreshed a few times a second.
+#       Gaze points are smoothed by gaze_filter (a name or filter object, see gaze_filter.py) at their capture time.
+#       With a fixation_log (a fixations.FixationLog), fixations are detected while the ad plays, and the heatmap and
+#       live overlay are built from them instead of every raw point (gaze_log still records the raw points).
+#       With a ratio_log (a mapping.RatioLog), every tracker sample is also recorded before mapping, so the session can
+#       be mapped again after a recalibration.
+def show_ad(ad_path, gaze_tracking, screen_width, screen_height, transformation_matrix, avg_distance, duration=10, window_name="Gaze Tracker", workers=0, gaze_log=None, live_overlay=False, gaze_filter=DEFAULT_FILTER, fixation_log=None, ratio_log=None):
+    if gaze_log is None:
+        gaze_log = GazeLog()
+    if is_video(ad_path):
+        return show_video_ad(ad_path, gaze_tracking, screen_width, screen_height, transformation_matrix,
+                             avg_distance, window_name=window_name, workers=max(workers, 1), gaze_log=gaze_log,
+                             live_overlay=live_overlay, gaze_filter=gaze_filter, fixation_log=fixation_log,
+                             ratio_log=ratio_log)
+    if workers > 0:
+        return show_ad_pipelined(ad_path, gaze_tracking, screen_width, screen_height, transformation_matrix,
+                                 avg_distance, duration, window_name, workers, gaze_log, live_overlay, gaze_filter,
+                                 fixation_log, ratio_log)
+
+    ad_img = get_ad_cache().get(ad_path, screen_width, screen_height) # 3.4.1 - Loading ad image (decoded once, cached).
+    mapper = GazeMapper(transformation_matrix, avg_distance, screen_width, screen_height)
+    gaze_filter = make_gaze_filter(gaze_filter)
+    live_heatmap = IncrementalHeatmap(screen_width, screen_height, density=fixation_log is not None) if live_overlay else None
+
+    # 3.4.2 - Getting the shared webcam (already open and warmed up):
+    webcam = get_camera()
     init_fullscreen_window()
 
-    start_time = time.time()
+    start_time = gaze_log.onset = time.time()
 
      # 3.4.3 - Displaying the ad for a fixed duration:
     while time.time() - start_time < duration:
-        ret, frame = webcam.read()
+        ret, timestamp, frame = webcam.read_stamped()
         if not ret:
             break
 
-        # 3.4.4 - Updating gaze tracking with new frame:
-        gaze_tracking.refresh(frame)
+        # 3.4.4 - Updating gaze tracking with new frame, at its capture time:
+        gaze_tracking.refresh(frame, timestamp)
+        if ratio_log is not None:
+            ratio_log.append(gaze_tracking.sample, timestamp - start_time)
 
-        # 3.4.5 - Estimating user's distance from screen:
-        distance = estimate_distance(gaze_tracking)
-        if distance is not None:
-            distance_factor = avg_distance / distance
-            screen_x, screen_y = map_gaze_to_screen(
-                gaze_tracking, screen_width, screen_height, transformation_matrix, distance_factor)
+        # 3.4.5 - Mapping the gaze to the screen, scaled by the user's distance from it, then smoothing it:
+        screen_x, screen_y = mapper.map_sample(gaze_tracking.sample)
+        if screen_x is not None:
+            screen_x, screen_y = gaze_filter.update(screen_x, screen_y, timestamp)
 
-            # 3.4.6 - If the mapped point is valid and on-screen, update the heatmap:
-            if screen_x is not None and screen_y is not None:
-                if 0 <= screen_x < screen_width and 0 <= screen_y < screen_height:
-                    cv2.circle(heatmap, (screen_x, screen_y), 50, 1, -1)
+        # 3.4.6 - If the mapped point is valid and on-screen, record it:
+        add_gaze_point(gaze_log, screen_x, screen_y, screen_width, screen_height,
+                       gaze_tracking.sample.timestamp, live_heatmap, fixation_log=fixation_log)
 
-        # 3.4.7 - Showing the ad image during tracking:
-        cv2.imshow(window_name, ad_img)
+        # 3.4.7 - Showing the ad image during tracking (with the live heatmap, if enabled):
+        cv2.imshow(window_name, live_heatmap.overlay(ad_img, time.time()) if live_heatmap else ad_img)
 
         # 3.4.8 - ESC key to exit:
         if cv2.waitKey(1) == 27:
             break
 
-    # 3.4.9 - Cleaning up the webcam & Blurring the heatmap for better visualization:
-    webcam.release() 
-    heatmap_blurred = cv2.GaussianBlur(heatmap, (101, 101), 0)
-    return heatmap_blurred
+    # 3.4.9 - Building the (reduced-resolution) heatmap from the recorded points (the shared webcam stays open):
+    return session_heatmap(gaze_log, fixation_log, screen_width, screen_height)
+
+# 3.4.10 - A function for recording one mapped gaze point, if it is valid and on-screen. timestamp is the capture
+#          time of its frame; pts the time into the ad, if not the time since gaze_log.onset. With a fixation_log,
+#          the live heatmap gets the fixations (weighted by their duration) instead of the raw points:
+def add_gaze_point(gaze_log, screen_x, screen_y, screen_width, screen_height, timestamp=0.0, live_heatmap=None, pts=None, fixation_log=None):
+    if screen_x is not None and screen_y is not None:
+        if 0 <= screen_x < screen_width and 0 <= screen_y < screen_height:
+            gaze_log.append(screen_x, screen_y, timestamp, pts=pts)
+            if fixation_log is not None:
+                fixation = fixation_log.add(screen_x, screen_y, timestamp,
+                                            timestamp - gaze_log.onset if pts is None else pts)
+                if fixation is not None and live_heatmap is not None:
+                    live_heatmap.add(fixation[1], fixation[2], fixation[3])
+            elif live_heatmap is not None:
+                live_heatmap.add(screen_x, screen_y)
+
+# 3.4.10.1 - A function for building the heatmap of a session: from its raw gaze points, or from its fixations
+#            (duration-weighted) if they were detected:
+def session_heatmap(gaze_log, fixation_log, screen_width, screen_height):
+    if fixation_log is None:
+        return build_heatmap(gaze_log, screen_width, screen_height)
+    fixation_log.flush()
+    return build_heatmap(fixation_log, screen_width, screen_height, density=True)
+
+# 3.4.11 - Pipelined version of show_ad: a capture thread timestamps webcam frames, a pool of worker processes
+#          runs the gaze tracker on them, and the samples come back in capture order. The display loop only
+#          shows the ad and accumulates the heatmap, so the sample rate is no longer capped by
+#          1 / (capture + analysis + display). If the workers fail to start, the ad is shown by the serial loop.
+def show_ad_pipelined(ad_path, gaze_tracking, screen_width, screen_height, transformation_matrix, avg_distance, duration=10, window_name="Gaze Tracker", workers=2, gaze_log=None, live_overlay=False, gaze_filter=DEFAULT_FILTER, fixation_log=None, ratio_log=None):
+    if gaze_log is None:
+        gaze_log = GazeLog()
+    ad_img = get_ad_cache().get(ad_path, screen_width, screen_height)
+    mapper = GazeMapper(transformation_matrix, avg_distance, screen_width, screen_height)
+    gaze_filter = make_gaze_filter(gaze_filter)
+    live_heatmap = IncrementalHeatmap(screen_width, screen_height, density=fixation_log is not None) if live_overlay else None
+
+    webcam = get_camera()
+    init_fullscreen_window()
+
+    # Workers share the pupil calibration and face detection scale of the main tracker:
+    pipeline = GazePipeline(webcam, calibration=gaze_tracking.calibration, workers=workers,
+                            detection_scale=gaze_tracking.detection_scale)
+    try:
+        pipeline.start()
+    except RuntimeError as error:
+        print(f"{error}, analyzing gaze on the display thread instead.")
+        return show_ad(ad_path, gaze_tracking, screen_width, screen_height, transformation_matrix, avg_distance,
+                       duration, window_name, 0, gaze_log, live_overlay, gaze_filter, fixation_log, ratio_log)
+    start_time = gaze_log.onset = time.time()
+
+    def record(samples):
+        for sample in samples:
+            if ratio_log is not None:
+                ratio_log.append(sample, sample.timestamp - start_time)
+            screen_x, screen_y = mapper.map_sample(sample)
+            if screen_x is not None:
+                screen_x, screen_y = gaze_filter.update(screen_x, screen_y, sample.timestamp)
+            add_gaze_point(gaze_log, screen_x, screen_y, screen_width, screen_height,
+                           sample.timestamp, live_heatmap, fixation_log=fixation_log)
+
+    while time.time() - start_time < duration and pipeline.running:
+        # Accumulating every sample analyzed since the last iteration, in capture order:
+        record(pipeline.samples())
+
+        cv2.imshow(window_name, live_heatmap.overlay(ad_img, time.time()) if live_heatmap else ad_img)
+        if cv2.waitKey(1) == 27:
+            break
+
+    # The frames captured while the ad was on screen but not analyzed yet:
+    record(pipeline.drain())
+    pipeline.stop()
+    return session_heatmap(gaze_log, fixation_log, screen_width, screen_height)
+
+# 3.4.12 - A function for playing a video ad at its native frame rate while tracking gaze. Frames are decoded ahead
+#          on a background thread into a small bounded queue, and gaze is always analyzed by the pipeline's worker
+#          processes, so neither stalls the other. Every gaze point is recorded with its capture time (t) and the
+#          presentation time (pts, in seconds) of the ad frame on screen when its camera frame was captured, so
+#          per-segment heatmaps can be built afterwards with video_ad.segment_heatmaps. duration limits the playback (None for the whole video).
+#          With live_overlay=True the heatmap of the whole session so far is blended over every frame.
+#          Video ads need the workers: if they fail to start, a message is shown and -2 (Home) is returned.
+def show_video_ad(ad_path, gaze_tracking, screen_width, screen_height, transformation_matrix, avg_distance, duration=None, window_name="Gaze Tracker", workers=2, gaze_log=None, live_overlay=False, gaze_filter=DEFAULT_FILTER, fixation_log=None, ratio_log=None):
+    if gaze_log is None:
+        gaze_log = GazeLog()
+    mapper = GazeMapper(transformation_matrix, avg_distance, screen_width, screen_height)
+    gaze_filter = make_gaze_filter(gaze_filter)
+    live_heatmap = IncrementalHeatmap(screen_width, screen_height, density=fixation_log is not None) if live_overlay else None
+    reader = VideoAdReader(ad_path, screen_width, screen_height).start()
+    clock = PresentationClock()
+
+    webcam = get_camera()
+    init_fullscreen_window()
+    pipeline = GazePipeline(webcam, calibration=gaze_tracking.calibration, workers=workers,
+                            detection_scale=gaze_tracking.detection_scale)
+    try:
+        pipeline.start()
+    except RuntimeError as error:
+        reader.stop()
+        print(error)
+        show_message_screen(screen_width, screen_height, ["Gaze tracking could not be started for this video ad.",
+                                                          "", "Press ESC to go back to the menu."], window_name)
+        return -2
+    start_time = gaze_log.onset = time.time()
+
+    # 3.4.12.1 - Recording gaze samples, tagged with the pts of the ad frame on screen when they were captured:
+    def record(samples):
+        for sample in samples:
+            pts = clock.pts_at(sample.timestamp)
+            if pts is not None:
+                if ratio_log is not None:
+                    ratio_log.append(sample, pts)
+                screen_x, screen_y = mapper.map_sample(sample)
+                if screen_x is not None:
+                    screen_x, screen_y = gaze_filter.update(screen_x, screen_y, sample.timestamp)
+                add_gaze_point(gaze_log, screen_x, screen_y, screen_width, screen_height,
+                               sample.timestamp, live_heatmap, pts, fixation_log)
+
+    # 3.4.12.2 - Playing until the last frame has been on screen for a frame period:
+    end = 0.0
+    while pipeline.running:
+        elapsed = time.time() - start_time
+        if duration is not None and elapsed >= duration:
+            break
+        if reader.finished and elapsed >= end:
+            break
+
+        # 3.4.12.3 - Showing the frame that is due, if a new one is (late frames are skipped):
+        due = reader.next_due(elapsed)
+        if due is not None:
+            clock.shown(time.time(), due[0])
+            cv2.imshow(window_name, live_heatmap.overlay(due[1], time.time()) if live_heatmap else due[1])
+            end = max(due[0], elapsed) + 1 / reader.fps
+
+        # 3.4.12.4 - Recording the gaze samples analyzed since the last iteration:
+        record(pipeline.samples())
+
+        if cv2.waitKey(1) == 27:
+            break
+
+    # 3.4.12.5 - Recording the samples of the camera frames still being analyzed:
+    record(pipeline.drain())
+    pipeline.stop()
+    reader.stop()
+    return session_heatmap(gaze_log, fixation_log, screen_width, screen_height)
 
-# 3.5 - A function for allowing the user to choose which ad to view from thumbnails:
+# 3.5 - A function for allowing the user to choose which ad to view from thumbnails. Thumbnails come from an on-disk
+#       cache and are loaded in the background for the visible page only, so the picker opens at once whatever the
+#       number of ads. Returns the chosen ad path, -1 (Exit), -2 (Home) or None (ESC).
 def choose_ad(screen_width, screen_height, window_name="Gaze Tracker"):
     import glob
 
     ad_folder = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
-    ad_files = sorted(glob.glob(os.path.join(ad_folder, "ad*.jp*g")))  # handles .jpg and .jpeg
+    patterns = ["ad*.jp*g"] + ["ad*" + extension for extension in VIDEO_EXTENSIONS]  # images and video ads
+    ad_files = sorted(path for pattern in patterns for path in glob.glob(os.path.join(ad_folder, pattern)))
 
     if not ad_files:
         print("No ad images found in the data folder.")
         return None
 
-    thumbnails = [cv2.resize(cv2.imread(path), (300, 200)) for path in ad_files]
+    # 3.5.1 - Grid layout: as many 330x230 cells as fit above the bottom buttons, one page at a time:
+    columns = max((screen_width - 200 + 30) // 330, 1)
+    rows = max((screen_height - 150 - 120 + 30) // 230, 1)
+    per_page = columns * rows
+    nb_pages = (len(ad_files) + per_page - 1) // per_page
+    page = [0]
     selected = [None]
 
-    # 3.5.1 - Mouse click callback to detect which ad was clicked:
+    def cell(i):
+        row, col = divmod(i % per_page, columns)
+        return col * 330 + 100, row * 230 + 150
+
+    def visible():
+        return range(page[0] * per_page, min((page[0] + 1) * per_page, len(ad_files)))
+
+    def page_buttons():
+        return (screen_width // 2 - 260, screen_height - 100), (screen_width // 2 + 40, screen_height - 100)
+
+    # 3.5.2 - Mouse callback to detect which ad (or button) was clicked. Hovering an ad starts decoding it for
+    #         playback in the background:
     def on_click(event, x, y, flags, param):
-        for i in range(len(thumbnails)):
-            row, col = divmod(i, 3)
-            x_offset = col * 330 + 100
-            y_offset = row * 230 + 150
+        if event not in (cv2.EVENT_LBUTTONDOWN, cv2.EVENT_MOUSEMOVE):
+            return
+        for i in visible():
+            x_offset, y_offset = cell(i)
             if x_offset <= x <= x_offset + 300 and y_offset <= y <= y_offset + 200:
-                selected[0] = ad_files[i]
+                get_ad_cache().preload(ad_files[i], screen_width, screen_height)
+                if event == cv2.EVENT_LBUTTONDOWN:
+                    selected[0] = ad_files[i]
                 return
+        if event != cv2.EVENT_LBUTTONDOWN:
+            return
+
+        for step, (bx, by) in zip((-1, 1), page_buttons()):
+            if bx <= x <= bx + 220 and by <= y <= by + 80 and 0 <= page[0] + step < nb_pages:
+                page[0] += step
+                thumbnails.request([ad_files[i] for i in visible()])
+                return
+
+        button = detect_button_click(x, y, [], screen_width, screen_height, show_home_button=True)
+        if button is not None:
+            selected[0] = button
 
+    thumbnails = _get_thumbnail_cache()
+    thumbnails.request([ad_files[i] for i in visible()])
     init_fullscreen_window()
     cv2.setMouseCallback(window_name, on_click)
 
-    # 3.5.2 - Displaying grid of ad thumbnails:
-    while selected[0] is None:
-        canvas = np.zeros((screen_height, screen_width, 3), dtype=np.uint8)
-        canvas[:] = (20, 20, 20)
+    # 3.5.3 - Drawing the current page of ad thumbnails (a placeholder until a thumbnail is loaded):
+    def draw(canvas):
         cv2.putText(canvas, "Choose your ad", (100, 80), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
 
-        for i, thumb in enumerate(thumbnails):
-            row, col = divmod(i, 3)
-            x_offset = col * 330 + 100
-            y_offset = row * 230 + 150
-            canvas[y_offset:y_offset + 200, x_offset:x_offset + 300] = thumb
+        for i in visible():
+            x_offset, y_offset = cell(i)
+            thumb = thumbnails.get(ad_files[i])
+            if thumb is not None:
+                canvas[y_offset:y_offset + 200, x_offset:x_offset + 300] = thumb
+            else:
+                cv2.rectangle(canvas, (x_offset, y_offset), (x_offset + 299, y_offset + 199), (60, 60, 60), -1)
             cv2.putText(canvas, f"Ad {i+1}", (x_offset + 90, y_offset + 190),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
 
+        if nb_pages > 1:
+            for text, (bx, by), enabled in zip(("< Prev", "Next >"), page_buttons(),
+                                               (page[0] > 0, page[0] < nb_pages - 1)):
+                cv2.rectangle(canvas, (bx, by), (bx + 220, by + 80), (180, 60, 100) if enabled else (100, 100, 100), -1)
+                cv2.putText(canvas, text, (bx + 50, by + 52), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+            cv2.putText(canvas, f"Page {page[0] + 1}/{nb_pages}", (screen_width - 330, 80),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+
         draw_exit_and_home(canvas, screen_width, screen_height, show_home_button=True)
-        cv2.imshow(window_name, canvas)
+
+    # 3.5.4 - Redrawing only when the page changed or new thumbnails were loaded:
+    screen = Screen(screen_width, screen_height, draw, window_name)
+    drawn_version = None
+    while selected[0] is None:
+        if (page[0], thumbnails.version) != drawn_version:
+            drawn_version = (page[0], thumbnails.version)
+            screen.invalidate()
 
          # ESC key to cancel:
-        if cv2.waitKey(1) == 27:
+        if screen.wait_key() == 27:
             break
 
     return selected[0]
 
-# 3.6 - A function for displaying a heatmap on top of the ad image:
+# 3.5.5 - The process-wide thumbnail cache, created on first use:
+_thumbnail_cache = None
+
+def _get_thumbnail_cache():
+    global _thumbnail_cache
+    if _thumbnail_cache is None:
+        _thumbnail_cache = ThumbnailCache()
+    return _thumbnail_cache
+
+# 3.6 - A function for displaying a heatmap on top of the ad image (a session's heatmap from show_ad, or a
+#       multi-viewer one from HeatmapStore.heatmap):
 def display_heatmap(heatmap, ad_path, screen_width, screen_height, window_name="Gaze Tracker"):
-    ad_img = cv2.imread(ad_path)
-    ad_img = resize_to_fullscreen(ad_img, screen_width, screen_height)
-    heatmap_resized = cv2.resize(heatmap, (ad_img.shape[1], ad_img.shape[0]))
-
-    # 3.6.1 - Normalizing and colorizing the heatmap:
-    heatmap_normalized = cv2.normalize(heatmap_resized, None, 0, 255, cv2.NORM_MINMAX)
-    heatmap_colored = cv2.applyColorMap(heatmap_normalized.astype(np.uint8), cv2.COLORMAP_JET)
-    blended = cv2.addWeighted(ad_img, 0.5, heatmap_colored, 0.5, 0)
-
-    # 3.6.2 - Showing the blended heatmap+ad image:
-    while True:
-        cv2.imshow(window_name, blended)
-        if cv2.waitKey(1) == 27:
-            break
+    ad_img = get_ad_cache().get(ad_path, screen_width, screen_height)  # same decoded ad as during playback
+
+    # 3.6.1 - Resizing (heatmaps are built at reduced resolution), normalizing, colorizing and blending the heatmap:
+    blended = blend_heatmap(ad_img, heatmap)
+
+    # 3.6.2 - Showing the blended heatmap+ad image (a static image: shown once, then waiting for ESC):
+    cv2.imshow(window_name, blended)
+    while cv2.waitKey(IDLE_WAIT_MS) != 27:
+        pass
 
     cv2.destroyWindow(window_name) # 3.6.3 - Closing the display window.
@@ -0,0 +1,127 @@
+# 1. Importing necessary libraries:
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+
+# 2. Importing the reduced-resolution decoder of the thumbnails and the video ad helpers:
+from ad_tracking.thumbnails import decode_reduced
+from ad_tracking.video_ad import is_video, read_frame_at
+
+AD_CACHE_BYTES = 256 * 1024 * 1024  # about 40 ads at 1920x1080
+
+# ------------------------
+# 3 --> Decoded ad images:
+# ------------------------
+
+# 3.1 - A function for decoding an ad and resizing it to the screen. The JPEG is decoded at the smallest reduced
+#       resolution that still covers the screen; for a video ad, its first frame is used. Returns None if it can't
+#       be read.
+def load_ad_image(path, screen_width, screen_height):
+    img = read_frame_at(path) if is_video(path) else decode_reduced(path, (screen_width, screen_height))
+    if img is None:
+        return None
+    return cv2.resize(img, (screen_width, screen_height), interpolation=cv2.INTER_LINEAR)
+
+# 3.2 - A bounded LRU cache of ads decoded at a screen resolution, shared by playback and heatmap display:
+class AdImageCache(object):
+    """
+    Keeps recently used ads decoded and resized, keyed by (path, width,
+    height), up to max_bytes of pixels. An ad that changed on disk is
+    decoded again. preload() decodes an ad in the background (e.g. while
+    the user hovers its thumbnail), and get() waits for a preload in
+    progress instead of decoding the ad a second time.
+
+    Cached images are shared, so they are returned read-only.
+    """
+
+    def __init__(self, max_bytes=AD_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()
+        self._loading = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    @staticmethod
+    def _key(path, screen_width, screen_height):
+        return os.path.abspath(path), screen_width, screen_height
+
+    def _load(self, key):
+        """Decodes an ad and stores it, evicting the least recently used ads"""
+        path, screen_width, screen_height = key
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        img = load_ad_image(path, screen_width, screen_height)
+
+        with self._lock:
+            self._loading.pop(key, None)
+            if img is None:
+                return None
+            img.flags.writeable = False
+            if key in self._images:
+                self._bytes -= self._images.pop(key)[1].nbytes
+            self._images[key] = (mtime, img)
+            self._bytes += img.nbytes
+            while self._bytes > self.max_bytes and len(self._images) > 1:
+                _, (_, evicted) = self._images.popitem(last=False)
+                self._bytes -= evicted.nbytes
+        return img
+
+    def _cached(self, key):
+        """Returns the cached image if it is still up to date, None otherwise (call with the lock held)"""
+        entry = self._images.get(key)
+        if entry is None:
+            return None
+        try:
+            mtime = os.stat(key[0]).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != entry[0]:
+            return None
+        self._images.move_to_end(key)
+        return entry[1]
+
+    def preload(self, path, screen_width, screen_height):
+        """Starts decoding an ad in the background, if it isn't cached or loading yet"""
+        key = self._key(path, screen_width, screen_height)
+        with self._lock:
+            if key in self._loading or self._cached(key) is not None:
+                return
+            self._loading[key] = self._executor.submit(self._load, key)
+
+    def get(self, path, screen_width, screen_height):
+        """Returns the ad decoded and resized to the screen (read-only), or None if it can't be read.
+
+        Arguments:
+            path (str): Path of the ad image
+            screen_width, screen_height (int): Size the ad is shown at
+        """
+        key = self._key(path, screen_width, screen_height)
+        with self._lock:
+            img = self._cached(key)
+            loading = self._loading.get(key)
+        if img is not None:
+            return img
+        if loading is not None:
+            return loading.result()
+        return self._load(key)
+
+    def clear(self):
+        """Drops every cached ad"""
+        with self._lock:
+            self._images.clear()
+            self._bytes = 0
+
+
+_ad_cache = None
+
+# 3.3 - A function for getting the process-wide ad cache, created on first use:
+def get_ad_cache():
+    global _ad_cache
+    if _ad_cache is None:
+        _ad_cache = AdImageCache()
+    return _ad_cache
@@ -0,0 +1,183 @@
+# 1. Importing necessary libraries:
+import json
+import os
+from collections import namedtuple
+import numpy as np
+import cv2
+
+# 2. Importing the gaze point log and the fixation detector:
+from ad_tracking.fixations import detect_fixations
+from ad_tracking.heatmap import GazeLog, GAZE_DTYPE
+
+AOI_MASK_SIZE = 1024  # longest side of the AOI lookup mask, in pixels
+MAX_AOIS = 64         # one bit per AOI in the lookup mask
+
+# Per-session, per-AOI metrics: every array is (sessions, aois)
+AOIStats = namedtuple("AOIStats", ["names", "sessions", "hits", "dwell", "time_to_first", "revisits"])
+
+# ------------------------
+# 3 --> AOI definitions:
+# ------------------------
+
+# 3.1 - A function for loading the AOIs of an ad from data/<ad name>.aoi.json, next to the ad. Returns None if the
+#       ad has none. The file holds the ad image size and rectangles ([x, y, w, h]) or polygons ([[x, y], ...]),
+#       all in ad image pixels:
+#       {"image_size": [1024, 646], "aois": [{"name": "logo", "rect": [80, 220, 280, 120]}, ...]}
+def load_aois(ad_path):
+    path = os.path.splitext(ad_path)[0] + ".aoi.json"
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        aois = json.load(f)
+    if len(aois["aois"]) > MAX_AOIS:
+        raise ValueError("At most {} AOIs per ad are supported, {} has {}".format(MAX_AOIS, path, len(aois["aois"])))
+    return aois
+
+# 3.2 - A function for rasterizing the AOIs into a lookup mask: bit k of a pixel is set when it is inside AOI k,
+#       so overlapping AOIs are all counted. The mask is at most AOI_MASK_SIZE pixels on its longest side.
+def aoi_mask(aois, max_size=AOI_MASK_SIZE):
+    image_width, image_height = aois["image_size"]
+    scale = min(max_size / max(image_width, image_height), 1.0)
+    mask_size = (max(int(round(image_width * scale)), 1), max(int(round(image_height * scale)), 1))
+
+    scale_x, scale_y = mask_size[0] / image_width, mask_size[1] / image_height
+
+    mask = np.zeros((mask_size[1], mask_size[0]), np.uint64)
+    layer = np.zeros(mask.shape, np.uint8)
+    for k, aoi in enumerate(aois["aois"]):
+        layer[:] = 0
+        if "rect" in aoi:
+            # Pixels [x, x + w) x [y, y + h) of the ad
+            x, y, w, h = aoi["rect"]
+            top_left = (int(round(x * scale_x)), int(round(y * scale_y)))
+            bottom_right = (int(round((x + w) * scale_x)) - 1, int(round((y + h) * scale_y)) - 1)
+            cv2.rectangle(layer, top_left, bottom_right, 1, -1)
+        else:
+            polygon = np.array(aoi["polygon"], np.float64) * (scale_x, scale_y)
+            cv2.fillPoly(layer, [np.round(polygon).astype(np.int32)], 1)
+        mask |= layer.astype(np.uint64) << np.uint64(k)
+    return mask
+
+# 3.3 - A function for looking up the AOI bits of gaze points given in screen coordinates. The ad is shown
+#       stretched to the full screen, so screen positions map to the ad by their fraction of the screen size.
+#       The screen size can be one value or one per point (sessions recorded on different screens).
+def lookup_aois(mask, x, y, screen_width, screen_height):
+    x_fraction = np.asarray(x, np.float64) / screen_width
+    y_fraction = np.asarray(y, np.float64) / screen_height
+    on_screen = (x_fraction >= 0) & (x_fraction < 1) & (y_fraction >= 0) & (y_fraction < 1)
+
+    cols = np.minimum((np.where(on_screen, x_fraction, 0) * mask.shape[1]).astype(np.int64), mask.shape[1] - 1)
+    rows = np.minimum((np.where(on_screen, y_fraction, 0) * mask.shape[0]).astype(np.int64), mask.shape[0] - 1)
+    return np.where(on_screen, mask[rows, cols], np.uint64(0))
+
+# ------------------------
+# 4 --> AOI analytics:
+# ------------------------
+
+# 4.1 - A function for computing, per session and per AOI, over any number of gaze points at once:
+#       - hits: number of gaze points inside the AOI
+#       - dwell: time spent inside the AOI (s); each point lasts until the next point of its session, capped at
+#         max_gap so tracking dropouts don't count, or its own entry in durations (e.g. fixation durations)
+#       - time_to_first: time from the ad onset (pts 0) to the start of the first fixation in the AOI (s), NaN if
+#         never viewed. Fixations are detected per session; points given with durations are taken as fixations.
+#       - revisits: number of times the gaze came back into the AOI after leaving it
+#       points is a GazeLog or a GAZE_DTYPE array; session is an optional array of session labels, one per point.
+def analyze_aois(points, aois, screen_width, screen_height, session=None, durations=None, max_gap=0.5):
+    if isinstance(points, GazeLog):
+        points = points.points
+    points = np.asarray(points, GAZE_DTYPE)
+    names = [aoi["name"] for aoi in aois["aois"]]
+    if session is None:
+        session = np.zeros(len(points), np.int64)
+    if len(points) == 0:
+        empty = np.zeros((0, len(names)))
+        return AOIStats(names, np.empty(0), empty, empty, empty, empty)
+
+    # 4.1.1 - Grouping the points by session, in time order:
+    session_labels, session_index = np.unique(session, return_inverse=True)
+    order = np.lexsort((points["t"], session_index))
+    t = points["t"][order]
+    session_index = session_index[order]
+    starts = np.flatnonzero(np.r_[True, session_index[1:] != session_index[:-1]])
+    first_point = np.zeros(len(t), bool)
+    first_point[starts] = True
+
+    # 4.1.2 - Finding the AOIs of every point: an (points, aois) boolean matrix:
+    mask = aoi_mask(aois)
+    points = points[order]
+    screen_width = np.broadcast_to(screen_width, len(order))[order]
+    screen_height = np.broadcast_to(screen_height, len(order))[order]
+    bits = lookup_aois(mask, points["x"], points["y"], screen_width, screen_height)
+    inside = ((bits[:, None] >> np.arange(len(names), dtype=np.uint64)) & np.uint64(1)).astype(bool)
+
+    # 4.1.3 - Duration of every point: the gap to the next point of the same session, or the given durations:
+    if durations is None:
+        duration = np.zeros(len(t))
+        duration[:-1] = np.clip(np.diff(t), 0, max_gap)
+        duration[starts[1:] - 1] = 0  # the last point of a session
+    else:
+        duration = np.asarray(durations, np.float64)[order]
+
+    # 4.1.4 - Entries: points inside an AOI whose previous point (of the same session) was outside of it:
+    previous = np.zeros_like(inside)
+    previous[1:] = inside[:-1]
+    previous[first_point] = False
+    entries = inside & ~previous
+
+    # 4.1.5 - Reducing every session (a contiguous run of rows) at once:
+    hits = np.add.reduceat(inside, starts, axis=0)
+    dwell = np.add.reduceat(inside * duration[:, None], starts, axis=0)
+    revisits = np.maximum(np.add.reduceat(entries, starts, axis=0) - 1, 0)
+
+    # 4.1.6 - First view of every AOI: the earliest fixation inside it, in time into the ad:
+    if durations is None:
+        ends = np.r_[starts[1:], len(points)]
+        fixations = [detect_fixations(points[start:end]) for start, end in zip(starts, ends)]
+        fixation_session = np.repeat(np.arange(len(starts)), [len(f) for f in fixations])
+        fixations = np.concatenate(fixations)
+        fixation_inside = lookup_aois(mask, fixations["x"], fixations["y"], screen_width[starts][fixation_session],
+                                      screen_height[starts][fixation_session])
+        fixation_inside = ((fixation_inside[:, None] >> np.arange(len(names), dtype=np.uint64))
+                           & np.uint64(1)).astype(bool)
+    else:
+        fixations, fixation_session, fixation_inside = points, session_index, inside
+    time_to_first = np.full(hits.shape, np.inf)
+    np.minimum.at(time_to_first, fixation_session, np.where(fixation_inside, fixations["pts"][:, None], np.inf))
+    time_to_first = np.maximum(time_to_first, 0)  # a frame captured just before the ad appeared
+    time_to_first[np.isinf(time_to_first)] = np.nan
+
+    return AOIStats(names, session_labels, hits, dwell, time_to_first, revisits)
+
+# 4.2 - A function for running analyze_aois over every session of an ad in a HeatmapStore. Sessions keep their own
+#       screen size; session_ids restricts the analysis to some sessions.
+def analyze_store(store, ad_path, aois=None, session_ids=None, max_gap=0.5):
+    aois = aois or load_aois(ad_path)
+    if aois is None:
+        raise ValueError("No AOIs defined for {}".format(ad_path))
+
+    entries = [s for s in store.sessions(ad_path) if session_ids is None or s["id"] in session_ids]
+    points = [store.session_points(ad_path, s["id"]) for s in entries]
+    counts = [len(p) for p in points]
+    points = np.concatenate(points) if points else np.empty(0, GAZE_DTYPE)
+
+    session = np.repeat([s["id"] for s in entries], counts)
+    screen_width = np.repeat([s["screen"][0] for s in entries], counts)
+    screen_height = np.repeat([s["screen"][1] for s in entries], counts)
+    return analyze_aois(points, aois, screen_width, screen_height, session, max_gap=max_gap)
+
+# 4.3 - A function for summarizing an AOIStats over all its sessions, one row per AOI:
+def summarize_aois(stats):
+    rows = []
+    nb_sessions = max(len(stats.sessions), 1)
+    for k, name in enumerate(stats.names):
+        viewed = stats.hits[:, k] > 0
+        rows.append({
+            "name": name,
+            "hits": int(stats.hits[:, k].sum()),
+            "dwell": float(stats.dwell[:, k].sum()),
+            "mean_dwell": float(stats.dwell[:, k].sum() / nb_sessions),
+            "viewers": int(viewed.sum()),
+            "mean_time_to_first": float(np.mean(stats.time_to_first[viewed, k])) if viewed.any() else None,
+            "revisits": int(stats.revisits[:, k].sum()),
+        })
+    return rows
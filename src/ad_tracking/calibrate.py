@@ -4,7 +4,11 @@ import cv2
 import time
 
 # 2. Importing custom utility functions for gaze tracking and UI handling:
-from gaze_tracking import GazeTracking
+from gaze_tracking import GazeTracking, detection_scale_for
+from ad_tracking.mapping import GazeMapper
+from ad_tracking.point_sampler import MAX_RETRIES, MAX_SECONDS, SETTLE_SECONDS, PointSampler, fit_homography
+from ad_tracking.profiles import DEFAULT_PROFILE_DIR, apply_profile, default_profile_name, make_profile, save_profile
+from utils.camera_utils import get_camera
 from utils.ui_utils import (
     get_screen_resolution,
     draw_text_lines,
@@ -13,16 +17,10 @@ from utils.ui_utils import (
 )
 
 # 3. A function for estimating the distance between the user's eyes based on pupil positions:
+#    The Euclidean distance is computed once per frame by GazeTracking.refresh() and is None
+#    if one or both pupils are not detected:
 def estimate_distance(gaze_tracking):
-    left_pupil = gaze_tracking.pupil_left_coords()
-    right_pupil = gaze_tracking.pupil_right_coords()
-
-    # 3.1 - If both pupils are detected, calculate the Euclidean distance:
-    if left_pupil and right_pupil:
-        return np.linalg.norm(np.array(left_pupil) - np.array(right_pupil))
-
-    # 3.2 - Returning None if one or both pupils are not detected.
-    return None
+    return gaze_tracking.sample.distance
 
 # ----------------------------------------------------------------------------
 #  4. Camera Calibration Function:
@@ -39,47 +37,56 @@ def calibrate_gaze(gaze_tracking, screen_width, screen_height, window_name):
 
     # 4.2 - Variable Initialization:
     calibration_data = [] # 4.2.1 - variable for storing the mapping between screen points and gaze data.
-    distances = [] # 4.2.2 - variable for storing the estimated eye distances for each point.
+    sampler = PointSampler() # 4.2.2 - running estimate of the gaze ratios and distance of the current point.
 
-    # 4.3 - Opening the webcam & Switching to a fullscreen window for calibration:
-    webcam = cv2.VideoCapture(0)
+    # 4.3 - Getting the shared webcam & Switching to a fullscreen window for calibration:
+    webcam = get_camera()
     init_fullscreen_window()
 
     # 4.4 - Looping through each calibration point:
     for point in calibration_points:
         x, y = int(point[0] * screen_width), int(point[1] * screen_height)
-        img = np.zeros((screen_height, screen_width, 3), dtype=np.uint8)
-        cv2.circle(img, (x, y), 15, (0, 255, 0), -1) # 4.4.1 - Drawing a green dot at the calibration point coordinates.
-
-        gaze_points = []
-        start_time = time.time()
 
-        # 4.4.2 - Collecting gaze data from the user, 2 seconds per point:
-        while time.time() - start_time < 2:
-            ret, frame = webcam.read()
-            if ret:
-                gaze_tracking.refresh(frame)
-                horizontal_ratio = gaze_tracking.horizontal_ratio()
-                vertical_ratio = gaze_tracking.vertical_ratio()
-                distance = estimate_distance(gaze_tracking)
+        # 4.4.1 - Sampling the point until its estimate converges. A point still noisy after MAX_SECONDS is shown
+        #         again (in yellow) and sampled from scratch, up to MAX_RETRIES times:
+        for attempt in range(MAX_RETRIES + 1):
+            img = np.zeros((screen_height, screen_width, 3), dtype=np.uint8)
+            color = (0, 255, 0) if attempt == 0 else (0, 255, 255)
+            cv2.circle(img, (x, y), 15, color, -1) # Drawing a dot at the calibration point coordinates.
+            cv2.imshow(window_name, img) # the dot doesn't move: shown once, the loop only pumps window events
+
+            sampler.reset()
+            start_time = time.time()
+
+            # 4.4.2 - Collecting gaze data from the user, after the eyes had time to reach the dot:
+            while not sampler.converged() and time.time() - start_time < SETTLE_SECONDS + MAX_SECONDS:
+                ret, frame = webcam.read()
+                if ret:
+                    gaze_tracking.refresh(frame)
+                    horizontal_ratio = gaze_tracking.horizontal_ratio()
+                    vertical_ratio = gaze_tracking.vertical_ratio()
+                    distance = estimate_distance(gaze_tracking)
+
+                    # 4.4.3 - If gaze and distance are valid --> adding the sample (outliers are rejected):
+                    if (horizontal_ratio is not None and vertical_ratio is not None and distance is not None
+                            and time.time() - start_time >= SETTLE_SECONDS):
+                        sampler.add(horizontal_ratio, vertical_ratio, distance)
+
+                if cv2.waitKey(1) == 27:
+                    cv2.destroyWindow(window_name)
+                    return None, None # ESC to cancel.
+
+            if sampler.converged():
+                break
+
+        # 4.4.4 - Storing averaged gaze and distance for each calibration point. A point that never converged is
+        #         kept if it has enough samples: the robust fit below drops it if it disagrees with the others.
+        if sampler.count >= sampler.min_samples:
+            avg_gaze = np.array(sampler.mean)
+            calibration_data.append((point, avg_gaze, sampler.distance))
+            print(f"Calibration point {point}: average gaze {avg_gaze}, average distance {sampler.distance:.1f}, "
+                  f"{sampler.count} samples ({sampler.rejected} rejected) in {time.time() - start_time:.1f}s")
 
-                # 4.4.3 - If gaze and distance are valid --> storing the data:
-                if horizontal_ratio is not None and vertical_ratio is not None and distance is not None:
-                    gaze_points.append((horizontal_ratio, vertical_ratio))
-                    distances.append(distance)
-
-            cv2.imshow(window_name, img)
-            if cv2.waitKey(1) == 27:
-                break # ESC to cancel.
-
-        # 4.4.4 -  Storing averaged gaze and distance for each calibration point:
-        if gaze_points:
-            avg_gaze = np.mean(gaze_points, axis=0)
-            avg_distance = np.mean(distances)
-            calibration_data.append((point, avg_gaze, avg_distance))
-            print(f"Calibration point {point}: average gaze {avg_gaze}, average distance {avg_distance}")
-
-    webcam.release()
     cv2.destroyWindow(window_name)
 
     # Error Handling --> Requiring minimum calibration data to compute transformation matrix:
@@ -91,15 +98,21 @@ def calibrate_gaze(gaze_tracking, screen_width, screen_height, window_name):
     src_points = np.array([data[1] for data in calibration_data], dtype=np.float32)
     dst_points = np.array([data[0] for data in calibration_data], dtype=np.float32)
 
-    # 4.4.6 - Computing transformation matrix from gaze space to screen space:
-    transformation_matrix, _ = cv2.findHomography(src_points, dst_points)
+    # 4.4.6 - Computing transformation matrix from gaze space to screen space, ignoring inconsistent points:
+    transformation_matrix, inliers = fit_homography(src_points, dst_points)
+    if transformation_matrix is None:
+        print("Could not fit the calibration.")
+        return None, None
+    if not inliers.all():
+        print(f"Ignored {int((~inliers).sum())} inconsistent calibration point(s).")
 
-    # 4.4.7 - Computing average user distance for later scaling:
-    avg_distance = np.mean([data[2] for data in calibration_data])
+    # 4.4.7 - Computing average user distance (of the points used) for later scaling:
+    avg_distance = np.mean([data[2] for data, inlier in zip(calibration_data, inliers) if inlier])
     return transformation_matrix, avg_distance
 
-# 5. A function for displaying instructions and initiating the calibration process:
-def run_calibration(window_name="Gaze Tracker"):
+# 5. A function for displaying instructions and initiating the calibration process. A successful calibration is
+#    saved as a profile (named profile_name, or after the current time) so a returning viewer can skip it:
+def run_calibration(window_name="Gaze Tracker", profile_name=None, profile_dir=DEFAULT_PROFILE_DIR):
     screen_width, screen_height = get_screen_resolution() # 5.1 - Getting screen dimensions.
 
     # 5.2 - Instructions text for the users:
@@ -122,7 +135,58 @@ def run_calibration(window_name="Gaze Tracker"):
     cv2.imshow(window_name, canvas)
     cv2.waitKey(0)
 
-    # 5.4 - Starting --> gaze calibration:
-    gaze_tracking = GazeTracking()
+    # 5.4 - Starting --> gaze calibration (faces are detected on a downscaled copy of high-resolution frames):
+    gaze_tracking = GazeTracking(detection_scale=detection_scale_for(get_camera().frame_size()[0]))
     transformation_matrix, avg_distance = calibrate_gaze(gaze_tracking, screen_width, screen_height, window_name)
+
+    # 5.5 - Saving the calibration as a profile:
+    if transformation_matrix is not None:
+        profile = make_profile(profile_name or default_profile_name(), transformation_matrix, avg_distance, gaze_tracking)
+        save_profile(profile, profile_dir)
     return transformation_matrix, avg_distance, gaze_tracking
+
+# ----------------------------------------------------------------------------
+#  6. Profile Validation Function:
+#     - a short check that a saved profile still maps this viewer's gaze well,
+#       instead of running the full calibration again
+#     - returns (ok, error, gaze_tracking); ok is None if the viewer pressed ESC
+# ----------------------------------------------------------------------------
+def validate_profile(profile, screen_width, screen_height, window_name="Gaze Tracker",
+                     points=((0.5, 0.5), (0.2, 0.8)), seconds=1.0, settle=0.3, max_error=0.1):
+
+    # 6.1 - A fresh tracker with the profile's pupil thresholds, and the profile's screen mapping:
+    detection_scale = detection_scale_for(get_camera().frame_size()[0])
+    gaze_tracking = apply_profile(profile, GazeTracking(detection_scale=detection_scale))
+    mapper = GazeMapper(profile.transformation_matrix, profile.avg_distance, screen_width, screen_height)
+
+    webcam = get_camera()
+    init_fullscreen_window()
+    errors = []
+
+    # 6.2 - Showing each validation dot and measuring how far the mapped gaze lands from it:
+    for point in points:
+        target = np.array([point[0] * screen_width, point[1] * screen_height])
+        img = np.zeros((screen_height, screen_width, 3), dtype=np.uint8)
+        cv2.circle(img, (int(target[0]), int(target[1])), 15, (0, 255, 0), -1)
+        cv2.imshow(window_name, img)
+
+        start_time = time.time()
+        while time.time() - start_time < seconds:
+            ret, frame = webcam.read()
+            if ret:
+                gaze_tracking.refresh(frame)
+                screen_x, screen_y = mapper.map_sample(gaze_tracking.sample)
+
+                # 6.2.1 - Ignoring the first moments, while the eyes move to the dot:
+                if screen_x is not None and time.time() - start_time >= settle:
+                    errors.append(np.hypot((screen_x - target[0]) / screen_width, (screen_y - target[1]) / screen_height))
+
+            if cv2.waitKey(1) == 27:
+                return None, None, gaze_tracking # ESC to cancel.
+
+    # 6.3 - The profile is reused if the median error is small enough (as a fraction of the screen):
+    if not errors:
+        return False, None, gaze_tracking
+    error = float(np.median(errors))
+    print(f"Profile {profile.name}: validation error {error:.3f}")
+    return error <= max_error, error, gaze_tracking
@@ -0,0 +1,178 @@
+# 1. Importing necessary libraries:
+import numpy as np
+
+# 2. Importing the gaze point log:
+from ad_tracking.heatmap import GazeLog, GAZE_DTYPE
+
+# 3. Default event detection thresholds, in screen pixels and seconds:
+VELOCITY_THRESHOLD = 1500.0  # px/s, faster movements between two samples are saccades
+MAX_DISPERSION = 150.0       # px, (max x - min x) + (max y - min y) of a fixation
+MIN_DURATION = 0.1           # s, shorter groups of samples are not fixations
+MAX_GAP = 0.25               # s, a longer gap between two samples (e.g. a blink) ends a fixation
+
+# ------------------------
+# 4 --> Fixation detection:
+# ------------------------
+
+# Samples are grouped while the gaze moves slower than velocity_threshold (and no sample is missing for more than
+# max_gap). A sample that would spread the group beyond max_dispersion starts a new group, as in I-DT, so a slow
+# drift from one target to the next doesn't merge two fixations. A group is a fixation if it lasts at least
+# min_duration. Fixations are GAZE_DTYPE points: t (and pts) the start, (x, y) the centroid and w the duration, so
+# build_heatmap(..., density=True) and analyze_aois(..., durations=fixations["w"]) weight them by duration.
+# Both detectors give the same fixations.
+
+# 4.1 - Streaming detector, O(1) time and memory per sample, for live use:
+class FixationDetector(object):
+    """
+    Turns a stream of gaze points into fixations. add() returns the
+    fixation that the new point ended, if any; flush() ends the stream.
+    """
+
+    def __init__(self, velocity_threshold=VELOCITY_THRESHOLD, max_dispersion=MAX_DISPERSION,
+                 min_duration=MIN_DURATION, max_gap=MAX_GAP):
+        self.velocity_threshold = velocity_threshold
+        self.max_dispersion = max_dispersion
+        self.min_duration = min_duration
+        self.max_gap = max_gap
+        self._count = 0
+
+    def add(self, x, y, t, pts=None):
+        """Adds one gaze point, in time order.
+
+        Arguments:
+            x, y (float): Screen position of the gaze, in pixels
+            t (float): Timestamp of the point, in seconds
+            pts (float): Time into the ad of the point, t if None
+
+        Returns:
+            The (t, x, y, duration, pts) fixation ended by this point, or None
+        """
+        x, y, t = float(x), float(y), float(t)
+        pts = t if pts is None else float(pts)
+        if self._count:
+            dt = t - self._last_t
+            dx = x - self._last_x
+            dy = y - self._last_y
+            reach = self.velocity_threshold * dt
+            if 0 <= dt <= self.max_gap and dx * dx + dy * dy <= reach * reach:
+                min_x, max_x = min(self._min_x, x), max(self._max_x, x)
+                min_y, max_y = min(self._min_y, y), max(self._max_y, y)
+                if (max_x - min_x) + (max_y - min_y) <= self.max_dispersion:
+                    self._count += 1
+                    self._sum_x += x
+                    self._sum_y += y
+                    self._min_x, self._max_x, self._min_y, self._max_y = min_x, max_x, min_y, max_y
+                    self._last_t, self._last_x, self._last_y = t, x, y
+                    return None
+
+        fixation = self.flush()
+        self._count = 1
+        self._start_t = self._last_t = t
+        self._start_pts = pts
+        self._sum_x = self._min_x = self._max_x = self._last_x = x
+        self._sum_y = self._min_y = self._max_y = self._last_y = y
+        return fixation
+
+    def flush(self):
+        """Ends the current group of points.
+
+        Returns:
+            The (t, x, y, duration, pts) fixation, or None if the group wasn't one
+        """
+        count, self._count = self._count, 0
+        if not count:
+            return None
+
+        duration = self._last_t - self._start_t
+        if duration >= self.min_duration:
+            return self._start_t, self._sum_x / count, self._sum_y / count, duration, self._start_pts
+        return None
+
+# 4.1.1 - The fixations of a live gaze stream, recorded as they end:
+class FixationLog(GazeLog):
+    """
+    A GazeLog of fixations (weighted by their duration), detected by a
+    FixationDetector as gaze points are added, so a heatmap or live overlay
+    of a session can be built from far fewer points than its raw samples.
+    """
+
+    def __init__(self, onset=0.0, **thresholds):
+        super(FixationLog, self).__init__(capacity=256, onset=onset)
+        self.detector = FixationDetector(**thresholds)
+
+    def add(self, x, y, t, pts=None):
+        """Adds one raw gaze point. Returns the fixation it ended (recorded in the log), or None"""
+        return self._record(self.detector.add(x, y, t, t - self.onset if pts is None else pts))
+
+    def flush(self):
+        """Ends the stream, recording its last fixation. Returns it, or None"""
+        return self._record(self.detector.flush())
+
+    def _record(self, fixation):
+        if fixation is not None:
+            t, x, y, duration, pts = fixation
+            self.append(x, y, t, duration, pts)
+        return fixation
+
+# 4.2 - Vectorized detector for recorded logs: the same grouping, computed over the whole array at once.
+#       points is a GazeLog or a GAZE_DTYPE array, in time order. Returns a GAZE_DTYPE array of fixations.
+def detect_fixations(points, velocity_threshold=VELOCITY_THRESHOLD, max_dispersion=MAX_DISPERSION,
+                     min_duration=MIN_DURATION, max_gap=MAX_GAP):
+    if isinstance(points, GazeLog):
+        points = points.points
+    points = np.asarray(points, GAZE_DTYPE)
+    if len(points) == 0:
+        return np.empty(0, GAZE_DTYPE)
+
+    t = points["t"]
+    x = points["x"].astype(np.float64)
+    y = points["y"].astype(np.float64)
+
+    # 4.2.1 - A new group starts on every saccade or gap:
+    dt = np.diff(t)
+    reach = velocity_threshold * dt
+    continues = (dt >= 0) & (dt <= max_gap) & (np.diff(x) ** 2 + np.diff(y) ** 2 <= reach * reach)
+    starts = np.flatnonzero(np.r_[True, ~continues])
+    ends = np.r_[starts[1:], len(points)]
+
+    # 4.2.2 - Groups spread beyond max_dispersion (usually few) are split where they cross it:
+    dispersion = (np.maximum.reduceat(x, starts) - np.minimum.reduceat(x, starts)
+                  + np.maximum.reduceat(y, starts) - np.minimum.reduceat(y, starts))
+    if (dispersion > max_dispersion).any():
+        splits = [_split_dispersed(x, y, start, end, max_dispersion)
+                  for start, end in zip(starts[dispersion > max_dispersion], ends[dispersion > max_dispersion])]
+        starts = np.unique(np.concatenate([starts] + splits))
+    ends = np.r_[starts[1:], len(points)] - 1
+
+    # 4.2.3 - Duration and centroid of every group:
+    duration = t[ends] - t[starts]
+    count = ends - starts + 1
+    keep = duration >= min_duration
+
+    fixations = np.empty(int(keep.sum()), GAZE_DTYPE)
+    fixations["t"] = t[starts][keep]
+    fixations["pts"] = points["pts"][starts][keep]
+    fixations["x"] = (np.add.reduceat(x, starts) / count)[keep]
+    fixations["y"] = (np.add.reduceat(y, starts) / count)[keep]
+    fixations["w"] = duration[keep]
+    return fixations
+
+# 4.3 - A function for splitting the points [start, end) into groups within max_dispersion, each group ending just
+#       before the point that would spread it further. Returns the start indices of the new groups. The running
+#       dispersion is scanned in growing windows, so a long group costs about O(n) whatever its number of splits.
+def _split_dispersed(x, y, start, end, max_dispersion):
+    splits = []
+    window = 64
+    while True:
+        stop = min(start + window, end)
+        dispersion = (np.maximum.accumulate(x[start:stop]) - np.minimum.accumulate(x[start:stop])
+                      + np.maximum.accumulate(y[start:stop]) - np.minimum.accumulate(y[start:stop]))
+        over = np.flatnonzero(dispersion > max_dispersion)
+        if len(over):
+            start += int(over[0])
+            splits.append(start)
+            window = 64
+        elif stop == end:
+            return np.array(splits, dtype=np.intp)
+        else:
+            window *= 2
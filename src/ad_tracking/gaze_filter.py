@@ -0,0 +1,193 @@
+# 1. Importing necessary libraries:
+import math
+
+# Filter used when none is given: see make_gaze_filter()
+DEFAULT_FILTER = "kalman"
+# A gap between samples longer than this (s), e.g. a blink or looking away, restarts the filter from the next sample
+MAX_GAP = 0.25
+# Extrapolation is capped, so a stalled pipeline doesn't fling the point off screen (s)
+MAX_PREDICTION = 0.15
+# Only smooth pursuit is extrapolated: faster than this (px/s) is a saccade, which is over before the next frame
+MAX_PURSUIT_SPEED = 800.0
+# The Kalman filter treats a point further than this many standard deviations from its prediction as a saccade
+SACCADE_GATE = 4.0
+
+# ------------------------
+# 2 --> Gaze filters:
+# ------------------------
+# A gaze filter smooths the mapped gaze points (screen pixels) of consecutive samples, using their capture
+# timestamps, and can extrapolate the filtered point to a later time to make up for the pipeline latency:
+#   update(x, y, t) -> (x, y) filtered at the capture time t
+#   predict(t)      -> (x, y) extrapolated to the time t (e.g. now, when the point is drawn), (None, None) if no sample
+#   reset()         -> forgets the past samples
+# Both filters are O(1) per sample and only keep a few floats of state.
+
+# 2.0 - A function for extrapolating a filtered point by dt seconds, along its velocity if it is a smooth pursuit:
+def _extrapolate(x, y, vx, vy, dt):
+    dt = min(max(dt, 0.0), MAX_PREDICTION)
+    if vx * vx + vy * vy > MAX_PURSUIT_SPEED * MAX_PURSUIT_SPEED:
+        return x, y
+    return x + vx * dt, y + vy * dt
+
+# 2.1 - No filtering, the raw gaze points:
+class PassThroughFilter(object):
+    """Returns the last gaze point as is, never extrapolated"""
+
+    __slots__ = ("_x", "_y")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._x = self._y = None
+
+    def update(self, x, y, t):
+        self._x, self._y = x, y
+        return x, y
+
+    def predict(self, t):
+        return self._x, self._y
+
+# 2.2 - Adaptive low-pass filter (the "1 Euro filter", Casiez et al. 2012):
+class OneEuroFilter(object):
+    """
+    Low-pass filter whose cutoff frequency rises with the gaze speed: a
+    fixation is smoothed heavily (no jitter), a saccade lightly (little
+    lag). The point is extrapolated with the velocity of the filtered
+    point, which settles as soon as a saccade ends.
+
+    Arguments:
+        min_cutoff (float): Cutoff frequency at rest, in Hz (lower is smoother)
+        beta (float): Cutoff increase per pixel/s of gaze speed (higher is less lag)
+        d_cutoff (float): Cutoff frequency of the velocity estimate, in Hz
+    """
+
+    __slots__ = ("min_cutoff", "beta", "d_cutoff", "_t", "_x", "_y", "_dx", "_dy", "_vx", "_vy")
+
+    def __init__(self, min_cutoff=1.0, beta=0.004, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self._t = None
+        self._x = self._y = 0.0
+        self._dx = self._dy = 0.0
+        self._vx = self._vy = 0.0
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        """Smoothing factor of an exponential filter with this cutoff frequency, for a sample period dt"""
+        return 1.0 / (1.0 + 1.0 / (2.0 * math.pi * cutoff * dt))
+
+    def update(self, x, y, t):
+        dt = t - self._t if self._t is not None else 0.0
+        if self._t is None or dt > MAX_GAP:
+            self._t, self._x, self._y = t, float(x), float(y)
+            self._dx = self._dy = self._vx = self._vy = 0.0
+            return self._x, self._y
+        if dt <= 0:
+            return self._x, self._y  # same frame again
+
+        # 2.2.1 - Filtered velocity, then a cutoff following the speed:
+        a = self._alpha(self.d_cutoff, dt)
+        self._dx += a * ((x - self._x) / dt - self._dx)
+        self._dy += a * ((y - self._y) / dt - self._dy)
+        cutoff = self.min_cutoff + self.beta * math.hypot(self._dx, self._dy)
+
+        # 2.2.2 - Filtered position, and its velocity for the extrapolation:
+        a = self._alpha(cutoff, dt)
+        self._vx = a * (x - self._x) / dt
+        self._vy = a * (y - self._y) / dt
+        self._x += self._vx * dt
+        self._y += self._vy * dt
+        self._t = t
+        return self._x, self._y
+
+    def predict(self, t):
+        if self._t is None:
+            return None, None
+        return _extrapolate(self._x, self._y, self._vx, self._vy, t - self._t)
+
+# 2.3 - Constant-velocity Kalman filter:
+class KalmanGazeFilter(object):
+    """
+    Kalman filter with a (position, velocity) state per axis and white
+    noise acceleration. Both axes get the same noise and the same updates,
+    so they share one 2x2 covariance, kept as three floats. Saccades don't
+    fit the constant velocity model: a point far outside the predicted
+    uncertainty restarts the filter from it (see SACCADE_GATE), so
+    fixations can be smoothed heavily without ringing after each saccade.
+
+    Arguments:
+        measurement_noise (float): Standard deviation of the gaze jitter, in pixels
+        acceleration_noise (float): Spectral density of the acceleration, in pixels/s^2/sqrt(Hz)
+            (higher follows changes of speed faster, lower smooths more)
+    """
+
+    __slots__ = ("r", "q", "_t", "_x", "_y", "_vx", "_vy", "_p00", "_p01", "_p11")
+
+    def __init__(self, measurement_noise=30.0, acceleration_noise=300.0):
+        self.r = measurement_noise ** 2
+        self.q = acceleration_noise ** 2
+        self.reset()
+
+    def reset(self):
+        self._t = None
+        self._x = self._y = self._vx = self._vy = 0.0
+        self._p00 = self._p01 = self._p11 = 0.0
+
+    def update(self, x, y, t):
+        dt = t - self._t if self._t is not None else 0.0
+        if self._t is None or dt > MAX_GAP:
+            # Starting at the measurement, with an unknown velocity:
+            self._t, self._x, self._y, self._vx, self._vy = t, float(x), float(y), 0.0, 0.0
+            self._p00, self._p01, self._p11 = self.r, 0.0, self.r / (MAX_GAP * MAX_GAP)
+            return self._x, self._y
+        if dt <= 0:
+            return self._x, self._y
+
+        # 2.3.1 - Prediction: P = F P F' + Q
+        p00, p01, p11 = self._p00, self._p01, self._p11
+        q = self.q
+        p00 += dt * (2.0 * p01 + dt * p11) + q * dt * dt * dt / 3.0
+        p01 += dt * p11 + q * dt * dt / 2.0
+        p11 += q * dt
+        px = self._x + self._vx * dt
+        py = self._y + self._vy * dt
+
+        # 2.3.2 - A measured point too far from the prediction is a saccade: starting again from it, instead of
+        #         smoothing it away and then overshooting:
+        s = p00 + self.r
+        ex, ey = x - px, y - py
+        if ex * ex + ey * ey > SACCADE_GATE * SACCADE_GATE * s:
+            self._t = None
+            return self.update(x, y, t)
+
+        # 2.3.3 - Correction with the measured point:
+        k0, k1 = p00 / s, p01 / s
+        self._x, self._y = px + k0 * ex, py + k0 * ey
+        self._vx += k1 * ex
+        self._vy += k1 * ey
+        self._p00, self._p01, self._p11 = (1.0 - k0) * p00, (1.0 - k0) * p01, p11 - k1 * p01
+        self._t = t
+        return self._x, self._y
+
+    def predict(self, t):
+        if self._t is None:
+            return None, None
+        return _extrapolate(self._x, self._y, self._vx, self._vy, t - self._t)
+
+
+GAZE_FILTERS = {"none": PassThroughFilter, "one_euro": OneEuroFilter, "kalman": KalmanGazeFilter}
+
+# 2.4 - A function for creating a gaze filter by name ("none", "one_euro" or "kalman"), with its parameters. A filter
+#       object is reset and returned as is, so callers can pass either:
+def make_gaze_filter(name=DEFAULT_FILTER, **parameters):
+    if not isinstance(name, str):
+        name.reset()
+        return name
+    if name not in GAZE_FILTERS:
+        raise ValueError("Unknown gaze filter: {} (expected one of {})".format(name, ", ".join(GAZE_FILTERS)))
+    return GAZE_FILTERS[name](**parameters)
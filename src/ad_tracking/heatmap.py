@@ -0,0 +1,210 @@
+# 1. Importing necessary libraries:
+import math
+import numpy as np
+import cv2
+
+# 2. Heatmap parameters matching the original full-resolution rendering:
+#    a radius-50 disc per gaze point, blurred by GaussianBlur((101, 101), 0).
+GAZE_RADIUS = 50
+GAZE_SIGMA = 0.3 * ((101 - 1) * 0.5 - 1) + 0.8  # sigma OpenCV derives from a 101 kernel
+HEATMAP_SCALE = 0.125  # heatmaps are built at 1/8 of the screen resolution
+
+# One record per gaze point: capture timestamp (s), screen position (px), weight, and the time into the ad (s):
+# the time since the ad went on screen, or for a video ad the presentation time of the frame on screen
+GAZE_DTYPE = np.dtype([("t", np.float64), ("x", np.float32), ("y", np.float32), ("w", np.float32),
+                       ("pts", np.float32)])
+
+# ------------------------
+# 3 --> Gaze point log:
+# ------------------------
+
+# 3.1 - A compact, growable log of gaze points in screen coordinates (24 bytes per point):
+class GazeLog(object):
+    """
+    Records gaze points as a compact structured array instead of drawing
+    them into a full-screen image. Heatmaps are built from it on demand.
+
+    onset is the time (same clock as the timestamps) the ad went on screen.
+    """
+
+    # Record format, subclasses may record other ones
+    dtype = GAZE_DTYPE
+
+    def __init__(self, capacity=1024, onset=0.0):
+        self._data = np.empty(capacity, self.dtype)
+        self._size = 0
+        self.onset = onset
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, needed):
+        """Grows the storage geometrically until it holds needed records"""
+        if needed > len(self._data):
+            grown = np.empty(max(needed, 2 * len(self._data), 1024), self.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+
+    def append(self, x, y, t=0.0, w=1.0, pts=None):
+        """Adds one gaze point. pts defaults to the time since the onset."""
+        self._reserve(self._size + 1)
+        self._data[self._size] = (t, x, y, w, t - self.onset if pts is None else pts)
+        self._size += 1
+
+    def extend(self, points):
+        """Adds an array of records (GAZE_DTYPE points)"""
+        points = np.asarray(points, self.dtype)
+        needed = self._size + len(points)
+        self._reserve(needed)
+        self._data[self._size:needed] = points
+        self._size = needed
+
+    @property
+    def points(self):
+        """Structured array view (fields t, x, y, w, pts for gaze points) of the recorded points"""
+        return self._data[:self._size]
+
+    def save(self, path):
+        """Saves the points as a .npy file"""
+        np.save(path, self.points)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a log saved with save() (or any .npy file of records of the log's dtype)"""
+        log = cls(capacity=0)
+        log.extend(np.load(path))
+        return log
+
+# ------------------------
+# 4 --> Heatmap building:
+# ------------------------
+
+# 4.1 - A function for binning points into a reduced-resolution grid (on-screen points only).
+#       grid_size=(width, height) forces the grid shape, e.g. to merge sessions recorded on different screens.
+def bin_points(points, screen_width, screen_height, scale=HEATMAP_SCALE, grid_size=None):
+    if grid_size is None:
+        grid_size = (max(int(round(screen_width * scale)), 1), max(int(round(screen_height * scale)), 1))
+    grid_width, grid_height = grid_size
+    points = np.asarray(points)
+    x, y, w = points["x"], points["y"], points["w"]
+
+    on_screen = (x >= 0) & (x < screen_width) & (y >= 0) & (y < screen_height)
+    cols = np.minimum((x[on_screen] * (grid_width / screen_width)).astype(np.int64), grid_width - 1)
+    rows = np.minimum((y[on_screen] * (grid_height / screen_height)).astype(np.int64), grid_height - 1)
+
+    grid = np.bincount(rows * grid_width + cols, weights=w[on_screen], minlength=grid_width * grid_height)
+    return grid.reshape(grid_height, grid_width).astype(np.float32)
+
+# 4.2 - A function for building an anti-aliased disc kernel of a (possibly fractional) radius:
+def disc_kernel(radius):
+    size = int(math.ceil(radius)) + 1
+    yy, xx = np.mgrid[-size:size + 1, -size:size + 1]
+    return np.clip(radius + 0.5 - np.hypot(xx, yy), 0, 1).astype(np.float32)
+
+# 4.3 - A function for putting a disc on every point of a binned grid. With density=False every point covers
+#       its disc once, like the original cv2.circle drawing; with density=True overlapping discs add up (weighted
+#       by the point weights). The result is linear in sessions, so per-session results can be summed.
+def spread_grid(grid, scale=HEATMAP_SCALE, radius=GAZE_RADIUS, density=False):
+    disc = disc_kernel(radius * scale)
+
+    if density:
+        return cv2.filter2D(grid, -1, disc, borderType=cv2.BORDER_CONSTANT)
+
+    covered = (grid > 0).astype(np.float32)
+    return np.minimum(cv2.filter2D(covered, -1, disc, borderType=cv2.BORDER_CONSTANT), 1)
+
+# 4.3.1 - A function for the final (separable) Gaussian blur of a spread grid:
+def blur_grid(spread, scale=HEATMAP_SCALE, sigma=GAZE_SIGMA):
+    return cv2.GaussianBlur(spread, (0, 0), sigma * scale)
+
+# 4.3.2 - A function for turning a binned grid into a heatmap: a disc per point, then the blur:
+def render_grid(grid, scale=HEATMAP_SCALE, radius=GAZE_RADIUS, sigma=GAZE_SIGMA, density=False):
+    return blur_grid(spread_grid(grid, scale, radius, density), scale, sigma)
+
+# 4.4 - A function for building a heatmap from gaze points, at a fraction of the screen resolution.
+#       display_heatmap upscales it to the ad size only for display.
+def build_heatmap(points, screen_width, screen_height, scale=HEATMAP_SCALE, density=False):
+    if isinstance(points, GazeLog):
+        points = points.points
+    grid = bin_points(points, screen_width, screen_height, scale)
+    return render_grid(grid, scale, density=density)
+
+# ------------------------
+# 5 --> Display:
+# ------------------------
+
+# 5.1 - A function for normalizing and colorizing a heatmap at size=(w, h). With low_res=True the heatmap is
+#       colorized at its own (reduced) resolution and only the colored image is upscaled, which is cheaper for
+#       frequent live refreshes.
+def colorize_heatmap(heatmap, size, low_res=False):
+    if not low_res:
+        heatmap = cv2.resize(heatmap, size)
+
+    heatmap_normalized = cv2.normalize(heatmap, None, 0, 255, cv2.NORM_MINMAX)
+    heatmap_colored = cv2.applyColorMap(heatmap_normalized.astype(np.uint8), cv2.COLORMAP_JET)
+    if low_res:
+        heatmap_colored = cv2.resize(heatmap_colored, size)
+    return heatmap_colored
+
+# 5.1.1 - A function for blending a heatmap over the ad image:
+def blend_heatmap(ad_img, heatmap, alpha=0.5, low_res=False):
+    heatmap_colored = colorize_heatmap(heatmap, (ad_img.shape[1], ad_img.shape[0]), low_res)
+    return cv2.addWeighted(ad_img, 1 - alpha, heatmap_colored, alpha, 0)
+
+# 5.2 - A heatmap that is updated in O(1) per gaze point and rendered at most every refresh_interval seconds:
+class IncrementalHeatmap(object):
+    """
+    Keeps the reduced-resolution grid of build_heatmap up to date one point
+    at a time, so a live overlay can be shown while the ad plays. Rendering
+    (disc + blur + colormap) only happens when new points arrived and
+    refresh_interval has elapsed. The colored heatmap is then blended over
+    each new ad image (e.g. video frame), and the last overlay is reused
+    while neither changes.
+    """
+
+    def __init__(self, screen_width, screen_height, scale=HEATMAP_SCALE, density=False, refresh_interval=0.25):
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.scale = scale
+        self.density = density
+        self.refresh_interval = refresh_interval
+        self.grid = bin_points(np.empty(0, GAZE_DTYPE), screen_width, screen_height, scale)
+
+        self._dirty = False
+        self._rendered_at = 0.0
+        self._colored = None
+        self._overlay = None
+        self._overlay_of = None
+
+    def add(self, x, y, w=1.0):
+        """Adds one on-screen gaze point"""
+        if 0 <= x < self.screen_width and 0 <= y < self.screen_height:
+            row = min(int(y * (self.grid.shape[0] / self.screen_height)), self.grid.shape[0] - 1)
+            col = min(int(x * (self.grid.shape[1] / self.screen_width)), self.grid.shape[1] - 1)
+            self.grid[row, col] += w
+            self._dirty = True
+
+    def heatmap(self):
+        """Returns the current heatmap, same as build_heatmap over the added points"""
+        return render_grid(self.grid, self.scale, density=self.density)
+
+    def overlay(self, ad_img, now):
+        """Returns ad_img with the heatmap blended over it, re-rendered at most
+        every refresh_interval seconds. Returns ad_img itself until a point is added.
+
+        Arguments:
+            ad_img (numpy.ndarray): Fullscreen ad image or video frame
+            now (float): Current time, in seconds
+        """
+        if self._dirty and now - self._rendered_at >= self.refresh_interval:
+            size = (ad_img.shape[1], ad_img.shape[0])
+            self._colored = colorize_heatmap(self.heatmap(), size, low_res=True)
+            self._overlay = None
+            self._rendered_at = now
+            self._dirty = False
+        if self._colored is None:
+            return ad_img
+        if self._overlay is None or self._overlay_of is not ad_img:
+            self._overlay = cv2.addWeighted(ad_img, 0.5, self._colored, 0.5, 0)
+            self._overlay_of = ad_img
+        return self._overlay
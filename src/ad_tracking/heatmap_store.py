@@ -0,0 +1,282 @@
+# 1. Importing necessary libraries:
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+import numpy as np
+
+# 2. Importing the heatmap engine:
+from ad_tracking.heatmap import GazeLog, GAZE_DTYPE, HEATMAP_SCALE, bin_points, spread_grid, blur_grid
+from ad_tracking.mapping import RATIO_DTYPE
+
+# Default location of the store, next to the ads:
+DEFAULT_STORE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "gaze_store"))
+# A writer waits at most LOCK_TIMEOUT seconds for another one; a lock older than LOCK_STALE seconds was left by a
+# writer that crashed
+LOCK_TIMEOUT = 10.0
+LOCK_STALE = 60.0
+
+# ----------------------------------------------------------------------------
+#  3. Persistent per-ad store of viewer sessions:
+#     <root>/<ad key>/index.json   - grid shape and one entry per session
+#     <root>/<ad key>/points.bin   - raw GAZE_DTYPE points of all sessions, appended
+#     <root>/<ad key>/ratios.bin   - RATIO_DTYPE tracker samples (before mapping) of the sessions that have them
+#     <root>/<ad key>/grids.bin    - one float32 accumulator grid per session, appended
+#     <root>/<ad key>/total.npy    - sum of the grids of the first index["total_sessions"] sessions
+#     <root>/<ad key>/lock         - held while a session is added
+#  The .bin files are plain arrays that are read with np.memmap. index.json and total.npy are replaced atomically,
+#  and the index is the reference: rows past it in the .bin files (from a crashed writer) are dropped by the next
+#  writer, and a total that doesn't match the index is summed again from grids.bin.
+# ----------------------------------------------------------------------------
+class HeatmapStore(object):
+    """
+    Aggregates gaze sessions per ad across many viewers. Each session keeps
+    its raw points and a partial heatmap accumulator (its disc coverage grid,
+    before the blur). Since the blur is linear, the heatmap of any subset of
+    sessions is the blur of the sum of their grids, so merging never goes
+    back to the raw samples.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+        self._keys = {}
+
+    def ad_key(self, ad_path):
+        """Returns the folder name used for an ad: its file name, made filesystem-safe, and a hash of
+        its content (of its absolute path if it can't be read), so different ads with the same file
+        name are kept apart while the same ad is found from any folder"""
+        path = os.path.abspath(ad_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        cache_key = (path, stat.st_size, stat.st_mtime_ns) if stat else (path, None, None)
+        if cache_key not in self._keys:
+            digest = hashlib.sha1()
+            try:
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+            except OSError:
+                digest.update(path.encode("utf-8"))
+            name = re.sub(r"[^A-Za-z0-9._-]", "_", os.path.basename(ad_path))
+            self._keys[cache_key] = "{}-{}".format(name, digest.hexdigest()[:12])
+        return self._keys[cache_key]
+
+    def _ad_dir(self, ad_path):
+        return os.path.join(self.root, self.ad_key(ad_path))
+
+    def _load_index(self, ad_path):
+        path = os.path.join(self._ad_dir(ad_path), "index.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_index(self, ad_path, index):
+        path = os.path.join(self._ad_dir(ad_path), "index.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(index, f)
+        os.replace(path + ".tmp", path)
+
+    @contextmanager
+    def _locked(self, ad_dir):
+        """Holds the lock of an ad folder, so concurrent writers (e.g. two kiosks sharing the store)
+        add their sessions one after the other"""
+        path = os.path.join(ad_dir, "lock")
+        deadline = time.time() + LOCK_TIMEOUT
+        while True:
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) > LOCK_STALE:
+                        os.remove(path)
+                        continue
+                except OSError:
+                    continue  # released meanwhile
+                if time.time() > deadline:
+                    raise TimeoutError("Heatmap store is locked: {}".format(path))
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            os.remove(path)
+
+    @staticmethod
+    def _append(path, data, size):
+        """Appends bytes to a file after its first size bytes, dropping anything past them.
+        Returns size, the offset the data was written at."""
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            f.truncate(size)
+            f.seek(size)
+            f.write(data)
+        return size
+
+    def _sum_grids(self, ad_path, index, count):
+        """Sums the grids of the first count sessions"""
+        shape = (index["grid_height"], index["grid_width"])
+        if count == 0:
+            return np.zeros(shape, np.float32)
+        grids = np.memmap(os.path.join(self._ad_dir(ad_path), "grids.bin"), np.float32, mode="r",
+                          shape=(count,) + shape)
+        return grids.sum(axis=0, dtype=np.float32)
+
+    def _save_total(self, ad_path, total):
+        path = os.path.join(self._ad_dir(ad_path), "total.npy")
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, total)
+        os.replace(path + ".tmp", path)
+
+    def add_session(self, ad_path, points, screen_width, screen_height, session_id=None, onset=None, ratios=None):
+        """Appends a viewer session to the store of an ad.
+
+        Arguments:
+            ad_path (str): Path of the ad the session was recorded on
+            points: GazeLog or GAZE_DTYPE array, in screen coordinates
+            screen_width, screen_height (int): Screen the ad was shown on, fullscreen
+            session_id (str): Name of the session, a random one if None
+            onset (float): Time the ad went on screen, on the clock of the points' t
+                (defaults to the onset of a GazeLog); their pts are measured from it
+            ratios: RatioLog or RATIO_DTYPE array of the session's tracker samples, kept so
+                the session can be mapped again with another calibration
+
+        Returns:
+            The session id
+        """
+        if isinstance(points, GazeLog):
+            onset = points.onset if onset is None else onset
+            points = points.points
+        points = np.ascontiguousarray(points, GAZE_DTYPE)
+        if isinstance(ratios, GazeLog):
+            ratios = ratios.points
+        ratios = np.ascontiguousarray(ratios if ratios is not None else [], RATIO_DTYPE)
+
+        ad_dir = self._ad_dir(ad_path)
+        os.makedirs(ad_dir, exist_ok=True)
+        with self._locked(ad_dir):
+            index = self._load_index(ad_path)
+            if index is None:
+                # The grid shape is fixed by the first session; later screens are binned into the same grid
+                index = {
+                    "ad": os.path.basename(ad_path),
+                    "grid_width": max(int(round(screen_width * HEATMAP_SCALE)), 1),
+                    "grid_height": max(int(round(screen_height * HEATMAP_SCALE)), 1),
+                    "sessions": [],
+                    "total_sessions": 0,
+                }
+
+            grid_size = (index["grid_width"], index["grid_height"])
+            scale = grid_size[0] / screen_width
+            grid = spread_grid(bin_points(points, screen_width, screen_height, grid_size=grid_size), scale)
+            grid = grid.astype(np.float32)
+
+            # 3.1 - The raw data first, after the rows of the indexed sessions:
+            sessions = index["sessions"]
+            offset = sum(s["count"] for s in sessions)
+            self._append(os.path.join(ad_dir, "points.bin"), points.tobytes(), offset * GAZE_DTYPE.itemsize)
+            self._append(os.path.join(ad_dir, "grids.bin"), grid.tobytes(), len(sessions) * grid.nbytes)
+            ratio_offset = sum(s.get("ratio_count", 0) for s in sessions)
+            if len(ratios):
+                self._append(os.path.join(ad_dir, "ratios.bin"), ratios.tobytes(),
+                             ratio_offset * RATIO_DTYPE.itemsize)
+
+            # 3.2 - Then the index, which makes the session visible:
+            session_id = session_id or uuid.uuid4().hex[:12]
+            sessions.append({
+                "id": session_id,
+                "created": time.time(),
+                "screen": [screen_width, screen_height],
+                "onset": onset,
+                "offset": offset,
+                "count": len(points),
+                "grid": len(sessions),
+                "ratio_offset": ratio_offset,
+                "ratio_count": len(ratios),
+            })
+            self._save_index(ad_path, index)
+
+            # 3.3 - Then the total, and the index again to record what the total includes:
+            total = self._total(ad_path, index, len(sessions) - 1) + grid
+            self._save_total(ad_path, total)
+            index["total_sessions"] = len(sessions)
+            self._save_index(ad_path, index)
+        return session_id
+
+    def _total(self, ad_path, index, count):
+        """Returns the sum of the grids of the first count sessions, from total.npy if it is up to date"""
+        path = os.path.join(self._ad_dir(ad_path), "total.npy")
+        if index.get("total_sessions") == count and os.path.exists(path):
+            return np.load(path)
+        return self._sum_grids(ad_path, index, count)
+
+    def ads(self):
+        """Returns the file names of the ads that have sessions in the store"""
+        if not os.path.isdir(self.root):
+            return []
+        names = []
+        for key in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, key, "index.json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    names.append(json.load(f)["ad"])
+        return names
+
+    def sessions(self, ad_path):
+        """Returns the session entries (id, created, screen, onset, offset, count, grid, ratio_offset,
+        ratio_count) of an ad"""
+        index = self._load_index(ad_path)
+        return [] if index is None else index["sessions"]
+
+    def _session(self, ad_path, session_id):
+        entry = next((s for s in self.sessions(ad_path) if s["id"] == session_id), None)
+        if entry is None:
+            raise KeyError(session_id)
+        return entry
+
+    def session_points(self, ad_path, session_id):
+        """Returns the raw points of one session, memory-mapped (read-only)"""
+        entry = self._session(ad_path, session_id)
+        if entry["count"] == 0:
+            return np.empty(0, GAZE_DTYPE)
+        points = np.memmap(os.path.join(self._ad_dir(ad_path), "points.bin"), GAZE_DTYPE, mode="r")
+        return points[entry["offset"]:entry["offset"] + entry["count"]]
+
+    def session_ratios(self, ad_path, session_id):
+        """Returns the tracker samples of one session (RATIO_DTYPE), memory-mapped (read-only), empty if
+        they weren't recorded. GazeMapper.map_log maps them with a new calibration."""
+        entry = self._session(ad_path, session_id)
+        count = entry.get("ratio_count", 0)
+        if count == 0:
+            return np.empty(0, RATIO_DTYPE)
+        ratios = np.memmap(os.path.join(self._ad_dir(ad_path), "ratios.bin"), RATIO_DTYPE, mode="r")
+        return ratios[entry["ratio_offset"]:entry["ratio_offset"] + count]
+
+    def accumulator(self, ad_path, session_ids=None):
+        """Returns the summed (unblurred) grid of the given sessions, all sessions if None.
+        Returns None if the ad has no sessions."""
+        index = self._load_index(ad_path)
+        if index is None or not index["sessions"]:
+            return None
+        ad_dir = self._ad_dir(ad_path)
+
+        if session_ids is None:
+            return self._total(ad_path, index, len(index["sessions"]))
+
+        shape = (index["grid_height"], index["grid_width"])
+        grids = np.memmap(os.path.join(ad_dir, "grids.bin"), np.float32, mode="r").reshape((-1,) + shape)
+        wanted = set(session_ids)
+        rows = [s["grid"] for s in index["sessions"] if s["id"] in wanted]
+        return grids[rows].sum(axis=0, dtype=np.float32) if rows else np.zeros(shape, np.float32)
+
+    def heatmap(self, ad_path, session_ids=None):
+        """Returns the merged reduced-resolution heatmap of the given sessions (all if None),
+        ready for display_heatmap, or None if the ad has no sessions."""
+        accumulated = self.accumulator(ad_path, session_ids)
+        if accumulated is None:
+            return None
+        return blur_grid(accumulated, HEATMAP_SCALE)
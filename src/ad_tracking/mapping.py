@@ -0,0 +1,126 @@
+# 1. Importing necessary libraries:
+import numpy as np
+
+# 2. Importing the gaze point format:
+from ad_tracking.heatmap import GAZE_DTYPE, GazeLog
+
+# One record per tracker sample, before mapping: timestamp (s), gaze ratios and face distance (NaN when missing),
+# and the time into the ad (pts, s). Ratios can be mapped again with any calibration: the app records them in a
+# RatioLog next to the mapped points of every ad session (see HeatmapStore.session_ratios), and the samples of
+# gaze_tracking.track_stream() are collected with ratio_array().
+RATIO_DTYPE = np.dtype([("t", np.float64), ("horizontal_ratio", np.float32), ("vertical_ratio", np.float32),
+                        ("distance", np.float32), ("pts", np.float32)])
+
+_EPSILON = np.finfo(np.float32).eps  # below this, cv2.perspectiveTransform maps a point to (0, 0)
+
+# ------------------------
+# 3 --> Gaze to screen mapping:
+# ------------------------
+
+# 3.1 - A function for collecting tracker samples (GazeSample, or anything with the same fields) into a RATIO_DTYPE
+#       array, with NaN for missing values. pts is the recording's own time:
+def ratio_array(samples):
+    return np.array([_ratio_row(s, s.timestamp or 0.0) for s in samples], RATIO_DTYPE)
+
+def _ratio_row(sample, pts):
+    return (sample.timestamp or 0.0, np.nan if sample.horizontal_ratio is None else sample.horizontal_ratio,
+            np.nan if sample.vertical_ratio is None else sample.vertical_ratio, sample.distance or np.nan, pts)
+
+# 3.1.1 - The tracker samples of a session, recorded as they come so they can be mapped again after a recalibration:
+class RatioLog(GazeLog):
+    """
+    Records every tracker sample of a session (RATIO_DTYPE), mapped or not,
+    in the same growable array as a GazeLog. GazeMapper.map_log turns them
+    into the gaze points another calibration would have recorded.
+    """
+
+    dtype = RATIO_DTYPE
+
+    def append(self, sample, pts=None):
+        """Adds a GazeSample. pts defaults to the time since the onset."""
+        self._reserve(self._size + 1)
+        timestamp = sample.timestamp or 0.0
+        self._data[self._size] = _ratio_row(sample, timestamp - self.onset if pts is None else pts)
+        self._size += 1
+
+# 3.2 - The calibration's mapping from gaze ratios to screen pixels, for single samples and whole arrays:
+class GazeMapper(object):
+    """
+    Maps gaze ratios to screen pixels with the calibration homography,
+    scaled by avg_distance / distance to compensate for the viewer moving
+    closer or further. The screen size is folded into the homography once,
+    so mapping one sample is a few float operations (no array allocation),
+    and mapping N samples is a single vectorized NumPy expression.
+
+    Arguments:
+        transformation_matrix (numpy.ndarray): 3x3 gaze-to-screen homography from the calibration
+        avg_distance (float): Average face distance during the calibration
+        screen_width, screen_height (int): Screen size, in pixels
+    """
+
+    def __init__(self, transformation_matrix, avg_distance, screen_width, screen_height):
+        self.transformation_matrix = np.asarray(transformation_matrix, dtype=np.float64)
+        self.avg_distance = float(avg_distance)
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+
+        # Homography straight to pixels: rows 0 and 1 scaled by the screen size
+        self.matrix = np.diag([screen_width, screen_height, 1.0]) @ self.transformation_matrix
+        (self._a, self._b, self._c), (self._d, self._e, self._f), (self._g, self._h, self._i) = self.matrix.tolist()
+
+    def map(self, horizontal_ratio, vertical_ratio, distance):
+        """Maps one sample to integer screen coordinates.
+
+        Returns:
+            (screen_x, screen_y), or (None, None) if a value is missing
+        """
+        if horizontal_ratio is None or vertical_ratio is None or not distance:
+            return None, None
+
+        w = self._g * horizontal_ratio + self._h * vertical_ratio + self._i
+        if abs(w) <= _EPSILON:
+            return 0, 0
+        scale = self.avg_distance / (distance * w)
+        return (int((self._a * horizontal_ratio + self._b * vertical_ratio + self._c) * scale),
+                int((self._d * horizontal_ratio + self._e * vertical_ratio + self._f) * scale))
+
+    def map_sample(self, sample):
+        """Maps a GazeSample, see map()"""
+        return self.map(sample.horizontal_ratio, sample.vertical_ratio, sample.distance)
+
+    def map_arrays(self, horizontal_ratio, vertical_ratio, distance):
+        """Maps N samples at once.
+
+        Arguments:
+            horizontal_ratio, vertical_ratio, distance (numpy.ndarray): One value per sample, NaN if missing
+
+        Returns:
+            (screen_x, screen_y) float arrays, NaN where a value was missing
+        """
+        horizontal_ratio = np.asarray(horizontal_ratio, dtype=np.float64)
+        vertical_ratio = np.asarray(vertical_ratio, dtype=np.float64)
+        distance = np.asarray(distance, dtype=np.float64)
+
+        w = self._g * horizontal_ratio + self._h * vertical_ratio + self._i
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = self.avg_distance / (distance * w)
+        scale = np.where(distance > 0, np.where(np.abs(w) <= _EPSILON, 0.0, scale), np.nan)
+        return ((self._a * horizontal_ratio + self._b * vertical_ratio + self._c) * scale,
+                (self._d * horizontal_ratio + self._e * vertical_ratio + self._f) * scale)
+
+    def map_log(self, ratios):
+        """Maps a RATIO_DTYPE array (a RatioLog's points, a stored session's
+        ratios or the ratio_array() of a recorded video analyzed with
+        track_stream) into GAZE_DTYPE points, keeping the on-screen ones only
+        (like the points recorded by show_ad, before its gaze filter)."""
+        x, y = self.map_arrays(ratios["horizontal_ratio"], ratios["vertical_ratio"], ratios["distance"])
+        x, y = np.trunc(x), np.trunc(y)  # same pixel as the int() of map()
+        on_screen = (x >= 0) & (x < self.screen_width) & (y >= 0) & (y < self.screen_height)
+
+        points = np.empty(int(on_screen.sum()), GAZE_DTYPE)
+        points["t"] = ratios["t"][on_screen]
+        points["pts"] = ratios["pts"][on_screen]
+        points["x"] = x[on_screen]
+        points["y"] = y[on_screen]
+        points["w"] = 1.0
+        return points
@@ -0,0 +1,174 @@
+# 1. Importing necessary libraries:
+import math
+import numpy as np
+import cv2
+
+# Samples of the first moments after a dot appears are dropped: the eyes are still moving to it (s)
+SETTLE_SECONDS = 0.3
+# A point is done once the standard error of its mean gaze ratio is below this on both axes, with at least
+# MIN_SAMPLES samples (about 1% of the screen, for the usual span of the ratios)
+STD_ERROR_TARGET = 0.004
+MIN_SAMPLES = 10
+# A point that hasn't converged after MAX_SECONDS of sampling is retried, up to MAX_RETRIES times
+MAX_SECONDS = 3.0
+MAX_RETRIES = 1
+# Samples further than OUTLIER_SIGMA standard deviations from the running mean are blinks or glances away.
+# The deviation has a floor of MIN_STD, so that a few very close first samples don't reject everything after them
+OUTLIER_SIGMA = 3.0
+MIN_STD = 0.01
+# Scale of the median absolute deviation to a standard deviation, for normally distributed samples
+MAD_SCALE = 1.4826
+# Reprojection threshold of the robust homography fit, as a fraction of the screen
+RANSAC_THRESHOLD = 0.05
+
+# ------------------------
+# 2 --> Adaptive sampling of a calibration point:
+# ------------------------
+
+# 2.1 - Running estimate of the gaze ratios while the viewer looks at one calibration dot:
+class PointSampler(object):
+    """
+    Keeps the running mean and variance (Welford's algorithm) of the gaze
+    ratios and face distance of one calibration point, in O(1) per sample.
+    Outliers are rejected against the running estimate, and the point has
+    converged once its mean is known precisely enough, so a steady viewer
+    is done in well under a second while a noisy one is sampled longer.
+
+    The estimate is seeded with the median and MAD of the first
+    min_samples / 2 samples, so a glance away among them can't become the
+    reference every later sample is rejected against. If min_samples
+    samples in a row are still rejected, the gaze has moved: the estimate
+    is seeded again from them.
+
+    Arguments:
+        std_error_target (float): Standard error of the mean ratios to reach
+        min_samples (int): Minimum number of accepted samples
+        outlier_sigma (float): Rejection threshold, in standard deviations
+    """
+
+    def __init__(self, std_error_target=STD_ERROR_TARGET, min_samples=MIN_SAMPLES, outlier_sigma=OUTLIER_SIGMA):
+        self.std_error_target = std_error_target
+        self.min_samples = min_samples
+        self.outlier_sigma = outlier_sigma
+        self.reset()
+
+    def reset(self):
+        """Forgets every sample, e.g. to retry a point"""
+        self.count = 0
+        self.rejected = 0
+        self._clear()
+
+    def _clear(self):
+        """Forgets the running estimate, but not the rejection count"""
+        self.count = 0
+        self._mean_h = self._mean_v = self._mean_distance = 0.0
+        self._m2_h = self._m2_v = 0.0
+        self._pending = [] # samples waiting for the seed, then the rejected samples in a row
+
+    @property
+    def seed_size(self):
+        """Number of samples the estimate is seeded from"""
+        return max(self.min_samples // 2, 2)
+
+    def _seed(self, samples):
+        """Starts the estimate from the samples close to their median, counts the others as rejected"""
+        ratios = np.array([sample[:2] for sample in samples])
+        median = np.median(ratios, axis=0)
+        mad = MAD_SCALE * np.median(np.abs(ratios - median), axis=0)
+        inliers = np.all(np.abs(ratios - median) <= self.outlier_sigma * np.maximum(mad, MIN_STD), axis=1)
+        self._clear()
+        self.rejected += int(np.count_nonzero(~inliers))
+        for sample, inlier in zip(samples, inliers):
+            if inlier:
+                self._update(*sample)
+
+    def _is_outlier(self, horizontal_ratio, vertical_ratio):
+        """True if a sample is too far from the running mean"""
+        std_h, std_v = self.std
+        limit_h = self.outlier_sigma * max(std_h, MIN_STD)
+        limit_v = self.outlier_sigma * max(std_v, MIN_STD)
+        return abs(horizontal_ratio - self._mean_h) > limit_h or abs(vertical_ratio - self._mean_v) > limit_v
+
+    def add(self, horizontal_ratio, vertical_ratio, distance):
+        """
+        Adds one sample. Returns False if it was rejected as an outlier
+        (samples kept for the seed are accepted until the seed is taken)
+        """
+        sample = (horizontal_ratio, vertical_ratio, distance)
+        if self.count == 0:
+            self._pending.append(sample)
+            if len(self._pending) >= self.seed_size:
+                self._seed(self._pending)
+            return True
+
+        if self._is_outlier(horizontal_ratio, vertical_ratio):
+            self.rejected += 1
+            self._pending.append(sample)
+            if len(self._pending) >= self.min_samples:
+                # The viewer has been looking elsewhere all along: start over from where they look now, and count
+                # the samples of the old estimate as rejected instead
+                self.rejected += self.count - len(self._pending)
+                self._seed(self._pending)
+            return False
+
+        self._pending = []
+        self._update(horizontal_ratio, vertical_ratio, distance)
+        return True
+
+    def _update(self, horizontal_ratio, vertical_ratio, distance):
+        """Welford update of the running estimate with an accepted sample"""
+        self.count += 1
+        delta_h = horizontal_ratio - self._mean_h
+        delta_v = vertical_ratio - self._mean_v
+        self._mean_h += delta_h / self.count
+        self._mean_v += delta_v / self.count
+        self._m2_h += delta_h * (horizontal_ratio - self._mean_h)
+        self._m2_v += delta_v * (vertical_ratio - self._mean_v)
+        self._mean_distance += (distance - self._mean_distance) / self.count
+
+    @property
+    def mean(self):
+        """Mean (horizontal_ratio, vertical_ratio) of the accepted samples"""
+        return self._mean_h, self._mean_v
+
+    @property
+    def distance(self):
+        """Mean face distance of the accepted samples"""
+        return self._mean_distance
+
+    @property
+    def std(self):
+        """Standard deviation of the ratios, per axis"""
+        if self.count < 2:
+            return math.inf, math.inf
+        return math.sqrt(self._m2_h / (self.count - 1)), math.sqrt(self._m2_v / (self.count - 1))
+
+    @property
+    def std_error(self):
+        """Standard error of the mean ratios, the larger of the two axes"""
+        return max(self.std) / math.sqrt(self.count) if self.count >= 2 else math.inf
+
+    def converged(self):
+        """True once there are enough samples and the mean is precise enough"""
+        return self.count >= self.min_samples and self.std_error <= self.std_error_target
+
+# ------------------------
+# 3 --> Robust calibration fit:
+# ------------------------
+
+# 3.1 - A function for fitting the gaze-to-screen homography while ignoring the calibration points that don't agree
+#       with the others (a glance away, a tracking glitch). Points are (N, 2) arrays, screen points as fractions of
+#       the screen. Returns (matrix, inlier mask), (None, None) if it can't be fitted.
+def fit_homography(gaze_points, screen_points, threshold=RANSAC_THRESHOLD):
+    gaze_points = np.asarray(gaze_points, dtype=np.float32)
+    screen_points = np.asarray(screen_points, dtype=np.float32)
+    if len(gaze_points) < 4:
+        return None, None
+
+    # 3.1.1 - RANSAC needs a spare point to reject anything, with exactly 4 the plain fit is the same
+    method = cv2.RANSAC if len(gaze_points) > 4 else 0
+    matrix, mask = cv2.findHomography(gaze_points, screen_points, method, threshold)
+    if matrix is None:
+        return None, None
+    inliers = mask.ravel().astype(bool) if mask is not None else np.ones(len(gaze_points), dtype=bool)
+    return matrix, inliers
@@ -0,0 +1,84 @@
+# 1. Importing necessary libraries:
+import os
+import re
+import time
+import zipfile
+from collections import namedtuple
+import numpy as np
+
+# Default location of the saved profiles, next to the ads:
+DEFAULT_PROFILE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "calibration_profiles"))
+# Beyond this many profiles, the ones saved longest ago are deleted
+MAX_PROFILES = 100
+
+# Everything a calibration produces: the gaze-to-screen homography (in screen fractions, so it doesn't depend on the
+# screen resolution), the average face distance, and the pupil thresholds learned by gaze_tracking.Calibration.
+CalibrationProfile = namedtuple("CalibrationProfile", ["name", "transformation_matrix", "avg_distance",
+                                                       "thresholds_left", "thresholds_right", "created"])
+
+# ------------------------
+# 2 --> Profile store:
+# ------------------------
+
+# 2.1 - A function for building a profile from a finished calibration (a GazeTracking and its results):
+def make_profile(name, transformation_matrix, avg_distance, gaze_tracking):
+    calibration = gaze_tracking.calibration
+    return CalibrationProfile(name, np.asarray(transformation_matrix, dtype=np.float64), float(avg_distance),
+                              list(calibration.thresholds_left), list(calibration.thresholds_right), time.time())
+
+# 2.2 - A function for giving a new profile a default name:
+def default_profile_name():
+    return time.strftime("viewer-%Y%m%d-%H%M%S")
+
+# 2.3 - A function for getting the file of a profile: one small .npz per profile, named after it:
+def profile_path(name, root=DEFAULT_PROFILE_DIR):
+    return os.path.join(root, re.sub(r"[^A-Za-z0-9._-]", "_", name) + ".npz")
+
+# 2.4 - A function for saving a profile, replacing the one with the same name (the oldest profiles beyond
+#       MAX_PROFILES are deleted):
+def save_profile(profile, root=DEFAULT_PROFILE_DIR, max_profiles=MAX_PROFILES):
+    os.makedirs(root, exist_ok=True)
+    path = profile_path(profile.name, root)
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, name=profile.name, transformation_matrix=profile.transformation_matrix,
+                 avg_distance=profile.avg_distance, created=profile.created,
+                 thresholds_left=np.asarray(profile.thresholds_left, dtype=np.int16),
+                 thresholds_right=np.asarray(profile.thresholds_right, dtype=np.int16))
+    os.replace(path + ".tmp", path)
+    for name in list_profiles(root)[max_profiles:]:
+        os.remove(profile_path(name, root))
+    return path
+
+# 2.5 - A function for loading a profile by name, None if there is none:
+def load_profile(name, root=DEFAULT_PROFILE_DIR):
+    path = profile_path(name, root)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return CalibrationProfile(str(data["name"]), data["transformation_matrix"], float(data["avg_distance"]),
+                                  data["thresholds_left"].tolist(), data["thresholds_right"].tolist(),
+                                  float(data["created"]))
+
+# 2.6 - A function for listing the saved profile names, most recently saved first. Files that can't be read (e.g.
+#       truncated) are skipped:
+def list_profiles(root=DEFAULT_PROFILE_DIR):
+    if not os.path.isdir(root):
+        return []
+    profiles = []
+    for f in os.listdir(root):
+        if not f.endswith(".npz"):
+            continue
+        try:
+            profile = load_profile(os.path.splitext(f)[0], root)
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as error:
+            print(f"Skipping unreadable calibration profile {f}: {error}")
+            continue
+        if profile is not None:
+            profiles.append(profile)
+    return [p.name for p in sorted(profiles, key=lambda p: p.created, reverse=True)]
+
+# 2.7 - A function for restoring the pupil thresholds of a profile into a tracker, so it doesn't need to learn them:
+def apply_profile(profile, gaze_tracking):
+    if profile.thresholds_left and profile.thresholds_right:
+        gaze_tracking.calibration.seed(profile.thresholds_left, profile.thresholds_right)
+    return gaze_tracking
@@ -0,0 +1,129 @@
+# 1. Importing necessary libraries:
+import hashlib
+import os
+import threading
+import cv2
+
+# 2. Importing the video ad helpers:
+from ad_tracking.video_ad import is_video, read_frame_at
+
+# Thumbnail size and on-disk cache location, next to the ads:
+THUMB_SIZE = (300, 200)
+DEFAULT_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "thumbnails"))
+
+# Reduced JPEG decoding modes (the image is downscaled by 2, 4 or 8 while decoding), from the smallest:
+_REDUCED_MODES = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+# ------------------------
+# 3 --> Thumbnail building:
+# ------------------------
+
+# 3.1 - A function for reading the size of a JPEG image from its header (SOF segment), without decoding it.
+#       Returns None if the file is not a JPEG:
+def jpeg_size(path):
+    with open(path, "rb") as f:
+        if f.read(2) != b"\xff\xd8":
+            return None
+        while True:
+            marker = f.read(4)
+            if len(marker) < 4 or marker[0] != 0xFF:
+                return None
+            length = int.from_bytes(marker[2:4], "big")
+            # Start of frame markers, except DHT (C4), JPG (C8) and DAC (CC):
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                header = f.read(5)
+                return int.from_bytes(header[3:5], "big"), int.from_bytes(header[1:3], "big")
+            f.seek(length - 2, 1)
+
+# 3.1.1 - A function for decoding an image at the smallest reduced resolution that is still at least size (the
+#         JPEG decoder downscales by 2, 4 or 8 while decoding). Returns None if it can't be read.
+def decode_reduced(path, size=THUMB_SIZE):
+    try:
+        image_size = jpeg_size(path)
+    except OSError:
+        return None
+
+    if image_size is not None:
+        for factor, mode in _REDUCED_MODES:
+            if image_size[0] // factor >= size[0] and image_size[1] // factor >= size[1]:
+                return cv2.imread(path, mode)
+    return cv2.imread(path)
+
+# 3.2 - A function for building the thumbnail of an image, or of the first frame of a video ad:
+def make_thumbnail(path, size=THUMB_SIZE):
+    img = read_frame_at(path) if is_video(path) else decode_reduced(path, size)
+    if img is None:
+        return None
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+# 3.3 - Thumbnails cached on disk, keyed by image path, modification time and size:
+class ThumbnailCache(object):
+    """
+    Keeps the thumbnails of the ads on disk, so an image is only decoded
+    again when it changes. A background thread builds the thumbnails that
+    were asked for, most recent request first, and get() never blocks: the
+    picker shows a placeholder until a thumbnail is ready.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, size=THUMB_SIZE):
+        self.cache_dir = cache_dir
+        self.size = size
+        self._thumbnails = {}
+        self._pending = []
+        self._wanted = set()
+        self._condition = threading.Condition()
+        self._thread = None
+        self.version = 0  # incremented whenever a thumbnail is loaded, to know when to redraw
+
+    def cache_path(self, path):
+        """Returns the cache file of an image's current version"""
+        stat = os.stat(path)
+        key = "{}|{}|{}|{}x{}".format(os.path.abspath(path), stat.st_mtime_ns, stat.st_size, *self.size)
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".jpg")
+
+    def load(self, path):
+        """Returns the thumbnail of an image, from the disk cache or built (and cached) now.
+        Returns None if the image can't be read."""
+        try:
+            cache_path = self.cache_path(path)
+        except OSError:
+            return None
+
+        thumbnail = cv2.imread(cache_path) if os.path.exists(cache_path) else None
+        if thumbnail is None:
+            thumbnail = make_thumbnail(path, self.size)
+            if thumbnail is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                cv2.imwrite(cache_path + ".tmp.jpg", thumbnail)
+                os.replace(cache_path + ".tmp.jpg", cache_path)
+        return thumbnail
+
+    def get(self, path):
+        """Returns the thumbnail if it is loaded, None otherwise (see request())"""
+        with self._condition:
+            return self._thumbnails.get(path)
+
+    def request(self, paths):
+        """Loads the given thumbnails in the background, replacing the previous
+        request (e.g. when the picker changes page). Thumbnails that are not
+        requested anymore are dropped from memory, they stay in the disk cache."""
+        with self._condition:
+            self._wanted = set(paths)
+            self._thumbnails = {p: t for p, t in self._thumbnails.items() if p in self._wanted}
+            self._pending = [p for p in paths if p not in self._thumbnails]
+            if self._pending and self._thread is None:
+                self._thread = threading.Thread(target=self._loader, daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def _loader(self):
+        """Builds the requested thumbnails one by one, then waits for the next request"""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+                path = self._pending.pop(0)
+            thumbnail = self.load(path)
+            with self._condition:
+                if path in self._wanted:
+                    self._thumbnails[path] = thumbnail
+                    self.version += 1
@@ -0,0 +1,171 @@
+# 1. Importing necessary libraries:
+import os
+import queue
+import threading
+from collections import deque
+import numpy as np
+import cv2
+
+# 2. Importing the heatmap engine:
+from ad_tracking.heatmap import GazeLog, HEATMAP_SCALE, build_heatmap
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm")
+
+# ------------------------
+# 3 --> Video ad decoding:
+# ------------------------
+
+# 3.1 - A function for telling video ads from image ads:
+def is_video(path):
+    return os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS
+
+# 3.2 - A function for reading the frame of a video shown at a presentation time (s), resized to size=(w, h) if
+#       given. Used for thumbnails and to show a segment's heatmap. Returns None past the end of the video.
+def read_frame_at(path, pts=0.0, size=None):
+    video = cv2.VideoCapture(path)
+    try:
+        if pts:
+            video.set(cv2.CAP_PROP_POS_MSEC, pts * 1000)
+        ret, frame = video.read()
+    finally:
+        video.release()
+    if not ret:
+        return None
+    return cv2.resize(frame, size, interpolation=cv2.INTER_AREA) if size else frame
+
+# 3.3 - A video ad decoded ahead of playback into a small bounded queue:
+class VideoAdReader(object):
+    """
+    Decodes a video ad on a background thread and resizes its frames to the
+    screen. At most queue_size frames are decoded ahead, so memory stays
+    bounded whatever the length of the video, and decoding never blocks
+    the display loop.
+
+    Frames are timestamped like gaze_tracking.read_frames: their
+    presentation time is index / fps, in seconds.
+    """
+
+    def __init__(self, path, screen_width, screen_height, queue_size=8):
+        self.path = path
+        self.size = (screen_width, screen_height)
+        self._video = cv2.VideoCapture(path)
+        if not self._video.isOpened():
+            raise IOError("Could not open video file: {}".format(path))
+        self.fps = self._video.get(cv2.CAP_PROP_FPS) or 30.0
+        self._frames = queue.Queue(maxsize=queue_size)
+        self._running = False
+        self._thread = None
+        self._upcoming = None
+        self.finished = False
+
+    def start(self):
+        """Starts decoding in the background"""
+        self._running = True
+        self._thread = threading.Thread(target=self._decode, daemon=True)
+        self._thread.start()
+        return self
+
+    def _decode(self):
+        """Decodes and resizes frames until the end of the video, waiting while the queue is full"""
+        index = 0
+        while self._running:
+            ret, frame = self._video.read()
+            if not ret:
+                break
+            self._put((index / self.fps, cv2.resize(frame, self.size, interpolation=cv2.INTER_LINEAR)))
+            index += 1
+        self._put(None)  # end of the video
+
+    def _put(self, item):
+        """Queues an item, waiting for room unless the reader is stopped"""
+        while self._running:
+            try:
+                self._frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def read(self, timeout=None):
+        """Returns the next (pts, frame), or None at the end of the video.
+
+        Argument:
+            timeout (float): Maximum time to wait for a frame, None to wait until one is decoded
+                and 0 not to wait. Raises queue.Empty when it expires.
+        """
+        if self.finished:
+            return None
+        item = self._frames.get(block=timeout != 0, timeout=timeout or None)
+        if item is None:
+            self.finished = True
+        return item
+
+    def next_due(self, elapsed):
+        """Returns the (pts, frame) to show after elapsed seconds of playback: the
+        last decoded frame whose pts has passed, skipping older ones that are due
+        too. Returns None if no new frame is due (or decoded) yet."""
+        due = None
+        while not self.finished:
+            if self._upcoming is None:
+                try:
+                    self._upcoming = self.read(timeout=0)
+                except queue.Empty:
+                    break
+                if self._upcoming is None:
+                    break
+            if self._upcoming[0] > elapsed:
+                break
+            due, self._upcoming = self._upcoming, None
+        return due
+
+    def stop(self):
+        """Stops decoding and closes the video"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._video.release()
+
+# 3.4 - Which ad frame was on screen at a given time:
+class PresentationClock(object):
+    """
+    Records when each ad frame was shown, so that a gaze sample can be
+    tagged with the presentation time of the frame on screen when its
+    camera frame was captured. Only the last history frames are kept,
+    enough to cover the latency of the gaze pipeline.
+    """
+
+    def __init__(self, history=256):
+        self._shown = deque(maxlen=history)
+
+    def shown(self, wall_time, pts):
+        """Records that the frame at pts went on screen at wall_time"""
+        self._shown.append((wall_time, pts))
+
+    def pts_at(self, wall_time):
+        """Returns the pts of the frame on screen at wall_time, or None if no frame was shown yet"""
+        for shown_at, pts in reversed(self._shown):
+            if shown_at <= wall_time:
+                return pts
+        return None
+
+# ------------------------
+# 4 --> Time-sliced heatmaps:
+# ------------------------
+
+# 4.1 - A function for building one heatmap per segment of segment_seconds of the ad, from gaze points tagged with
+#       presentation times (pts). Only the points are needed, no decoded frame. Yields (start, end, heatmap).
+def segment_heatmaps(points, screen_width, screen_height, segment_seconds=2.0, duration=None,
+                     scale=HEATMAP_SCALE, density=False):
+    if isinstance(points, GazeLog):
+        points = points.points
+    points = np.sort(np.asarray(points), order="pts")
+    if duration is None:
+        duration = float(points["pts"][-1]) if len(points) else 0.0
+
+    nb_segments = max(int(np.ceil(duration / segment_seconds)), 1)
+    edges = np.arange(nb_segments + 1) * segment_seconds
+    bounds = np.searchsorted(points["pts"], edges, side="left")
+    bounds[-1] = len(points)  # the last segment includes the end of the ad
+    for i in range(nb_segments):
+        segment = points[bounds[i]:bounds[i + 1]]
+        yield edges[i], edges[i + 1], build_heatmap(segment, screen_width, screen_height, scale, density)
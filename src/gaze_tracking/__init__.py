@@ -1 +1,3 @@
-from .gaze_tracking import GazeTracking
+from .gaze_tracking import GazeTracking, detection_scale_for
+from .sample import GazeSample
+from .stream import read_frames, track_stream
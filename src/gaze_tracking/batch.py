@@ -0,0 +1,132 @@
+from __future__ import division
+import multiprocessing
+from collections import namedtuple
+import cv2
+from . import models
+from .gaze_tracking import GazeTracking
+from .stream import read_frames, track_stream
+
+
+# One shard is a range [start, end) of frame indices of a video
+Shard = namedtuple("Shard", ["path", "start", "end", "thresholds"])
+
+# Tracker of the current worker process, loaded once by _init_worker
+_worker_tracker = None
+
+
+def _init_worker():
+    """Loads one GazeTracking (and its landmark predictor) per worker process.
+    Face ROI tracking is disabled: with it, the face rectangles (and so the
+    landmarks) would depend on the frame where each shard starts."""
+    global _worker_tracker
+    _worker_tracker = GazeTracking(face_tracking=False)
+    models.face_detector()
+    models.shape_predictor()
+
+
+def _calibrate_video(path, max_frames=600):
+    """Measures the pupil thresholds on the first frames of a video, the
+    same way a single pass over the video would.
+
+    Arguments:
+        path (str): Path of the video file
+        max_frames (int): Stop looking for a face after this many frames
+
+    Returns:
+        (thresholds_left, thresholds_right), both empty if the calibration
+        couldn't be completed (no face on enough of the frames)
+    """
+    tracker = _worker_tracker
+    tracker.reset()
+
+    for _, frame in read_frames(path, end=max_frames):
+        tracker.refresh(frame)
+        if tracker.calibration.is_complete():
+            return tracker.calibration.thresholds_left, tracker.calibration.thresholds_right
+
+    return [], []
+
+
+def _track_shard(shard):
+    """Analyzes one shard with a tracker seeded with the video's thresholds,
+    so the samples don't depend on where the shard starts.
+
+    Argument:
+        shard (Shard): Frames to analyze
+
+    Returns:
+        The list of GazeSample of the shard, in frame order
+    """
+    tracker = _worker_tracker
+    tracker.reset()
+    thresholds_left, thresholds_right = shard.thresholds
+    if thresholds_left and thresholds_right:
+        tracker.calibration.seed(thresholds_left, thresholds_right)
+
+    return list(track_stream(shard.path, tracker, start=shard.start, end=shard.end))
+
+
+def plan_shards(paths, shard_seconds=60.0):
+    """Splits videos into shards of about shard_seconds each.
+
+    Arguments:
+        paths (list): Paths of the video files
+        shard_seconds (float): Approximate duration of a shard
+
+    Returns:
+        A list of (path, start, end) tuples, in order. The frame count of a
+        video is only an estimate, so the last shard of each video has no
+        end and reads up to its last frame
+    """
+    ranges = []
+    for path in paths:
+        video = cv2.VideoCapture(path)
+        if not video.isOpened():
+            raise IOError("Could not open video file: {}".format(path))
+        fps = video.get(cv2.CAP_PROP_FPS) or 30.0
+        nb_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+        video.release()
+
+        length = max(int(round(shard_seconds * fps)), 1)
+        starts = range(0, max(nb_frames, 1), length)
+        for start in starts:
+            ranges.append((path, start, start + length if start != starts[-1] else None))
+
+    return ranges
+
+
+def track_videos(paths, processes=None, shard_seconds=60.0):
+    """Analyzes recorded sessions in parallel. Each video is cut in shards
+    that are spread across a process pool, and the samples are merged back
+    in order.
+
+    The pupil thresholds are first measured on the start of each video,
+    then every shard of that video is seeded with them, and faces are
+    detected on every frame, so the samples don't depend on the sharding.
+    A video whose calibration can't be completed at its start (no face on
+    enough frames) is analyzed in a single shard instead, as thresholds
+    measured by each shard would depend on where the shards start.
+
+    Arguments:
+        paths (list): Paths of the video files
+        processes (int): Number of worker processes, defaults to the number of cores
+        shard_seconds (float): Approximate duration of a shard
+
+    Yields:
+        (path, GazeSample) pairs, video by video and in frame order
+    """
+    paths = list(paths)
+    ranges = plan_shards(paths, shard_seconds)
+
+    with multiprocessing.Pool(processes, initializer=_init_worker) as pool:
+        thresholds = dict(zip(paths, pool.map(_calibrate_video, paths)))
+        shards = []
+        for path, start, end in ranges:
+            if thresholds[path][0]:
+                shards.append(Shard(path, start, end, thresholds[path]))
+            elif start == 0:
+                shards.append(Shard(path, 0, None, thresholds[path]))
+
+        for shard, samples in zip(shards, pool.imap(_track_shard, shards)):
+            for sample in samples:
+                yield shard.path, sample
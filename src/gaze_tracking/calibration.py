@@ -1,5 +1,6 @@
 from __future__ import division
 import cv2
+import numpy as np
 from .pupil import Pupil
 
 
@@ -14,6 +15,17 @@ class Calibration(object):
         self.thresholds_left = []
         self.thresholds_right = []
 
+    def seed(self, thresholds_left, thresholds_right):
+        """Replaces the calibration state with thresholds measured elsewhere,
+        e.g. on the start of a recording that is analyzed in shards.
+
+        Arguments:
+            thresholds_left (list): Thresholds found for the left eye
+            thresholds_right (list): Thresholds found for the right eye
+        """
+        self.thresholds_left = list(thresholds_left)
+        self.thresholds_right = list(thresholds_right)
+
     def is_complete(self):
         """Returns true if the calibration is completed"""
         return len(self.thresholds_left) >= self.nb_frames and len(self.thresholds_right) >= self.nb_frames
@@ -52,14 +64,18 @@ class Calibration(object):
             eye_frame (numpy.ndarray): Frame of the eye to be analyzed
         """
         average_iris_size = 0.48
-        trials = {}
+        thresholds = np.arange(5, 100, 5)
 
-        for threshold in range(5, 100, 5):
-            iris_frame = Pupil.image_processing(eye_frame, threshold)
-            trials[threshold] = Calibration.iris_size(iris_frame)
+        # A pixel is black after binarization when its filtered value is
+        # <= threshold, so one cumulative histogram of the filtered frame
+        # gives the iris size for every candidate threshold at once
+        filtered = Pupil.filter_eye(eye_frame)[5:-5, 5:-5]
+        nb_pixels = filtered.size
+        nb_blacks = np.cumsum(np.bincount(filtered.ravel(), minlength=256))[thresholds]
+        trials = nb_blacks / nb_pixels
 
-        best_threshold, iris_size = min(trials.items(), key=(lambda p: abs(p[1] - average_iris_size)))
-        return best_threshold
+        best_threshold = thresholds[np.argmin(np.abs(trials - average_iris_size))]
+        return int(best_threshold)
 
     def evaluate(self, eye_frame, side):
         """Improves calibration by taking into consideration the
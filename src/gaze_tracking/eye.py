@@ -1,9 +1,14 @@
 import math
+import threading
 import numpy as np
 import cv2
 from .pupil import Pupil
 
 
+# Per-thread scratch buffers reused by Eye._isolate
+_scratch = threading.local()
+
+
 class Eye(object):
     """
     This class creates a new frame to isolate the eye and
@@ -22,6 +27,23 @@ class Eye(object):
 
         self._analyze(original_frame, landmarks, side, calibration)
 
+    @staticmethod
+    def _scratch_mask(height, width):
+        """Returns a reusable (height, width) uint8 buffer for the eye mask.
+        The buffer is kept per thread and only grows when a bigger eye box
+        shows up, so masking an eye doesn't allocate on every frame.
+
+        Arguments:
+            height (int): Height of the eye box
+            width (int): Width of the eye box
+        """
+        size = max(height, 0) * max(width, 0)
+        buffer = getattr(_scratch, "mask", None)
+        if buffer is None or buffer.size < size:
+            buffer = np.empty(max(size, 4096), np.uint8)
+            _scratch.mask = buffer
+        return buffer[:size].reshape(max(height, 0), max(width, 0))
+
     @staticmethod
     def _middle_point(p1, p2):
         """Returns the middle point (x,y) between two points
@@ -46,21 +68,22 @@ class Eye(object):
         region = region.astype(np.int32)
         self.landmark_points = region
 
-        # Applying a mask to get only the eye
-        height, width = frame.shape[:2]
-        black_frame = np.zeros((height, width), np.uint8)
-        mask = np.full((height, width), 255, np.uint8)
-        cv2.fillPoly(mask, [region], (0, 0, 0))
-        eye = cv2.bitwise_not(black_frame, frame.copy(), mask=mask)
-
-        # Cropping on the eye
+        # Cropping on the eye, clamped to the frame
         margin = 5
-        min_x = np.min(region[:, 0]) - margin
-        max_x = np.max(region[:, 0]) + margin
-        min_y = np.min(region[:, 1]) - margin
-        max_y = np.max(region[:, 1]) + margin
-
-        self.frame = eye[min_y:max_y, min_x:max_x]
+        height, width = frame.shape[:2]
+        min_x = max(int(np.min(region[:, 0])) - margin, 0)
+        max_x = min(int(np.max(region[:, 0])) + margin, width)
+        min_y = max(int(np.min(region[:, 1])) - margin, 0)
+        max_y = min(int(np.max(region[:, 1])) + margin, height)
+
+        # Applying a mask to get only the eye, on the cropped box only
+        mask = self._scratch_mask(max_y - min_y, max_x - min_x)
+        mask.fill(255)
+        cv2.fillPoly(mask, [region - np.int32((min_x, min_y))], 0)
+        eye = frame[min_y:max_y, min_x:max_x].copy()
+        cv2.bitwise_or(eye, mask, dst=eye)
+
+        self.frame = eye
         self.origin = (min_x, min_y)
 
         height, width = self.frame.shape[:2]
@@ -1,9 +1,29 @@
 from __future__ import division
-import os
+import time
 import cv2
 import dlib
+import numpy as np
+from . import models
 from .eye import Eye
 from .calibration import Calibration
+from .sample import GazeSample
+
+# Width faces are detected at: dlib finds faces down to about 80 pixels wide, which a viewer in front of the screen
+# still is on a 640 pixels wide frame, and the detector's cost grows with the number of pixels
+DETECTION_WIDTH = 640
+
+
+def detection_scale_for(frame_width, detection_width=DETECTION_WIDTH):
+    """Returns the detection_scale that brings frames of the given width
+    down to detection_width (1.0 for smaller frames, or an unknown width)
+
+    Arguments:
+        frame_width (int): Width of the camera frames, in pixels
+        detection_width (int): Width to detect faces at
+    """
+    if not frame_width or frame_width <= detection_width:
+        return 1.0
+    return detection_width / frame_width
 
 
 class GazeTracking(object):
@@ -13,39 +33,126 @@ class GazeTracking(object):
     and pupils and allows to know if the eyes are open or closed
     """
 
-    def __init__(self):
+    def __init__(self, face_tracking=True, redetect_interval=10, roi_margin=0.5, detection_scale=1.0):
         self.frame = None
         self.eye_left = None
         self.eye_right = None
         self.calibration = Calibration()
 
-        # _face_detector is used to detect faces
-        self._face_detector = dlib.get_frontal_face_detector()
+        # sample holds every value derived from the last analyzed frame
+        self.sample = GazeSample.empty()
 
-        # _predictor is used to get facial landmarks of a given face
-        cwd = os.path.abspath(os.path.dirname(__file__))
-        model_path = os.path.abspath(os.path.join(cwd, "trained_models/shape_predictor_68_face_landmarks.dat"))
-        self._predictor = dlib.shape_predictor(model_path)
+        # Face ROI tracking: the last face rectangle is remembered and the
+        # detector only searches an enlarged region around it, falling back
+        # to a full-frame detection every redetect_interval frames or when
+        # the face is lost
+        self.face_tracking = face_tracking
+        self.redetect_interval = redetect_interval
+        self.roi_margin = roi_margin
+        self._face = None
+        self._frames_since_detection = 0
+
+        # Faces can be detected on a downscaled copy of the frame (e.g. 0.5,
+        # see detection_scale_for), landmarks and pupils are still computed
+        # at full resolution
+        self.detection_scale = detection_scale
+
+    @property
+    def _face_detector(self):
+        """dlib face detector, shared by the whole process (see models.py)"""
+        return models.face_detector()
+
+    @property
+    def _predictor(self):
+        """Facial landmarks predictor, loaded once per process on first use
+        (see models.py)"""
+        return models.shape_predictor()
 
     @property
     def pupils_located(self):
         """Check that the pupils have been located"""
-        try:
-            int(self.eye_left.pupil.x)
-            int(self.eye_left.pupil.y)
-            int(self.eye_right.pupil.x)
-            int(self.eye_right.pupil.y)
-            return True
-        except Exception:
-            return False
+        return self.sample.pupil_left is not None
+
+    def _search_region(self, frame):
+        """Returns the (left, top, right, bottom) region around the last
+        known face where the detector should look, or None when a
+        full-frame detection is due.
+
+        Argument:
+            frame (numpy.ndarray): Grayscale frame being analyzed
+        """
+        if not self.face_tracking or self._face is None:
+            return None
+        if self._frames_since_detection >= self.redetect_interval:
+            return None
+
+        height, width = frame.shape[:2]
+        face = self._face
+        margin_x = int(face.width() * self.roi_margin)
+        margin_y = int(face.height() * self.roi_margin)
+        left = max(face.left() - margin_x, 0)
+        top = max(face.top() - margin_y, 0)
+        right = min(face.right() + margin_x, width)
+        bottom = min(face.bottom() + margin_y, height)
+
+        if right <= left or bottom <= top:
+            return None
+        return (left, top, right, bottom)
+
+    def _run_detector(self, image):
+        """Runs the face detector, on a copy of the image downscaled by
+        detection_scale if it is below 1, and returns the face rectangles
+        in the coordinates of the given image.
+
+        Argument:
+            image (numpy.ndarray): Grayscale image to search
+        """
+        scale = self.detection_scale
+        if scale >= 1:
+            return self._face_detector(image)
+
+        small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return [dlib.rectangle(int(face.left() / scale), int(face.top() / scale),
+                               int(face.right() / scale), int(face.bottom() / scale))
+                for face in self._face_detector(small)]
+
+    def _detect_face(self, frame):
+        """Returns the rectangle of the first face found in the frame, or None.
+        When tracking, only the region around the previous face is searched,
+        and a full-frame detection is only run periodically or when the face
+        is lost.
+
+        Argument:
+            frame (numpy.ndarray): Grayscale frame being analyzed
+        """
+        region = self._search_region(frame)
+
+        if region is not None:
+            left, top, right, bottom = region
+            roi = np.ascontiguousarray(frame[top:bottom, left:right])
+            faces = self._run_detector(roi)
+            if len(faces) > 0:
+                self._frames_since_detection += 1
+                self._face = dlib.translate_rect(faces[0], dlib.point(left, top))
+                return self._face
+
+        faces = self._run_detector(frame)
+        self._frames_since_detection = 0
+        self._face = faces[0] if len(faces) > 0 else None
+        return self._face
 
     def _analyze(self):
         """Detects the face and initialize Eye objects"""
         frame = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
-        faces = self._face_detector(frame)
+        face = self._detect_face(frame)
+
+        if face is None:
+            self.eye_left = None
+            self.eye_right = None
+            return
 
         try:
-            landmarks = self._predictor(frame, faces[0])
+            landmarks = self._predictor(frame, face)
             self.eye_left = Eye(frame, landmarks, 0, self.calibration)
             self.eye_right = Eye(frame, landmarks, 1, self.calibration)
 
@@ -53,69 +160,74 @@ class GazeTracking(object):
             self.eye_left = None
             self.eye_right = None
 
-    def refresh(self, frame):
+    def reset(self):
+        """Forgets everything learned from previous frames: the pupil
+        calibration and the tracked face region.
+        """
+        self.frame = None
+        self.eye_left = None
+        self.eye_right = None
+        self.calibration = Calibration()
+        self.sample = GazeSample.empty()
+        self._face = None
+        self._frames_since_detection = 0
+
+    def refresh(self, frame, timestamp=None):
         """Refreshes the frame and analyzes it.
 
         Arguments:
             frame (numpy.ndarray): The frame to analyze
+            timestamp (float): Capture time of the frame, defaults to now
         """
         self.frame = frame
         self._analyze()
+        if timestamp is None:
+            timestamp = time.time()
+        self.sample = GazeSample.from_eyes(self.eye_left, self.eye_right, timestamp)
 
     def pupil_left_coords(self):
         """Returns the coordinates of the left pupil"""
-        if self.pupils_located:
-            x = self.eye_left.origin[0] + self.eye_left.pupil.x
-            y = self.eye_left.origin[1] + self.eye_left.pupil.y
-            return (x, y)
+        return self.sample.pupil_left
 
     def pupil_right_coords(self):
         """Returns the coordinates of the right pupil"""
-        if self.pupils_located:
-            x = self.eye_right.origin[0] + self.eye_right.pupil.x
-            y = self.eye_right.origin[1] + self.eye_right.pupil.y
-            return (x, y)
+        return self.sample.pupil_right
 
     def horizontal_ratio(self):
         """Returns a number between 0.0 and 1.0 that indicates the
         horizontal direction of the gaze. The extreme right is 0.0,
         the center is 0.5 and the extreme left is 1.0
         """
-        if self.pupils_located:
-            pupil_left = self.eye_left.pupil.x / (self.eye_left.center[0] * 2 - 10)
-            pupil_right = self.eye_right.pupil.x / (self.eye_right.center[0] * 2 - 10)
-            return (pupil_left + pupil_right) / 2
+        return self.sample.horizontal_ratio
 
     def vertical_ratio(self):
         """Returns a number between 0.0 and 1.0 that indicates the
         vertical direction of the gaze. The extreme top is 0.0,
         the center is 0.5 and the extreme bottom is 1.0
         """
-        if self.pupils_located:
-            pupil_left = self.eye_left.pupil.y / (self.eye_left.center[1] * 2 - 10)
-            pupil_right = self.eye_right.pupil.y / (self.eye_right.center[1] * 2 - 10)
-            return (pupil_left + pupil_right) / 2
+        return self.sample.vertical_ratio
 
     def is_right(self):
         """Returns true if the user is looking to the right"""
-        if self.pupils_located:
-            return self.horizontal_ratio() <= 0.35
+        ratio = self.sample.horizontal_ratio
+        if ratio is not None:
+            return ratio <= 0.35
 
     def is_left(self):
         """Returns true if the user is looking to the left"""
-        if self.pupils_located:
-            return self.horizontal_ratio() >= 0.65
+        ratio = self.sample.horizontal_ratio
+        if ratio is not None:
+            return ratio >= 0.65
 
     def is_center(self):
         """Returns true if the user is looking to the center"""
-        if self.pupils_located:
-            return self.is_right() is not True and self.is_left() is not True
+        ratio = self.sample.horizontal_ratio
+        if ratio is not None:
+            return 0.35 < ratio < 0.65
 
     def is_blinking(self):
         """Returns true if the user closes his eyes"""
-        if self.pupils_located:
-            blinking_ratio = (self.eye_left.blinking + self.eye_right.blinking) / 2
-            return blinking_ratio > 3.8
+        return self.sample.blinking
 
     def annotated_frame(self):
         """Returns the main frame with pupils highlighted"""
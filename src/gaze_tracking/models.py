@@ -0,0 +1,57 @@
+import os
+import threading
+import dlib
+
+
+# Models shared by every GazeTracking of the process, loaded at most once
+_models = {}
+_lock = threading.Lock()
+
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "trained_models"))
+
+
+def _load(name, loader):
+    """Returns the cached model called name, loading it with loader()
+    the first time. Concurrent callers wait for the same load.
+
+    Arguments:
+        name (str): Key of the model in the cache
+        loader (callable): Builds the model
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(name)
+        if model is None:
+            model = loader()
+            _models[name] = model
+        return model
+
+
+def face_detector():
+    """Returns the process-wide dlib frontal face detector"""
+    return _load("face_detector", dlib.get_frontal_face_detector)
+
+
+def shape_predictor():
+    """Returns the process-wide 68 landmarks shape predictor"""
+    model_path = os.path.join(MODELS_DIR, "shape_predictor_68_face_landmarks.dat")
+    return _load("shape_predictor", lambda: dlib.shape_predictor(model_path))
+
+
+def preload():
+    """Starts loading the models in a background thread, so they are ready
+    by the time the first frame is analyzed.
+
+    Returns:
+        The loading thread
+    """
+    def load_all():
+        face_detector()
+        shape_predictor()
+
+    thread = threading.Thread(target=load_all, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,222 @@
+from __future__ import division
+import heapq
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+from . import models
+from .gaze_tracking import GazeTracking
+from .sample import GazeSample
+
+# Maximum time for the workers to load the face models, in seconds
+READY_TIMEOUT = 60
+# The app runs threads (camera reader, model preloading, ad decoding) when the
+# workers start: forking it could copy locks they hold into the workers, so
+# they start from a fresh interpreter instead
+START_METHOD = "spawn"
+
+
+def _worker_loop(frames, results, thresholds, detection_scale=1.0):
+    """Body of an analysis worker process: analyzes (index, timestamp, frame)
+    items until it receives None.
+
+    Arguments:
+        frames (multiprocessing.Queue): Frames to analyze
+        results (multiprocessing.Queue): Where (index, GazeSample) pairs are sent
+        thresholds (tuple): (thresholds_left, thresholds_right) to seed the
+            pupil calibration with, or None
+        detection_scale (float): Scale faces are detected at (see GazeTracking)
+    """
+    tracker = GazeTracking(detection_scale=detection_scale)
+    if thresholds is not None:
+        tracker.calibration.seed(*thresholds)
+    models.face_detector()
+    models.shape_predictor()
+    results.put(None)
+
+    while True:
+        item = frames.get()
+        if item is None:
+            break
+        index, timestamp, frame = item
+        # Every index must come back, or the in-order delivery would wait for it forever
+        try:
+            tracker.refresh(frame, timestamp)
+            sample = tracker.sample
+        except Exception:
+            traceback.print_exc()
+            sample = GazeSample.empty(timestamp)
+        results.put((index, sample))
+
+
+class GazePipeline(object):
+    """
+    Runs the gaze tracker as a pipeline: a capture thread reads and
+    timestamps frames, a pool of worker processes analyzes them in
+    parallel, and the samples are handed back in capture order.
+    When the workers fall behind, new frames are dropped instead of queued
+    so samples never lag far behind the camera.
+    """
+
+    def __init__(self, webcam, calibration=None, workers=2, max_pending=None, detection_scale=1.0):
+        """
+        Arguments:
+            webcam (cv2.VideoCapture): Source of the frames, anything with read()
+                or read_stamped()
+            calibration (calibration.Calibration): Completed pupil calibration
+                to share with the workers, if any
+            workers (int): Number of analysis processes
+            max_pending (int): Frames in flight before capture starts dropping,
+                defaults to two per worker
+            detection_scale (float): Scale the workers detect faces at, usually
+                the one of the tracker the pipeline stands in for
+        """
+        self.webcam = webcam
+        self.workers = workers
+        self.detection_scale = detection_scale
+        self.max_pending = max_pending or 2 * workers
+        self.dropped = 0
+
+        self._thresholds = None
+        if calibration is not None and calibration.is_complete():
+            self._thresholds = (calibration.thresholds_left, calibration.thresholds_right)
+
+        self._frames = None
+        self._results = None
+        self._processes = []
+        self._thread = None
+        self._stop = threading.Event()
+        self._sent = 0
+        self._next = 0
+        self._pending = []
+
+    @property
+    def running(self):
+        """True while the capture thread is reading frames"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Starts the workers, waits until their models are loaded, then
+        starts capturing."""
+        context = multiprocessing.get_context(START_METHOD)
+        self._frames = context.Queue()
+        self._results = context.Queue()
+        for _ in range(self.workers):
+            process = context.Process(
+                target=_worker_loop, args=(self._frames, self._results, self._thresholds, self.detection_scale),
+                daemon=True)
+            process.start()
+            self._processes.append(process)
+
+        # A worker that dies while loading the models (e.g. a missing model
+        # file) never reports ready: give up instead of waiting forever
+        ready = 0
+        deadline = time.time() + READY_TIMEOUT
+        while ready < self.workers:
+            try:
+                self._results.get(timeout=0.1)
+                ready += 1
+            except queue.Empty:
+                if not all(p.is_alive() for p in self._processes) or time.time() > deadline:
+                    self._stop_workers()
+                    raise RuntimeError("Gaze analysis workers failed to start")
+
+        self._sent = 0
+        self._next = 0
+        self._pending = []
+        self.dropped = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._thread.start()
+
+    def _capture_loop(self):
+        """Reads frames as fast as the camera delivers them"""
+        read_stamped = getattr(self.webcam, "read_stamped", None)
+        while not self._stop.is_set():
+            # Cameras that know when a frame was captured (utils.camera_utils.SharedCamera)
+            # stamp it themselves
+            if read_stamped is not None:
+                ret, timestamp, frame = read_stamped()
+            else:
+                ret, frame = self.webcam.read()
+                timestamp = time.time()
+            if not ret:
+                break
+
+            if self._sent - self._next >= self.max_pending:
+                self.dropped += 1
+                continue
+
+            self._frames.put((self._sent, timestamp, frame))
+            self._sent += 1
+
+    def samples(self):
+        """Returns the samples analyzed since the last call, in capture
+        order. Never blocks."""
+        while True:
+            try:
+                heapq.heappush(self._pending, self._results.get_nowait())
+            except queue.Empty:
+                break
+
+        ready = []
+        while self._pending and self._pending[0][0] == self._next:
+            ready.append(heapq.heappop(self._pending)[1])
+            self._next += 1
+        return ready
+
+    def drain(self, timeout=1.0):
+        """Stops capturing and returns the samples of the frames still in
+        flight, in capture order. Gives up on those not analyzed within
+        timeout seconds. The workers keep running until stop()."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        ready = []
+        deadline = time.time() + timeout
+        while self._next < self._sent and time.time() < deadline:
+            samples = self.samples()
+            if not samples:
+                time.sleep(0.005)
+            ready.extend(samples)
+        return ready
+
+    def stop(self):
+        """Stops capturing and shuts the workers down. Samples still in
+        flight are discarded (see drain())."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._stop_workers()
+
+    def _stop_workers(self):
+        """Asks the workers to exit, terminating those that don't"""
+        for _ in self._processes:
+            self._frames.put(None)
+
+        # Workers can't exit while their results are stuck in the queue
+        deadline = time.time() + 5
+        while any(p.is_alive() for p in self._processes) and time.time() < deadline:
+            try:
+                self._results.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        self._processes = []
+
+        self._frames.cancel_join_thread()
+        self._results.cancel_join_thread()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
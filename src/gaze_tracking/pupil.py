@@ -16,6 +16,23 @@ class Pupil(object):
 
         self.detect_iris(eye_frame)
 
+    @staticmethod
+    def filter_eye(eye_frame):
+        """Smooths the eye frame before binarization. This step doesn't
+        depend on the threshold, so it can be shared between thresholds.
+
+        Argument:
+            eye_frame (numpy.ndarray): Frame containing an eye and nothing else
+
+        Returns:
+            The filtered eye frame
+        """
+        kernel = np.ones((3, 3), np.uint8)
+        new_frame = cv2.bilateralFilter(eye_frame, 10, 15, 15)
+        new_frame = cv2.erode(new_frame, kernel, iterations=3)
+
+        return new_frame
+
     @staticmethod
     def image_processing(eye_frame, threshold):
         """Performs operations on the eye frame to isolate the iris
@@ -27,9 +44,7 @@ class Pupil(object):
         Returns:
             A frame with a single element representing the iris
         """
-        kernel = np.ones((3, 3), np.uint8)
-        new_frame = cv2.bilateralFilter(eye_frame, 10, 15, 15)
-        new_frame = cv2.erode(new_frame, kernel, iterations=3)
+        new_frame = Pupil.filter_eye(eye_frame)
         new_frame = cv2.threshold(new_frame, threshold, 255, cv2.THRESH_BINARY)[1]
 
         return new_frame
@@ -0,0 +1,61 @@
+from __future__ import division
+import math
+from collections import namedtuple
+
+
+class GazeSample(namedtuple("GazeSample", [
+        "timestamp", "horizontal_ratio", "vertical_ratio",
+        "pupil_left", "pupil_right", "blinking", "distance"])):
+    """
+    Compact, immutable result of analyzing one frame. GazeTracking builds
+    one per refresh(), so every derived value is computed once per frame.
+    Fields are None when the pupils couldn't be located on that frame.
+
+    Fields:
+        timestamp (float): Time of the frame, in seconds
+        horizontal_ratio (float): See GazeTracking.horizontal_ratio()
+        vertical_ratio (float): See GazeTracking.vertical_ratio()
+        pupil_left (tuple): (x, y) of the left pupil in the frame
+        pupil_right (tuple): (x, y) of the right pupil in the frame
+        blinking (bool): True if the eyes are closed
+        distance (float): Distance between the pupils, in pixels
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def empty(cls, timestamp=None):
+        """Returns the sample of a frame where the pupils weren't located"""
+        return cls(timestamp, None, None, None, None, None, None)
+
+    @classmethod
+    def from_eyes(cls, eye_left, eye_right, timestamp):
+        """Computes the sample from the two analyzed eyes.
+
+        Arguments:
+            eye_left (eye.Eye): Left eye, or None
+            eye_right (eye.Eye): Right eye, or None
+            timestamp (float): Time of the frame, in seconds
+        """
+        try:
+            left_x, left_y = int(eye_left.pupil.x), int(eye_left.pupil.y)
+            right_x, right_y = int(eye_right.pupil.x), int(eye_right.pupil.y)
+        except Exception:
+            return cls.empty(timestamp)
+
+        pupil_left = (eye_left.origin[0] + left_x, eye_left.origin[1] + left_y)
+        pupil_right = (eye_right.origin[0] + right_x, eye_right.origin[1] + right_y)
+
+        try:
+            horizontal_ratio = (left_x / (eye_left.center[0] * 2 - 10) + right_x / (eye_right.center[0] * 2 - 10)) / 2
+            vertical_ratio = (left_y / (eye_left.center[1] * 2 - 10) + right_y / (eye_right.center[1] * 2 - 10)) / 2
+        except ZeroDivisionError:
+            return cls.empty(timestamp)
+
+        if eye_left.blinking is None or eye_right.blinking is None:
+            blinking = None
+        else:
+            blinking = (eye_left.blinking + eye_right.blinking) / 2 > 3.8
+
+        distance = math.hypot(pupil_left[0] - pupil_right[0], pupil_left[1] - pupil_right[1])
+        return cls(timestamp, horizontal_ratio, vertical_ratio, pupil_left, pupil_right, blinking, distance)
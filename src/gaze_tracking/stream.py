@@ -0,0 +1,64 @@
+from __future__ import division
+import itertools
+import cv2
+from .gaze_tracking import GazeTracking
+
+
+def read_frames(source, fps=30.0, start=0, end=None):
+    """Yields (timestamp, frame) pairs, one frame at a time.
+
+    Arguments:
+        source: Path of a video file, or an iterable of frames or of
+            (timestamp, frame) pairs
+        fps (float): Frame rate used to timestamp bare frames, and video
+            files that don't report one
+        start (int): Index of the first frame to read
+        end (int): Index after the last frame to read, None for all frames
+    """
+    if isinstance(source, str):
+        video = cv2.VideoCapture(source)
+        if not video.isOpened():
+            raise IOError("Could not open video file: {}".format(source))
+
+        video_fps = video.get(cv2.CAP_PROP_FPS) or fps
+        if start:
+            video.set(cv2.CAP_PROP_POS_FRAMES, start)
+        index = start
+        try:
+            while end is None or index < end:
+                ret, frame = video.read()
+                if not ret:
+                    break
+                yield index / video_fps, frame
+                index += 1
+        finally:
+            video.release()
+        return
+
+    for index, item in enumerate(itertools.islice(source, start, end), start):
+        if isinstance(item, tuple):
+            yield item
+        else:
+            yield index / fps, item
+
+
+def track_stream(source, gaze_tracking=None, fps=30.0, start=0, end=None):
+    """Runs the gaze tracker over a recorded video or a frame iterator,
+    without any camera or display. Frames are analyzed one by one and
+    dropped, so memory use doesn't grow with the length of the recording.
+
+    Arguments:
+        source: Path of a video file, or an iterable of frames or of
+            (timestamp, frame) pairs
+        gaze_tracking (GazeTracking): Tracker to use, a new one is created if None
+        fps, start, end: See read_frames()
+
+    Yields:
+        One GazeSample per frame
+    """
+    if gaze_tracking is None:
+        gaze_tracking = GazeTracking()
+
+    for timestamp, frame in read_frames(source, fps, start, end):
+        gaze_tracking.refresh(frame, timestamp)
+        yield gaze_tracking.sample
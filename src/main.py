@@ -1,21 +1,97 @@
 # 1. Importing necessary libraries and modules:
+import os
 import cv2
 import numpy as np
-from gaze_tracking import GazeTracking
-from ad_tracking.calibrate import run_calibration
+from gaze_tracking import GazeTracking, detection_scale_for, models
+from ad_tracking.calibrate import run_calibration, validate_profile
+from ad_tracking.profiles import default_profile_name, list_profiles, load_profile
 from ad_tracking.ad import choose_ad, show_ad, display_heatmap
+from ad_tracking.heatmap import GazeLog
+from ad_tracking.heatmap_store import HeatmapStore
+from ad_tracking.mapping import RatioLog
 from ad_tracking.camera import show_live_coordinates
-from utils.ui_utils import get_screen_resolution, show_menu_screen, show_message_screen
+from utils.ui_utils import ask_text, get_screen_resolution, show_menu_screen, show_message_screen
+from utils.camera_utils import get_camera, close_camera
+
+# With face tracking, one worker analyzes a frame in less than a 30 fps frame period; a second one absorbs the
+# periodic full-frame face detections
+MAX_ANALYSIS_WORKERS = 2
+
+# Menu actions, so the choice doesn't depend on which buttons are shown
+CALIBRATE, LIVE, AD, AD_LIVE, PROFILES = range(5)
+
+# Page buttons of the profile picker (profile names are strings)
+PREVIOUS_PAGE, NEXT_PAGE = range(2)
+PROFILES_PER_PAGE = 5
+
+# 2.0.1 - Let the viewer pick one of the saved calibration profiles (most recent first), one page at a time
+def choose_profile(screen_width, screen_height, names):
+    page = 0
+    nb_pages = (len(names) + PROFILES_PER_PAGE - 1) // PROFILES_PER_PAGE
+    while True:
+        visible = names[page * PROFILES_PER_PAGE:(page + 1) * PROFILES_PER_PAGE]
+        title = ["Saved calibration profiles", "", "Pick your profile: a quick check replaces the full calibration."]
+        if nb_pages > 1:
+            title.append(f"Page {page + 1}/{nb_pages}")
+        buttons = [(name if len(name) <= 16 else name[:15] + "~", (660, 320 + i * 120)) for i, name in enumerate(visible)]
+        actions = list(visible)
+        if page > 0:
+            buttons.append(("< Previous", (200, 930)))
+            actions.append(PREVIOUS_PAGE)
+        if page < nb_pages - 1:
+            buttons.append(("Next >", (1120, 930)))
+            actions.append(NEXT_PAGE)
+
+        choice = show_menu_screen(screen_width, screen_height, title, buttons, show_home_button=True)
+        if choice is None or choice < 0:
+            return choice
+        if actions[choice] == PREVIOUS_PAGE:
+            page -= 1
+        elif actions[choice] == NEXT_PAGE:
+            page += 1
+        else:
+            return actions[choice]
+
+# 2.0.2 - Let the viewer name the profile a calibration is saved as. Typing the name of a saved profile replaces it;
+#         an empty name gets a default one. Returns None on ESC.
+def ask_profile_name(screen_width, screen_height, names):
+    title = ["Name your calibration profile", "",
+             "Type a name you will recognize, or the name of your saved profile to replace it.",
+             "Press Enter to continue, ESC to go back."]
+
+    def note(text):
+        if text in names:
+            return "Replaces the saved profile " + text
+        return "" if text else "Leave empty for a default name"
+
+    name = ask_text(screen_width, screen_height, title, note=note)
+    if name is None:
+        return None
+    return name.strip() or default_profile_name()
 
 def main():
+    # 2.0 - Start loading the face models in the background while the menu is shown
+    models.preload()
+
     # 2.1 - Get screen resolution for fullscreen display
     screen_width, screen_height = get_screen_resolution()
 
-    # 2.2 - Initialize the gaze tracking object and calibration variables
-    gaze_tracking = GazeTracking()
+    # 2.1.1 - Number of gaze analysis processes used while an ad plays (0 = analyze on the display thread). They are
+    #         started before every ad and each loads the ~100 MB face model, so no more than the camera needs
+    analysis_workers = min(max((os.cpu_count() or 1) - 2, 0), MAX_ANALYSIS_WORKERS)
+
+    # 2.1.2 - Open the shared webcam now, so it warms up while the menu is shown
+    webcam = get_camera()
+
+    # 2.2 - Initialize the gaze tracking object and calibration variables. Faces are detected on a downscaled copy of
+    #       the frames of high-resolution cameras (landmarks and pupils still use the full frame)
+    gaze_tracking = GazeTracking(detection_scale=detection_scale_for(webcam.frame_size()[0]))
     transformation_matrix = None
     avg_distance = None
 
+    # 2.2.1 - Per-ad store aggregating the gaze sessions of all viewers
+    heatmap_store = HeatmapStore()
+
     # 2.3 - Create a fullscreen window for consistent display
     cv2.namedWindow("Gaze Tracker", cv2.WINDOW_NORMAL)
     cv2.setWindowProperty("Gaze Tracker", cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
@@ -35,21 +111,31 @@ def main():
             "Calibrate Gaze: Setup your eyes so tracking is accurate.",
             "Live Camera Mode: See real-time gaze tracking.",
             "Ad + Heatmap: Watch an ad and generate a gaze heatmap.",
+            "Ad + Live Heatmap: Watch the heatmap build up over the ad while it plays.",
             "",
             "Choose one of the options below to get started."
         ]
 
-        # 3.3 - Menu buttons: Only show all options after calibration
+        # 3.3 - Menu buttons: Only show all options after calibration, and saved profiles when there are some
+        profile_names = list_profiles()
         if not calibrated:
             buttons = [("Calibrate Gaze", (550, 650))]
-            enabled_flags = [True]
+            actions = [CALIBRATE]
+            if profile_names:
+                buttons.append(("Saved Profiles", (550, 800)))
+                actions.append(PROFILES)
         else:
             buttons = [
                 ("Calibrate Gaze", (200, 600)),
                 ("Live Camera Mode", (900, 600)),
                 ("Ad + Heatmap", (200, 750)),
+                ("Ad + Live Heatmap", (900, 750)),
             ]
-            enabled_flags = [True, True, True]
+            actions = [CALIBRATE, LIVE, AD, AD_LIVE]
+            if profile_names:
+                buttons.append(("Saved Profiles", (550, 900)))
+                actions.append(PROFILES)
+        enabled_flags = [True] * len(buttons)
 
         # 3.4 - Display the interactive menu screen and get user's choice
         choice = show_menu_screen(
@@ -60,13 +146,44 @@ def main():
             show_home_button=False,
             enabled=enabled_flags
         )
+        if choice is not None and choice >= 0:
+            choice = actions[choice]
 
         # 4. Calibrate Gaze option
-        if choice == 0:
-            transformation_matrix, avg_distance, gaze_tracking = run_calibration(window_name="Gaze Tracker")
+        if choice == CALIBRATE:
+            name = ask_profile_name(screen_width, screen_height, profile_names)
+            if name is None:
+                continue
+            transformation_matrix, avg_distance, gaze_tracking = run_calibration(
+                window_name="Gaze Tracker", profile_name=name)
+
+        # 4.1 - Saved profile: reuse it if a quick validation passes, otherwise calibrate again under its name
+        elif choice == PROFILES:
+            name = choose_profile(screen_width, screen_height, profile_names)
+            if name == -1:
+                break
+            elif name is None or name == -2:
+                continue
+
+            # 4.1.1 - The profile may have been deleted since the menu listed it
+            profile = load_profile(name)
+            if profile is None:
+                print(f"Profile {name} is no longer available.")
+                continue
+
+            # 4.1.2 - ESC during the validation goes back to the menu
+            ok, _, profile_tracking = validate_profile(profile, screen_width, screen_height, window_name="Gaze Tracker")
+            if ok is None:
+                continue
+            elif ok:
+                transformation_matrix, avg_distance = profile.transformation_matrix, profile.avg_distance
+                gaze_tracking = profile_tracking
+            else:
+                transformation_matrix, avg_distance, gaze_tracking = run_calibration(
+                    window_name="Gaze Tracker", profile_name=name)
 
         # 5. Live Camera Mode
-        elif choice == 1:
+        elif choice == LIVE:
             result = show_live_coordinates(
                 gaze_tracking,
                 screen_width,
@@ -80,8 +197,8 @@ def main():
             elif result == -2:  # User chose to return to menu
                 continue
 
-        # 6. Ad + Heatmap mode
-        elif choice == 2:
+        # 6. Ad + Heatmap mode (with the heatmap blended over the ad while it plays for Ad + Live Heatmap)
+        elif choice in (AD, AD_LIVE):
             # 6.1 - Show ad selection screen
             ad_path = choose_ad(screen_width, screen_height, window_name="Gaze Tracker")
 
@@ -93,7 +210,10 @@ def main():
             elif ad_path == -2:
                 continue
 
-            # 6.3 - Show ad and collect gaze heatmap
+            # 6.3 - Show ad and collect gaze heatmap (the raw gaze points are kept in gaze_log, and the tracker samples
+            #       before mapping in ratio_log, so the session can be mapped again after a recalibration)
+            gaze_log = GazeLog()
+            ratio_log = RatioLog()
             heatmap = show_ad(
                 ad_path,
                 gaze_tracking,
@@ -101,7 +221,11 @@ def main():
                 screen_height,
                 transformation_matrix,
                 avg_distance,
-                window_name="Gaze Tracker"
+                window_name="Gaze Tracker",
+                workers=analysis_workers,
+                gaze_log=gaze_log,
+                live_overlay=(choice == AD_LIVE),
+                ratio_log=ratio_log
             )
 
             # 6.4 - Handle interruptions during ad playback
@@ -111,15 +235,31 @@ def main():
                 elif heatmap == -2:
                     continue
             else:
-                # 6.5 - Display resulting heatmap on top of ad
+                # 6.5 - Add the session to the ad's multi-viewer store, then display this viewer's heatmap on top of ad
+                try:
+                    heatmap_store.add_session(ad_path, gaze_log, screen_width, screen_height, ratios=ratio_log)
+                except TimeoutError as error:
+                    print(f"Session not stored: {error}")
                 display_heatmap(heatmap, ad_path, screen_width, screen_height)
 
+                # 6.6 - Offer the merged heatmap of every viewer of this ad
+                nb_sessions = len(heatmap_store.sessions(ad_path))
+                if nb_sessions:
+                    title = ["Your heatmap is saved.", "", f"{nb_sessions} viewing session(s) recorded for this ad."]
+                    choice = show_menu_screen(screen_width, screen_height, title, [("All Viewers", (650, 500))],
+                                              show_home_button=True)
+                    if choice == -1:
+                        break
+                    elif choice == 0:
+                        display_heatmap(heatmap_store.heatmap(ad_path), ad_path, screen_width, screen_height)
+
         # 7. Exit button clicked or menu closed
         elif choice == -1 or choice is None:
             print("Exit button clicked. Closing application...")
             break
 
     # 8. Clean up windows and resources
+    close_camera()
     cv2.destroyAllWindows()
 
 # 9. Entry point
@@ -0,0 +1,125 @@
+"""Renders gaze heatmaps over ads as PNG files, without opening any window.
+
+    python src/render_heatmaps.py --out reports data/ad1.jpg=logs/s1.npy data/ad2.jpg=logs/s2.npy
+    python src/render_heatmaps.py --out reports --store    # merged heatmap of every ad in the store
+    python src/render_heatmaps.py --out reports --sessions # one heatmap per viewer session in the store
+
+The app records every viewer session in the heatmap store. Gaze logs are
+.npy files saved with GazeLog.save(), in screen coordinates of a --screen
+sized display. Images are rendered in a process pool.
+"""
+# 1. Importing necessary libraries and modules:
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import cv2
+from ad_tracking.fixations import detect_fixations
+from ad_tracking.heatmap import GazeLog, blend_heatmap, build_heatmap
+from ad_tracking.heatmap_store import DEFAULT_STORE_DIR, HeatmapStore
+from ad_tracking.video_ad import is_video, read_frame_at
+
+# 2.1 - Each worker uses one OpenCV thread, the pool provides the parallelism
+def init_worker():
+    cv2.setNumThreads(1)
+
+# 2.2 - Render one job: (ad path, gaze log path, store session id, screen size, options, output path). With neither
+#       a log nor a session, the merged heatmap of the store is rendered.
+def render_job(job):
+    ad_path, log_path, session_id, screen_size, options, out_path = job
+    ad_img = read_frame_at(ad_path) if is_video(ad_path) else cv2.imread(ad_path)  # first frame of a video ad
+    if ad_img is None:
+        return out_path, "could not read {}".format(ad_path)
+
+    # 2.2.1 - The heatmap of the gaze log or stored session (optionally of its fixations), or the merged one of
+    #         the store
+    if log_path is None and session_id is None:
+        heatmap = HeatmapStore(options["store"]).heatmap(ad_path)
+        if heatmap is None:
+            return out_path, "no sessions stored for {}".format(ad_path)
+    else:
+        if log_path is not None:
+            points = GazeLog.load(log_path).points
+        else:
+            points = HeatmapStore(options["store"]).session_points(ad_path, session_id)
+        density = options["density"]
+        if options["fixations"]:
+            points, density = detect_fixations(points), True
+        heatmap = build_heatmap(points, screen_size[0], screen_size[1], density=density)
+
+    # 2.2.2 - Same normalize/colormap/blend as display_heatmap, at the ad's own resolution
+    blended = blend_heatmap(ad_img, heatmap, alpha=options["alpha"])
+    cv2.imwrite(out_path, blended, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    return out_path, None
+
+# 3. Parse "ad=log" pairs, or list the ads (and sessions) of the store. Stored sessions keep their own screen size
+def plan_jobs(args):
+    options = {"store": args.store_dir, "density": args.density, "fixations": args.fixations, "alpha": args.alpha}
+    jobs = []
+
+    store = HeatmapStore(args.store_dir)
+    for name in store.ads() if args.store or args.sessions else []:
+        ad_path = os.path.join(args.ads, name)
+        stem = os.path.splitext(name)[0]
+        if args.store:
+            jobs.append((ad_path, None, None, args.screen, options, os.path.join(args.out, stem + "_heatmap.png")))
+        if args.sessions:
+            for session in store.sessions(ad_path):
+                out_name = "{}_{}_heatmap.png".format(stem, session["id"])
+                jobs.append((ad_path, None, session["id"], tuple(session["screen"]), options,
+                             os.path.join(args.out, out_name)))
+
+    for pair in args.pairs:
+        ad_path, sep, log_path = pair.partition("=")
+        if not sep:
+            raise ValueError("expected AD=LOG, got {}".format(pair))
+        out_name = "{}_{}_heatmap.png".format(os.path.splitext(os.path.basename(ad_path))[0],
+                                              os.path.splitext(os.path.basename(log_path))[0])
+        jobs.append((ad_path, log_path, None, args.screen, options, os.path.join(args.out, out_name)))
+
+    return jobs
+
+def parse_screen(value):
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pairs", nargs="*", metavar="AD=LOG", help="ad image and gaze log (.npy) pairs")
+    parser.add_argument("--out", required=True, help="output folder")
+    parser.add_argument("--store", action="store_true", help="also render the merged heatmap of every stored ad")
+    parser.add_argument("--sessions", action="store_true", help="also render a heatmap per stored viewer session")
+    parser.add_argument("--store-dir", default=DEFAULT_STORE_DIR, help="heatmap store folder")
+    parser.add_argument("--ads", default=os.path.dirname(DEFAULT_STORE_DIR), help="folder of the stored ads")
+    parser.add_argument("--screen", type=parse_screen, default=(1920, 1080), help="screen the logs were recorded on, WxH")
+    parser.add_argument("--density", action="store_true", help="overlapping gaze points add up")
+    parser.add_argument("--fixations", action="store_true", help="use duration-weighted fixations instead of raw points")
+    parser.add_argument("--alpha", type=float, default=0.5, help="heatmap opacity")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes, defaults to the number of cores")
+    args = parser.parse_args()
+
+    # 4. Plan the jobs
+    try:
+        jobs = plan_jobs(args)
+    except ValueError as error:
+        parser.error(str(error))
+    if not jobs:
+        parser.error("nothing to render: give AD=LOG pairs, --store or --sessions")
+    os.makedirs(args.out, exist_ok=True)
+
+    # 5. Render them in parallel
+    start = time.time()
+    failed = 0
+    with multiprocessing.Pool(args.processes, initializer=init_worker) as pool:
+        for out_path, error in pool.imap_unordered(render_job, jobs):
+            if error:
+                failed += 1
+                print("Skipped {}: {}".format(out_path, error))
+    print("Rendered {} heatmaps in {:.1f}s".format(len(jobs) - failed, time.time() - start))
+    if failed:
+        sys.exit(1)
+
+# 6. Entry point
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import threading
+import time
+import cv2
+
+# ---------------------------------------------------------------
+# 1. A webcam that stays open for the app's lifetime
+# ---------------------------------------------------------------
+class SharedCamera(object):
+    """
+    Keeps one cv2.VideoCapture open and a background thread reading from it,
+    so the latest frame is always available. Modes don't pay the camera
+    open/auto-exposure warm-up anymore and never wait on a stale driver buffer.
+
+    read() has the same signature as cv2.VideoCapture.read(): it returns the
+    newest frame the calling thread hasn't seen yet, waiting at most one frame
+    period for it. Frames are shared between callers and must not be drawn on.
+    """
+
+    def __init__(self, index=0):
+        self.index = index
+        self._capture = None
+        self._thread = None
+        self._running = False
+        self._condition = threading.Condition()
+        self._frame = None
+        self._timestamp = None
+        self._frame_id = 0
+        self._seen = threading.local()
+
+    def open(self):
+        """Opens the camera and starts the reader thread, if not running yet"""
+        if self._running:
+            return self
+        if self._capture is not None:
+            self.release()
+        self._capture = cv2.VideoCapture(self.index)
+        self._running = self._capture.isOpened()
+        if self._running:
+            self._thread = threading.Thread(target=self._reader, daemon=True)
+            self._thread.start()
+        return self
+
+    def _reader(self):
+        """Reads frames continuously and keeps only the latest one"""
+        while self._running:
+            ret, frame = self._capture.read()
+            timestamp = time.time()
+            with self._condition:
+                if not ret:
+                    self._running = False
+                else:
+                    self._frame = frame
+                    self._timestamp = timestamp
+                    self._frame_id += 1
+                self._condition.notify_all()
+
+    def isOpened(self):
+        return self._running
+
+    def frame_size(self):
+        """Returns the (width, height) of the camera frames, (0, 0) if the camera isn't open"""
+        if self._capture is None:
+            return 0, 0
+        return (int(self._capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(self._capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    def latest(self):
+        """Returns (frame_id, timestamp, frame) of the latest frame without waiting.
+        frame is None until the first frame arrives."""
+        with self._condition:
+            return self._frame_id, self._timestamp, self._frame
+
+    def read_stamped(self, timeout=1.0):
+        """Returns (ret, timestamp, frame) for the newest frame not yet
+        returned to the calling thread, with its capture time.
+
+        Argument:
+            timeout (float): Maximum time to wait for a new frame, in seconds
+        """
+        last_seen = getattr(self._seen, "frame_id", 0)
+        with self._condition:
+            self._condition.wait_for(lambda: self._frame_id > last_seen or not self._running, timeout)
+            if self._frame_id <= last_seen:
+                return False, None, None
+            self._seen.frame_id = self._frame_id
+            return True, self._timestamp, self._frame
+
+    def read(self, timeout=1.0):
+        """Same as cv2.VideoCapture.read(), see read_stamped()"""
+        ret, _, frame = self.read_stamped(timeout)
+        return ret, frame
+
+    def release(self):
+        """Stops the reader thread and closes the camera"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+
+
+_camera = None
+
+# ---------------------------------------------------------------
+# 2. Get the process-wide camera, opening it on first use
+# ---------------------------------------------------------------
+def get_camera(index=0):
+    global _camera
+    if _camera is None:
+        _camera = SharedCamera(index)
+    return _camera.open()
+
+# ---------------------------------------------------------------
+# 3. Close the process-wide camera (on app exit)
+# ---------------------------------------------------------------
+def close_camera():
+    global _camera
+    if _camera is not None:
+        _camera.release()
+        _camera = None
@@ -5,6 +5,9 @@ from screeninfo import get_monitors
 # Global window name used throughout the application
 WINDOW_NAME = "Gaze Tracker"
 
+# How long static screens wait for input between checks (ms). Mouse callbacks still run while waiting.
+IDLE_WAIT_MS = 50
+
 # ---------------------------------------------------------------
 # 1. Get screen resolution of the primary monitor
 # ---------------------------------------------------------------
@@ -84,7 +87,43 @@ def detect_button_click(x, y, buttons, screen_width, screen_height, show_home_bu
     return None
 
 # ---------------------------------------------------------------
-# 7. Show the main menu screen with title and interactive buttons
+# 7. Event-driven rendering: a screen is only redrawn when its state changed
+# ---------------------------------------------------------------
+class Screen(object):
+    """
+    Keeps the composed canvas of a screen and shows it again only after
+    invalidate() was called. Input is waited for with a long timeout, so a
+    screen that doesn't change costs almost no CPU.
+
+    draw(canvas) draws the screen on a canvas cleared to the background color.
+    """
+
+    def __init__(self, screen_width, screen_height, draw, window_name=WINDOW_NAME, background=(20, 20, 20)):
+        self.draw = draw
+        self.window_name = window_name
+        self.background = background
+        self.canvas = np.empty((screen_height, screen_width, 3), dtype=np.uint8)
+        self.dirty = True
+
+    def invalidate(self):
+        """Marks the screen for redrawing, e.g. from a mouse callback"""
+        self.dirty = True
+
+    def refresh(self):
+        """Redraws and shows the canvas if the screen is dirty"""
+        if self.dirty:
+            self.dirty = False
+            self.canvas[:] = self.background
+            self.draw(self.canvas)
+            cv2.imshow(self.window_name, self.canvas)
+
+    def wait_key(self, timeout=IDLE_WAIT_MS):
+        """Refreshes the screen, then waits for a key (or the timeout) like cv2.waitKey"""
+        self.refresh()
+        return cv2.waitKey(timeout)
+
+# ---------------------------------------------------------------
+# 8. Show the main menu screen with title and interactive buttons
 # ---------------------------------------------------------------
 def show_menu_screen(screen_width, screen_height, title_lines, buttons, show_home_button=False, enabled=None):
     if enabled is None:
@@ -98,30 +137,31 @@ def show_menu_screen(screen_width, screen_height, title_lines, buttons, show_hom
             idx = detect_button_click(x, y, buttons, screen_width, screen_height, show_home_button=show_home_button, enabled=enabled)
             result[0] = idx
 
-    init_fullscreen_window()
-    cv2.setMouseCallback(WINDOW_NAME, click_callback)
-
-    while result[0] is None:
-        canvas = np.zeros((screen_height, screen_width, 3), dtype=np.uint8)
-        canvas[:] = (20, 20, 20)
+    def draw(canvas):
         draw_text_lines(canvas, title_lines, 100)
         draw_buttons(canvas, buttons, enabled=enabled)
         draw_exit_and_home(canvas, screen_width, screen_height, show_home_button=show_home_button)
 
-        cv2.imshow(WINDOW_NAME, canvas)
-        if cv2.waitKey(1) == 27:
+    init_fullscreen_window()
+    cv2.setMouseCallback(WINDOW_NAME, click_callback)
+
+    # The menu is static: it is drawn once, then only input is waited for
+    screen = Screen(screen_width, screen_height, draw)
+    while result[0] is None:
+        if screen.wait_key() == 27:
             break
 
     return result[0]
 
 # ---------------------------------------------------------------
-# 8. Display a static message screen until Exit is clicked or ESC is pressed
+# 9. Display a static message screen until Exit is clicked or ESC is pressed
 # ---------------------------------------------------------------
 def show_message_screen(screen_width, screen_height, message_lines, window_name="Gaze Tracker"):
     init_fullscreen_window()
-    canvas = np.zeros((screen_height, screen_width, 3), dtype=np.uint8)
-    draw_text_lines(canvas, message_lines, 200)
-    draw_exit_and_home(canvas, screen_width, screen_height, show_home_button=False)
+
+    def draw(canvas):
+        draw_text_lines(canvas, message_lines, 200)
+        draw_exit_and_home(canvas, screen_width, screen_height, show_home_button=False)
 
     clicked_exit = [False]
 
@@ -132,9 +172,41 @@ def show_message_screen(screen_width, screen_height, message_lines, window_name=
 
     cv2.setMouseCallback(window_name, exit_callback)
 
+    screen = Screen(screen_width, screen_height, draw, window_name, background=(0, 0, 0))
     while not clicked_exit[0]:
-        cv2.imshow(window_name, canvas)
-        if cv2.waitKey(1) == 27:
+        if screen.wait_key() == 27:
             break
 
     cv2.destroyWindow(window_name)
+
+# ---------------------------------------------------------------
+# 10. Ask for a line of text (e.g. a name), typed on the keyboard
+# ---------------------------------------------------------------
+# Enter confirms, Backspace erases and ESC cancels (returns None). note(text), if given, returns a line shown under
+# the text while it is typed.
+def ask_text(screen_width, screen_height, title_lines, note=None, max_length=24, window_name="Gaze Tracker"):
+    text = [""]
+
+    def draw(canvas):
+        draw_text_lines(canvas, title_lines, 200)
+        y = 200 + 40 * len(title_lines) + 80
+        cv2.rectangle(canvas, (screen_width // 2 - 400, y - 60), (screen_width // 2 + 400, y + 30), (60, 60, 60), -1)
+        draw_text_lines(canvas, [text[0] + "_"], y, font_scale=1.5, thickness=3)
+        if note is not None:
+            draw_text_lines(canvas, [note(text[0])], y + 100, font_scale=1.0, color=(180, 180, 180))
+
+    init_fullscreen_window()
+    screen = Screen(screen_width, screen_height, draw, window_name)
+    while True:
+        key = screen.wait_key()
+        if key == 27:
+            return None
+        elif key in (10, 13):
+            return text[0]
+        elif key in (8, 127):
+            text[0] = text[0][:-1]
+        elif 32 <= key < 127 and len(text[0]) < max_length:
+            text[0] += chr(key)
+        else:
+            continue
+        screen.invalidate()
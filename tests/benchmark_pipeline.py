@@ -0,0 +1,201 @@
+"""Per-stage latency benchmark of the gaze pipeline.
+
+Runs headless, with no camera: every stage is fed generated frames and eye
+patches, or frames from a recording passed with --frames (a video file or a
+folder of images). Reports p50/p95 latency and peak allocations per stage,
+and compares them with a stored baseline.
+
+Timings only compare on the same machine, so no baseline is committed: record
+one on the machine the comparisons will run on, before the change to measure
+(it is written to tests/benchmark_baseline.json, or to --baseline):
+
+    python tests/benchmark_pipeline.py --save-baseline   # record this machine's baseline
+    python tests/benchmark_pipeline.py                   # compare against it
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from gaze_tracking import models
+from gaze_tracking.calibration import Calibration
+from gaze_tracking.eye import Eye
+from gaze_tracking.pupil import Pupil
+from ad_tracking.mapping import GazeMapper
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "benchmark_baseline.json")
+
+# Eye landmarks (36-47) of the synthetic face, for a 1280x720 frame
+SYNTHETIC_LANDMARKS = {
+    36: (540, 330), 37: (556, 320), 38: (576, 320), 39: (592, 332), 40: (576, 340), 41: (556, 340),
+    42: (688, 332), 43: (704, 320), 44: (724, 320), 45: (740, 330), 46: (724, 340), 47: (704, 340),
+}
+
+
+class FakePoint:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class FakeLandmarks:
+    """Stands in for dlib.full_object_detection, only part(i) is used by Eye."""
+
+    def __init__(self, points):
+        self.points = points
+
+    def part(self, i):
+        return FakePoint(*self.points[i])
+
+
+def synthetic_face(width=1280, height=720, seed=0):
+    """A grey face with two dark irises at SYNTHETIC_LANDMARKS, plus sensor noise"""
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 3), 90, np.uint8)
+    cv2.ellipse(frame, (640, 380), (170, 230), 0, 0, 360, (150, 170, 200), -1)
+    for center in ((566, 330), (714, 330)):
+        cv2.ellipse(frame, center, (28, 12), 0, 0, 360, (235, 235, 235), -1)
+        cv2.circle(frame, center, 9, (40, 30, 30), -1)
+    noise = rng.integers(-8, 9, frame.shape)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def load_frames(path, limit=50):
+    """Frames of a recording: a video file or a folder of images"""
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "*.png")) + glob.glob(os.path.join(path, "*.jp*g")))
+        return [cv2.imread(f) for f in files[:limit]]
+
+    video = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = video.read()
+        if not ret:
+            break
+        frames.append(frame)
+    video.release()
+    return frames
+
+
+def measure(fn, inputs, runs):
+    """Returns (p50 us, p95 us, peak KiB) of fn over the inputs, cycled runs times"""
+    fn(inputs[0])
+    timings = np.empty(runs)
+    for i in range(runs):
+        item = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        fn(item)
+        timings[i] = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn(inputs[0])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    p50, p95 = np.percentile(timings * 1e6, [50, 95])
+    return float(p50), float(p95), peak / 1024
+
+
+def isolated_eye(gray, landmarks):
+    eye = Eye.__new__(Eye)
+    eye._isolate(gray, landmarks, Eye.LEFT_EYE_POINTS)
+    return eye
+
+
+def stages(frames):
+    """(name, function, inputs) for every stage of the pipeline"""
+    grays = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames]
+    landmarks = FakeLandmarks(SYNTHETIC_LANDMARKS)
+    eye_frames = [isolated_eye(gray, landmarks).frame for gray in grays]
+    matrix = np.array([[1.1, 0.02, -0.05], [0.01, 1.2, -0.1], [0.0, 0.01, 1.0]])
+    ratios = [(0.3 + 0.4 * (i % 10) / 10, 0.4 + 0.2 * (i % 7) / 7) for i in range(50)]
+    mapper = GazeMapper(matrix, 60.0, 1920, 1080)
+
+    result = []
+    try:
+        detector = models.face_detector()
+        predictor = models.shape_predictor()
+    except Exception as error:
+        print(f"Skipping face detection and landmark stages: {error}")
+    else:
+        # The shape predictor only takes dlib rectangles, and the models loaded, so dlib is there
+        from dlib import rectangle
+
+        def rect(gray):
+            faces = detector(gray)
+            if len(faces) > 0:
+                return faces[0]
+            return rectangle(470, 150, 810, 610)  # the synthetic face
+
+        rects = [rect(gray) for gray in grays]
+        result.append(("face_detection", detector, grays))
+        result.append(("landmark_prediction", lambda i: predictor(grays[i], rects[i]), list(range(len(grays)))))
+
+    result += [
+        ("eye_isolate", lambda gray: isolated_eye(gray, landmarks), grays),
+        ("pupil_image_processing", lambda eye: Pupil.image_processing(eye, 50), eye_frames),
+        ("pupil_detect_iris", lambda eye: Pupil(eye, 50), eye_frames),
+        ("find_best_threshold", Calibration.find_best_threshold, eye_frames),
+        ("screen_mapping", lambda r: mapper.map(r[0], r[1], 60.0), ratios),
+    ]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", help="video file or image folder used instead of synthetic frames")
+    parser.add_argument("--runs", type=int, default=200, help="timed calls per stage")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown before failing")
+    args = parser.parse_args()
+
+    if args.frames:
+        frames = load_frames(args.frames)
+        if not frames:
+            parser.error(f"no frames could be read from {args.frames}")
+    else:
+        frames = [synthetic_face(seed=seed) for seed in range(5)]
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    elif not args.save_baseline:
+        print(f"No baseline at {args.baseline}, run with --save-baseline first to compare against one")
+
+    results = {}
+    regressions = []
+    benchmarks = stages(frames)
+    print(f"{'stage':<24}{'p50 us':>10}{'p95 us':>10}{'peak KiB':>10}{'vs base':>10}")
+    for name, fn, inputs in benchmarks:
+        p50, p95, peak = measure(fn, inputs, args.runs)
+        results[name] = {"p50_us": round(p50, 2), "p95_us": round(p95, 2), "peak_kib": round(peak, 2)}
+
+        change = ""
+        if name in baseline:
+            ratio = p50 / baseline[name]["p50_us"]
+            change = f"{(ratio - 1) * 100:+.0f}%"
+            if ratio > 1 + args.tolerance:
+                regressions.append(name)
+        print(f"{name:<24}{p50:>10.1f}{p95:>10.1f}{peak:>10.1f}{change:>10}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        print("Slower than baseline: " + ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+pytest.importorskip("dlib")  # gaze_tracking imports dlib at package level
+
+from ad_tracking import ad
+from ad_tracking.fixations import FixationLog
+from ad_tracking.heatmap import GazeLog, IncrementalHeatmap, build_heatmap
+from ad_tracking.mapping import RatioLog
+from gaze_tracking import GazeSample, GazeTracking
+from gaze_tracking.pipeline import GazePipeline
+
+
+def failing_start(self):
+    raise RuntimeError("Gaze analysis workers failed to start")
+
+
+@pytest.fixture
+def no_display(monkeypatch):
+    monkeypatch.setattr(ad, "get_camera", lambda: None)
+    monkeypatch.setattr(ad, "init_fullscreen_window", lambda: None)
+    monkeypatch.setattr(GazePipeline, "start", failing_start)
+
+
+def test_image_ads_fall_back_to_the_serial_loop(no_display, monkeypatch, tmp_path):
+    path = str(tmp_path / "ad1.jpg")
+    cv2.imwrite(path, np.zeros((40, 60, 3), np.uint8))
+    calls = []
+    monkeypatch.setattr(ad, "show_ad", lambda *args: calls.append(args) or "heatmap")
+
+    result = ad.show_ad_pipelined(path, GazeTracking(), 60, 40, np.eye(3), 1.0, duration=5, workers=2,
+                                  live_overlay=True)
+    assert result == "heatmap"
+    assert len(calls) == 1
+    workers, live_overlay = calls[0][8], calls[0][10]
+    assert workers == 0 and live_overlay
+
+
+def test_video_ads_go_back_to_the_menu(no_display, monkeypatch, tmp_path):
+    path = str(tmp_path / "ad1.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (160, 120))
+    if not writer.isOpened():
+        pytest.skip("no video encoder available")
+    for i in range(5):
+        writer.write(np.full((120, 160, 3), i * 40, np.uint8))
+    writer.release()
+    messages = []
+    monkeypatch.setattr(ad, "show_message_screen", lambda w, h, lines, window_name: messages.append(lines))
+
+    assert ad.show_video_ad(path, GazeTracking(), 160, 120, np.eye(3), 1.0) == -2
+    assert len(messages) == 1
+
+
+class FinishedPipeline(object):
+    """Analyzes nothing while the ad plays, then hands back one sample when drained"""
+
+    def __init__(self, webcam, calibration=None, workers=2, detection_scale=1.0):
+        self.running = False
+
+    def start(self):
+        self.running = True
+
+    def samples(self):
+        return []
+
+    def drain(self):
+        return [GazeSample.empty(time.time())._replace(horizontal_ratio=0.5, vertical_ratio=0.5, distance=1.0)]
+
+    def stop(self):
+        self.running = False
+
+
+def test_video_ads_show_the_last_frame_and_keep_the_last_samples(monkeypatch, tmp_path):
+    path = str(tmp_path / "ad1.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (160, 120))
+    if not writer.isOpened():
+        pytest.skip("no video encoder available")
+    for i in range(3):
+        writer.write(np.full((120, 160, 3), i * 80, np.uint8))
+    writer.release()
+
+    shown = []
+    monkeypatch.setattr(ad, "get_camera", lambda: None)
+    monkeypatch.setattr(ad, "init_fullscreen_window", lambda: None)
+    monkeypatch.setattr(ad, "GazePipeline", FinishedPipeline)
+    monkeypatch.setattr(ad.cv2, "imshow", lambda name, frame: shown.append(time.time()))
+    monkeypatch.setattr(ad.cv2, "waitKey", lambda delay: -1)
+
+    log, ratio_log = GazeLog(), RatioLog()
+    ad.show_video_ad(path, GazeTracking(), 160, 120, np.eye(3), 1.0, gaze_log=log, ratio_log=ratio_log)
+    assert len(shown) == 3
+    assert time.time() - shown[-1] >= 0.09  # the last frame stays up for a frame period
+    assert len(log) == 1 and log.points["pts"][0] == pytest.approx(0.2)
+    assert len(ratio_log) == 1 and ratio_log.points["pts"][0] == pytest.approx(0.2)
+
+
+def test_fixations_feed_the_live_and_final_heatmaps():
+    gaze_log, fixation_log = GazeLog(onset=10.0), FixationLog()
+    live = IncrementalHeatmap(1280, 720, density=True)
+    for i in range(20):  # two 0.3 s fixations
+        x = 300 if i < 10 else 900
+        ad.add_gaze_point(gaze_log, x, 400, 1280, 720, 10.0 + i / 30, live, fixation_log=fixation_log)
+    ad.add_gaze_point(gaze_log, 5000, 400, 1280, 720, 11.0, live, fixation_log=fixation_log)  # off-screen
+
+    assert len(gaze_log) == 20
+    heatmap = ad.session_heatmap(gaze_log, fixation_log, 1280, 720)
+    assert len(fixation_log) == 2 and np.allclose(fixation_log.points["pts"], [0, 10 / 30])
+    assert np.allclose(heatmap, build_heatmap(fixation_log, 1280, 720, density=True))
+    assert live.grid.sum() == pytest.approx(9 / 30)  # the first fixation ended while the ad played
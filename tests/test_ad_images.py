@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from ad_tracking import ad_images
+from ad_tracking.ad_images import AdImageCache
+
+
+def write_ad(path, seed=0, width=1280, height=720):
+    img = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    cv2.imwrite(str(path), img)
+    return str(path)
+
+
+def count_loads(monkeypatch):
+    loads = []
+    original = ad_images.load_ad_image
+
+    def counting(path, width, height):
+        loads.append(path)
+        return original(path, width, height)
+
+    monkeypatch.setattr(ad_images, "load_ad_image", counting)
+    return loads
+
+
+def test_ads_are_decoded_once_per_resolution(tmp_path, monkeypatch):
+    loads = count_loads(monkeypatch)
+    path = write_ad(tmp_path / "ad1.jpg")
+    cache = AdImageCache()
+
+    first = cache.get(path, 640, 360)
+    assert first.shape == (360, 640, 3)
+    assert not first.flags.writeable
+    assert cache.get(path, 640, 360) is first
+    cache.get(path, 320, 180)
+    assert len(loads) == 2
+
+    # A changed file is decoded again
+    write_ad(path, seed=1)
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+    assert cache.get(path, 640, 360) is not first
+    assert len(loads) == 3
+
+
+def test_cache_is_bounded_by_bytes(tmp_path):
+    paths = [write_ad(tmp_path / "ad{}.jpg".format(i), seed=i) for i in range(3)]
+    cache = AdImageCache(max_bytes=2 * 640 * 360 * 3)
+
+    images = [cache.get(p, 640, 360) for p in paths]
+    cache.get(paths[1], 640, 360)  # most recently used
+    cache.get(paths[2], 640, 360)
+    assert cache.get(paths[1], 640, 360) is images[1]
+    assert cache.get(paths[2], 640, 360) is images[2]
+    assert cache.get(paths[0], 640, 360) is not images[0]  # evicted, decoded again
+
+
+def test_get_waits_for_preload(tmp_path, monkeypatch):
+    loads = count_loads(monkeypatch)
+    path = write_ad(tmp_path / "ad1.jpg")
+    cache = AdImageCache()
+
+    cache.preload(path, 640, 360)
+    cache.preload(path, 640, 360)
+    assert cache.get(path, 640, 360).shape == (360, 640, 3)
+    assert len(loads) == 1
@@ -0,0 +1,115 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from ad_tracking.aoi import analyze_aois, analyze_store, summarize_aois
+from ad_tracking.fixations import detect_fixations
+from ad_tracking.heatmap import GAZE_DTYPE, GazeLog
+from ad_tracking.heatmap_store import HeatmapStore
+
+AOIS = {
+    "image_size": [1000, 500],
+    "aois": [
+        {"name": "left", "rect": [0, 0, 500, 500]},
+        {"name": "top", "polygon": [[0, 0], [999, 0], [999, 249], [0, 249]]},  # polygon edges are inclusive
+    ],
+}
+
+
+def random_points(seed, n=300, width=1920, height=1080):
+    rng = np.random.default_rng(seed)
+    points = np.zeros(n, GAZE_DTYPE)
+    points["t"] = np.cumsum(rng.uniform(0.01, 0.1, n))
+    points["pts"] = points["t"]
+    # Short fixations on random targets, some off-screen
+    targets = np.repeat(rng.uniform([-100, -100], [width + 100, height + 100], (n // 5 + 1, 2)), 5, axis=0)[:n]
+    points["x"] = targets[:, 0] + rng.normal(0, 5, n)
+    points["y"] = targets[:, 1] + rng.normal(0, 5, n)
+    points["w"] = 1
+    return points
+
+
+def brute_force(points, width, height, max_gap):
+    """Reference implementation, one point at a time"""
+    tests = [lambda fx, fy: fx < 0.5, lambda fx, fy: fy < 0.5]
+    hits, dwell, first, entries = [0, 0], [0.0, 0.0], [None, None], [0, 0]
+    was_inside = [False, False]
+    for i, point in enumerate(points):
+        fx, fy = point["x"] / width, point["y"] / height
+        for k, test in enumerate(tests):
+            inside = 0 <= fx < 1 and 0 <= fy < 1 and test(fx, fy)
+            if inside:
+                hits[k] += 1
+                if i + 1 < len(points):
+                    dwell[k] += min(points[i + 1]["t"] - point["t"], max_gap)
+                if not was_inside[k]:
+                    entries[k] += 1
+            was_inside[k] = inside
+    for fixation in detect_fixations(points):
+        fx, fy = fixation["x"] / width, fixation["y"] / height
+        for k, test in enumerate(tests):
+            if first[k] is None and 0 <= fx < 1 and 0 <= fy < 1 and test(fx, fy):
+                first[k] = fixation["pts"]
+    first = [np.nan if f is None else f for f in first]
+    return hits, dwell, first, [max(e - 1, 0) for e in entries]
+
+
+def test_analyze_aois_matches_per_point_loop():
+    sessions = [random_points(seed) for seed in range(3)]
+    points = np.concatenate(sessions)
+    labels = np.repeat(["a", "b", "c"], [len(s) for s in sessions])
+
+    # Shuffled input: points are regrouped by session and time order
+    shuffle = np.random.default_rng(0).permutation(len(points))
+    stats = analyze_aois(points[shuffle], AOIS, 1920, 1080, labels[shuffle], max_gap=0.08)
+
+    assert list(stats.sessions) == ["a", "b", "c"]
+    for s, session in enumerate(sessions):
+        hits, dwell, first, revisits = brute_force(session, 1920, 1080, 0.08)
+        assert list(stats.hits[s]) == hits
+        assert np.allclose(stats.dwell[s], dwell)
+        assert np.allclose(stats.time_to_first[s], first, equal_nan=True)
+        assert list(stats.revisits[s]) == revisits
+
+
+def test_never_viewed_aoi_has_no_time_to_first():
+    points = np.zeros(3, GAZE_DTYPE)
+    points["t"] = [0, 0.1, 0.2]
+    points["x"] = 1500
+    points["y"] = 900
+    stats = analyze_aois(points, AOIS, 1920, 1080)
+    assert np.isnan(stats.time_to_first).all()
+    summary = summarize_aois(stats)
+    assert summary[0]["viewers"] == 0 and summary[0]["mean_time_to_first"] is None
+
+
+def test_analyze_store_uses_each_session_screen(tmp_path):
+    store = HeatmapStore(str(tmp_path))
+    points = np.zeros(2, GAZE_DTYPE)
+    points["t"] = [0, 0.1]
+    points["x"] = 700
+    points["y"] = 100
+    store.add_session("data/ad1.jpg", points, 1920, 1080, session_id="big")
+    points["x"] = 1000  # left half on a 1920 screen, right half on a 1280 one
+    store.add_session("data/ad1.jpg", points, 1280, 720, session_id="small")
+
+    stats = analyze_store(store, "data/ad1.jpg", AOIS)
+    assert list(stats.sessions) == ["big", "small"]
+    assert stats.hits.tolist() == [[2, 2], [0, 2]]
+
+
+def test_time_to_first_counts_from_the_ad_onset_and_needs_a_fixation():
+    log = GazeLog(onset=100.0)
+    t = 100.0
+    for x, y, n in [(2500, 500, 15), (1500, 100, 1), (200, 800, 9)]:  # off-screen, a glance across "top", "left"
+        for _ in range(n):
+            log.append(x, y, t)
+            t += 1 / 30
+    stats = analyze_aois(log, AOIS, 1920, 1080)
+    assert stats.hits[0].tolist() == [9, 1]
+    assert stats.time_to_first[0, 0] == pytest.approx(16 / 30, abs=1e-5)
+    assert np.isnan(stats.time_to_first[0, 1])
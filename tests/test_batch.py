@@ -0,0 +1,82 @@
+import multiprocessing
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+pytest.importorskip("dlib")  # gaze_tracking imports dlib at package level
+
+from gaze_tracking import GazeSample, GazeTracking, batch
+from gaze_tracking.batch import Shard, plan_shards, track_videos
+
+
+def write_video(path, nb_frames, fps=25):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("no video encoder available")
+    for i in range(nb_frames):
+        writer.write(np.full((48, 64, 3), i * 2, np.uint8))
+    writer.release()
+    return path
+
+
+def fake_refresh(self, frame, timestamp=None):
+    """Tags the sample with the brightness of the frame and the seeded thresholds, instead of tracking a face"""
+    self.sample = GazeSample.empty(timestamp)._replace(horizontal_ratio=float(frame.mean()),
+                                                        pupil_left=tuple(self.calibration.thresholds_left))
+
+
+def late_face_refresh(self, frame, timestamp=None):
+    """Calibrates on the frames where a face "appears" (the last ones of the video), too few to complete it"""
+    brightness = float(frame.mean())
+    if brightness >= 90 and not self.calibration.is_complete():
+        self.calibration.thresholds_left.append(brightness)
+        self.calibration.thresholds_right.append(brightness)
+    self.sample = GazeSample.empty(timestamp)._replace(pupil_left=tuple(self.calibration.thresholds_left))
+
+
+def test_plan_shards_covers_every_frame_once(tmp_path):
+    first = write_video(str(tmp_path / "first.avi"), 95)
+    second = write_video(str(tmp_path / "second.avi"), 10)
+
+    assert plan_shards([first, second], shard_seconds=1.0) == [
+        (first, 0, 25), (first, 25, 50), (first, 50, 75), (first, 75, None), (second, 0, None)]
+    with pytest.raises(IOError):
+        plan_shards([str(tmp_path / "missing.avi")])
+
+
+def test_shards_are_seeded_with_the_video_thresholds(tmp_path, monkeypatch):
+    path = write_video(str(tmp_path / "ad.avi"), 30)
+    monkeypatch.setattr(GazeTracking, "refresh", fake_refresh)
+    monkeypatch.setattr(batch, "_worker_tracker", None)
+    batch._init_worker()
+    assert not batch._worker_tracker.face_tracking
+
+    samples = batch._track_shard(Shard(path, 10, 20, ([40, 41], [50, 51])))
+    assert [round(s.timestamp * 25) for s in samples] == list(range(10, 20))
+    assert all(s.pupil_left == (40, 41) for s in samples)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="workers inherit the stub")
+def test_sharded_results_match_a_single_pass(tmp_path, monkeypatch):
+    paths = [write_video(str(tmp_path / "a.avi"), 60), write_video(str(tmp_path / "b.avi"), 20)]
+    monkeypatch.setattr(GazeTracking, "refresh", fake_refresh)
+
+    sharded = [(path, s.timestamp, s.horizontal_ratio) for path, s in track_videos(paths, 2, shard_seconds=0.5)]
+    single = [(path, s.timestamp, s.horizontal_ratio) for path, s in track_videos(paths, 1, shard_seconds=100)]
+    assert len(sharded) == 80
+    assert sharded == single
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="workers inherit the stub")
+def test_videos_without_a_complete_calibration_are_tracked_in_one_pass(tmp_path, monkeypatch):
+    path = write_video(str(tmp_path / "a.avi"), 60)
+    monkeypatch.setattr(GazeTracking, "refresh", late_face_refresh)
+
+    sharded = [s.pupil_left for _, s in track_videos([path], 2, shard_seconds=0.5)]
+    single = [s.pupil_left for _, s in track_videos([path], 1, shard_seconds=100)]
+    assert len(sharded) == 60 and 0 < len(sharded[-1]) < 20
+    assert sharded == single
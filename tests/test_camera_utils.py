@@ -0,0 +1,92 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from utils import camera_utils
+from utils.camera_utils import SharedCamera
+
+
+class FakeCapture(object):
+    """A camera delivering a numbered frame every period seconds, nb_frames in total"""
+
+    def __init__(self, period=0.01, nb_frames=None):
+        self.period = period
+        self.nb_frames = nb_frames
+        self.count = 0
+        self.released = False
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        time.sleep(self.period)
+        if self.nb_frames is not None and self.count >= self.nb_frames:
+            return False, None
+        self.count += 1
+        return True, np.full((2, 2), self.count, np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+@pytest.fixture
+def camera(monkeypatch):
+    """Opens a SharedCamera on a FakeCapture, returns (camera, capture)"""
+    def open_camera(**capture_options):
+        capture = FakeCapture(**capture_options)
+        monkeypatch.setattr(camera_utils.cv2, "VideoCapture", lambda index: capture)
+        opened.append(SharedCamera().open())
+        return opened[-1], capture
+
+    opened = []
+    yield open_camera
+    for shared in opened:
+        shared.release()
+
+
+def test_a_thread_never_gets_the_same_frame_twice(camera):
+    shared, _ = camera(period=0.005)
+    frames = [shared.read_stamped() for _ in range(20)]
+    assert all(ret for ret, _, _ in frames)
+    ids = [int(frame[0, 0]) for _, _, frame in frames]
+    timestamps = [timestamp for _, timestamp, _ in frames]
+    assert all(a < b for a, b in zip(ids, ids[1:]))
+    assert all(a < b for a, b in zip(timestamps, timestamps[1:]))
+
+    # Another thread gets the latest frame, even if this one already had it
+    ret, frame = shared.read()
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(shared.read()))
+    thread.start()
+    thread.join()
+    assert seen[0][0] and int(seen[0][1][0, 0]) >= int(frame[0, 0])
+
+
+def test_read_fails_on_timeout_and_when_stopped(camera):
+    shared, _ = camera(period=0.2)
+    assert shared.read_stamped(timeout=1.0)[0]
+    assert shared.read_stamped(timeout=0.02) == (False, None, None)  # no new frame yet
+
+    shared, _ = camera(period=0.001, nb_frames=3)
+    time.sleep(0.1)  # the camera stopped delivering frames
+    assert not shared.isOpened()
+    assert shared.read_stamped(timeout=0.5)[0]  # the last frame, not seen yet
+    start = time.time()
+    assert shared.read_stamped(timeout=5.0) == (False, None, None)
+    assert time.time() - start < 1.0  # without waiting for the timeout
+
+
+def test_release_joins_the_reader_thread(camera):
+    shared, capture = camera(period=0.005)
+    thread = shared._thread
+    shared.release()
+    assert not thread.is_alive()
+    assert capture.released
+    shared.read_stamped(timeout=0.01)  # at most the last frame, not seen yet
+    assert shared.read_stamped(timeout=5.0) == (False, None, None)
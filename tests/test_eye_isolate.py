@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+pytest.importorskip("dlib")  # gaze_tracking imports dlib at package level
+
+from gaze_tracking.eye import Eye
+
+
+class FakePoint:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class FakeLandmarks:
+    """Stands in for dlib.full_object_detection, only part(i) is used by Eye."""
+
+    def __init__(self, points):
+        self.points = points
+
+    def part(self, i):
+        return FakePoint(*self.points[i])
+
+
+def legacy_isolate(frame, region):
+    # Full-frame masking as Eye._isolate used to do it
+    height, width = frame.shape[:2]
+    black_frame = np.zeros((height, width), np.uint8)
+    mask = np.full((height, width), 255, np.uint8)
+    cv2.fillPoly(mask, [region], (0, 0, 0))
+    eye = cv2.bitwise_not(black_frame, frame.copy(), mask=mask)
+
+    margin = 5
+    min_x = np.min(region[:, 0]) - margin
+    max_x = np.max(region[:, 0]) + margin
+    min_y = np.min(region[:, 1]) - margin
+    max_y = np.max(region[:, 1]) + margin
+    return eye[min_y:max_y, min_x:max_x]
+
+
+def random_eye(rng, width, height):
+    cx, cy = int(rng.integers(60, width - 60)), int(rng.integers(60, height - 60))
+    offsets = [(-20, 0), (-8, -8), (8, -8), (20, 0), (8, 7), (-8, 7)]
+    points = {}
+    for i, (dx, dy) in zip(Eye.LEFT_EYE_POINTS, offsets):
+        points[i] = (cx + dx + int(rng.integers(-3, 4)), cy + dy + int(rng.integers(-3, 4)))
+    return FakeLandmarks(points)
+
+
+def isolate(frame, landmarks):
+    eye = Eye.__new__(Eye)
+    eye._isolate(frame, landmarks, Eye.LEFT_EYE_POINTS)
+    return eye
+
+
+def test_isolate_matches_full_frame_masking():
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (720, 1280), dtype=np.uint8)
+
+    for _ in range(100):
+        landmarks = random_eye(rng, 1280, 720)
+        region = np.array([(landmarks.part(p).x, landmarks.part(p).y) for p in Eye.LEFT_EYE_POINTS], np.int32)
+        eye = isolate(frame, landmarks)
+        assert np.array_equal(eye.frame, legacy_isolate(frame, region))
+
+
+def test_isolate_clamps_box_at_frame_border():
+    frame = np.full((100, 100), 80, np.uint8)
+    landmarks = FakeLandmarks({36: (1, 10), 37: (5, 6), 38: (9, 6), 39: (13, 10), 40: (9, 14), 41: (5, 14)})
+    eye = isolate(frame, landmarks)
+    assert eye.origin == (0, 1)
+    assert eye.frame.shape == (18, 18)
+
+
+def benchmark(width, height, runs=500):
+    rng = np.random.default_rng(1)
+    frame = rng.integers(0, 256, (height, width), dtype=np.uint8)
+    landmarks = random_eye(rng, width, height)
+    region = np.array([(landmarks.part(p).x, landmarks.part(p).y) for p in Eye.LEFT_EYE_POINTS], np.int32)
+
+    results = {}
+    for name, fn in (("full-frame", lambda: legacy_isolate(frame, region)),
+                     ("crop-first", lambda: isolate(frame, landmarks))):
+        fn()
+        start = time.perf_counter()
+        for _ in range(runs):
+            fn()
+        elapsed = (time.perf_counter() - start) / runs
+
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = (elapsed, peak)
+
+    print(f"{width}x{height}")
+    for name, (elapsed, peak) in results.items():
+        print(f"  {name:<10}  {elapsed * 1e6:9.1f} us/eye  {peak / 1024:9.1f} KiB peak")
+
+
+if __name__ == "__main__":
+    benchmark(1280, 720)
+    benchmark(1920, 1080)
@@ -0,0 +1,87 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+dlib = pytest.importorskip("dlib")  # gaze_tracking imports dlib at package level
+
+from gaze_tracking import GazeTracking, detection_scale_for, models
+
+FACE = (200, 100, 300, 200)  # left, top, right, bottom in the 640x480 frame
+
+
+class StubDetector(object):
+    """Finds FACE wherever it is in the searched image, records which image was searched"""
+
+    def __init__(self):
+        self.calls = []
+        self.lost = False
+
+    def __call__(self, image):
+        height, width = image.shape[:2]
+        self.calls.append("full" if (width, height) in ((640, 480), (320, 240)) else "roi")
+        if self.lost:
+            return []
+        if self.calls[-1] == "roi":
+            return [dlib.rectangle(50, 50, 150, 150)]  # FACE in the region around it (roi_margin=0.5)
+        scale = width / 640.0  # 0.5 on the copy searched with detection_scale=0.5
+        return [dlib.rectangle(*[int(v * scale) for v in FACE])]
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    stub = StubDetector()
+    monkeypatch.setitem(models._models, "face_detector", stub)
+    return stub
+
+
+def rect(face):
+    return face.left(), face.top(), face.right(), face.bottom()
+
+
+def test_roi_is_searched_between_full_frame_detections(detector):
+    tracker = GazeTracking(redetect_interval=3)
+    frame = np.zeros((480, 640), np.uint8)
+    faces = [tracker._detect_face(frame) for _ in range(8)]
+
+    assert detector.calls == ["full", "roi", "roi", "roi", "full", "roi", "roi", "roi"]
+    assert all(rect(face) == FACE for face in faces)  # ROI detections are mapped back to the frame
+
+
+def test_full_frame_detection_right_after_the_face_is_lost(detector):
+    tracker = GazeTracking(redetect_interval=10)
+    frame = np.zeros((480, 640), np.uint8)
+    tracker._detect_face(frame)
+    tracker._detect_face(frame)
+
+    detector.lost = True
+    assert tracker._detect_face(frame) is None  # the ROI finds nothing, nor does the full frame
+    assert tracker._detect_face(frame) is None  # no face to track: full frame only
+    detector.lost = False
+    assert rect(tracker._detect_face(frame)) == FACE
+    tracker._detect_face(frame)
+
+    assert detector.calls == ["full", "roi", "roi", "full", "full", "full", "roi"]
+
+
+def test_without_tracking_every_frame_is_a_full_frame_detection(detector):
+    tracker = GazeTracking(face_tracking=False)
+    frame = np.zeros((480, 640), np.uint8)
+    for _ in range(3):
+        tracker._detect_face(frame)
+    assert detector.calls == ["full"] * 3
+
+
+def test_detection_scale_maps_faces_back_to_the_frame(detector):
+    tracker = GazeTracking(face_tracking=False, detection_scale=0.5)
+    face = tracker._detect_face(np.zeros((480, 640), np.uint8))
+    assert detector.calls == ["full"]  # on the 320x240 copy
+    assert rect(face) == FACE
+
+
+def test_high_resolution_frames_are_searched_at_the_detection_width():
+    assert detection_scale_for(1920) == pytest.approx(1 / 3)
+    assert detection_scale_for(640) == 1.0
+    assert detection_scale_for(0) == 1.0  # unknown camera resolution
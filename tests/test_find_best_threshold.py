@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+pytest.importorskip("dlib")  # gaze_tracking imports dlib at package level
+
+from gaze_tracking.calibration import Calibration
+from gaze_tracking.pupil import Pupil
+
+
+def legacy_find_best_threshold(eye_frame):
+    # One full image_processing pass per threshold, as before
+    average_iris_size = 0.48
+    trials = {}
+    for threshold in range(5, 100, 5):
+        iris_frame = Pupil.image_processing(eye_frame, threshold)
+        trials[threshold] = Calibration.iris_size(iris_frame)
+    best_threshold, iris_size = min(trials.items(), key=(lambda p: abs(p[1] - average_iris_size)))
+    return best_threshold
+
+
+def synthetic_eye(rng, width=44, height=22):
+    # White surroundings (as left by Eye._isolate), a grey sclera and a dark iris blob
+    frame = np.full((height, width), 255, np.uint8)
+    yy, xx = np.mgrid[:height, :width]
+    sclera = ((xx - width / 2) / (width / 2 - 5)) ** 2 + ((yy - height / 2) / (height / 2 - 4)) ** 2 <= 1
+    frame[sclera] = rng.integers(120, 200)
+    cx, cy, r = rng.integers(10, width - 10), rng.integers(6, height - 6), rng.integers(3, 8)
+    frame[(xx - cx) ** 2 + (yy - cy) ** 2 <= r * r] = rng.integers(5, 60)
+    noise = rng.integers(-25, 25, frame.shape)
+    return np.clip(frame.astype(np.int32) + noise, 0, 255).astype(np.uint8)
+
+
+def test_thresholds_match_per_threshold_search():
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        eye_frame = synthetic_eye(rng, int(rng.integers(30, 60)), int(rng.integers(16, 30)))
+        assert Calibration.find_best_threshold(eye_frame) == legacy_find_best_threshold(eye_frame)
+
+
+def test_thresholds_match_on_uniform_frames():
+    for value in (0, 4, 5, 50, 97, 255):
+        eye_frame = np.full((20, 40), value, np.uint8)
+        assert Calibration.find_best_threshold(eye_frame) == legacy_find_best_threshold(eye_frame)
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(1)
+    frames = [synthetic_eye(rng) for _ in range(200)]
+
+    for name, fn in (("per-threshold", legacy_find_best_threshold),
+                     ("single-pass", Calibration.find_best_threshold)):
+        start = time.perf_counter()
+        for eye_frame in frames:
+            fn(eye_frame)
+        elapsed = (time.perf_counter() - start) / len(frames)
+        print(f"{name:<14} {elapsed * 1e6:8.1f} us/eye frame")
@@ -0,0 +1,89 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from ad_tracking.fixations import FixationDetector, FixationLog, detect_fixations
+from ad_tracking.heatmap import GazeLog
+
+
+def scanpath(seed, nb_fixations=20, rate=30.0):
+    """Fixations of random length on random targets, with jitter, a few saccade samples and dropouts"""
+    rng = np.random.default_rng(seed)
+    log = GazeLog()
+    t = 0.0
+    for _ in range(nb_fixations):
+        target = rng.uniform([100, 100], [1800, 1000])
+        for _ in range(rng.integers(1, 15)):
+            x, y = target + rng.normal(0, 10, 2)
+            log.append(x, y, t)
+            t += 1 / rate + (0.4 if rng.random() < 0.03 else 0)
+    return log
+
+
+def drifting_scanpath(seed, rate=30.0):
+    """A gaze that drifts slowly (under the saccade velocity) across the screen, with jitter"""
+    rng = np.random.default_rng(seed)
+    log = GazeLog()
+    for i in range(600):
+        log.append(100 + i * 2 + rng.normal(0, 10), 500 + rng.normal(0, 10), i / rate)
+    return log
+
+
+def streamed_fixations(log):
+    detector = FixationDetector()
+    streamed = [detector.add(p["x"], p["y"], p["t"]) for p in log.points] + [detector.flush()]
+    return np.array([f for f in streamed if f is not None])
+
+
+def test_streaming_and_vectorized_detectors_agree():
+    for log in [scanpath(seed) for seed in range(5)] + [drifting_scanpath(seed) for seed in range(3)]:
+        streamed = streamed_fixations(log)
+        fixations = detect_fixations(log)
+        assert len(fixations) == len(streamed) > 0
+        assert np.allclose(fixations["t"], streamed[:, 0])
+        assert np.allclose(fixations["x"], streamed[:, 1], atol=1e-3)
+        assert np.allclose(fixations["y"], streamed[:, 2], atol=1e-3)
+        assert np.allclose(fixations["w"], streamed[:, 3])
+
+
+def test_fixations_are_duration_weighted_centroids():
+    log = GazeLog()
+    for i in range(10):  # 300 ms on (500, 500), then a saccade to (1500, 800) for 200 ms
+        log.append(500 + (i % 2) * 4, 500, i / 30)
+    for i in range(10, 17):
+        log.append(1500, 800, i / 30)
+    log.append(1500, 800, 1.0)  # after a dropout: a new, too short group
+
+    fixations = detect_fixations(log)
+    assert len(fixations) == 2
+    assert np.allclose(fixations["x"], [502, 1500])
+    assert np.allclose(fixations["y"], [500, 800])
+    assert np.allclose(fixations["w"], [9 / 30, 6 / 30])
+
+
+def test_slow_moves_between_fixations_split_them():
+    log = GazeLog()
+    t = 0.0
+    for x in [500] * 15 + [540, 580, 620, 660] + [700] * 15:  # 0.5 s fixations joined by 40 px steps at 1200 px/s
+        log.append(x, 500, t)
+        t += 1 / 30
+
+    fixations = detect_fixations(log)
+    assert np.allclose(fixations["x"], [(500 * 15 + 540 + 580 + 620) / 18, (660 + 700 * 15) / 16])
+    assert np.allclose(fixations["t"], [0, 18 / 30])
+    assert np.allclose(streamed_fixations(log)[:, 1], fixations["x"])
+
+
+def test_fixation_log_records_the_fixations_of_a_stream():
+    log = scanpath(1)
+    fixation_log = FixationLog(onset=-2.0)
+    ended = [fixation_log.add(p["x"], p["y"], p["t"]) for p in log.points] + [fixation_log.flush()]
+
+    expected = detect_fixations(log)
+    assert len(fixation_log) == len([f for f in ended if f is not None]) == len(expected)
+    for field in ("t", "x", "y", "w"):
+        assert np.allclose(fixation_log.points[field], expected[field], atol=1e-3)
+    assert np.allclose(fixation_log.points["pts"], expected["t"] + 2.0)
@@ -0,0 +1,77 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from ad_tracking.gaze_filter import (MAX_GAP, MAX_PREDICTION, KalmanGazeFilter, OneEuroFilter, PassThroughFilter,
+                                     make_gaze_filter)
+
+FPS = 30.0
+FILTERS = [OneEuroFilter, KalmanGazeFilter]
+
+
+def run(gaze_filter, points, start=0.0):
+    """Feeds (x, y) points at FPS, returns the filtered points"""
+    return np.array([gaze_filter.update(x, y, start + i / FPS) for i, (x, y) in enumerate(points)])
+
+
+@pytest.mark.parametrize("filter_class", FILTERS)
+def test_fixation_jitter_is_smoothed(filter_class):
+    raw = np.random.default_rng(0).normal((960, 540), 30, (300, 2))
+    filtered = run(filter_class(), raw)[30:]
+    assert filtered.std(axis=0).max() < 0.6 * raw.std(axis=0).min()
+    assert np.allclose(filtered.mean(axis=0), (960, 540), atol=10)
+
+
+@pytest.mark.parametrize("filter_class", FILTERS)
+def test_saccade_is_followed_quickly(filter_class):
+    points = [(200, 200)] * 30 + [(1500, 800)] * 30
+    filtered = run(filter_class(), points)
+    # On the new target within 10 px after 200 ms
+    assert np.hypot(*(filtered[36] - (1500, 800))) < 10
+
+
+@pytest.mark.parametrize("filter_class", FILTERS)
+def test_smooth_pursuit_is_extrapolated_over_the_latency(filter_class):
+    t = np.arange(60) / FPS
+    points = np.stack([200 + 300 * t, 540 + 0 * t], axis=1)  # 300 px/s to the right
+    gaze_filter = filter_class()
+    filtered_x, _ = run(gaze_filter, points)[-1]
+
+    latency = 0.07
+    x, y = gaze_filter.predict(t[-1] + latency)
+    assert abs(x - (filtered_x + 300 * latency)) < 2 and abs(y - 540) < 1
+
+    # The extrapolation is capped
+    x, _ = gaze_filter.predict(t[-1] + 10.0)
+    assert abs(x - (filtered_x + 300 * MAX_PREDICTION)) < 2
+
+
+@pytest.mark.parametrize("filter_class", FILTERS)
+def test_saccades_are_not_extrapolated_and_gaps_restart(filter_class):
+    gaze_filter = filter_class()
+    assert gaze_filter.predict(0.0) == (None, None)
+
+    run(gaze_filter, [(200, 200)] * 30 + [(1500, 800)])
+    x, y = gaze_filter.update(1500, 800, 31 / FPS)
+    assert gaze_filter.predict(31 / FPS + 0.1) == (x, y)
+
+    # After a blink longer than MAX_GAP, the filter starts again from the new point
+    assert gaze_filter.update(100, 100, 31 / FPS + MAX_GAP + 0.01) == (100, 100)
+
+
+def test_make_gaze_filter():
+    assert isinstance(make_gaze_filter(), KalmanGazeFilter)
+    assert isinstance(make_gaze_filter("one_euro", beta=0.01), OneEuroFilter)
+    assert make_gaze_filter("none").update(3, 4, 0.0) == (3, 4)
+
+    gaze_filter = PassThroughFilter()
+    gaze_filter.update(3, 4, 0.0)
+    assert make_gaze_filter(gaze_filter) is gaze_filter
+    assert gaze_filter.predict(1.0) == (None, None)  # reset
+
+    with pytest.raises(ValueError):
+        make_gaze_filter("median")
@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+pytest.importorskip("dlib")  # gaze_tracking imports dlib at package level
+
+from gaze_tracking import GazeTracking, GazeSample
+
+
+class FakePupil:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class FakeEye:
+    def __init__(self, origin, size, pupil, blinking):
+        self.origin = origin
+        self.center = (size[0] / 2, size[1] / 2)
+        self.pupil = FakePupil(*pupil)
+        self.blinking = blinking
+
+
+def tracker_with_eyes(eye_left, eye_right):
+    # Skips __init__ so the dlib models aren't needed
+    gaze = GazeTracking.__new__(GazeTracking)
+    gaze.eye_left = eye_left
+    gaze.eye_right = eye_right
+    gaze.sample = GazeSample.from_eyes(eye_left, eye_right, 1.5)
+    return gaze
+
+
+def legacy_values(eye_left, eye_right):
+    # Values as the GazeTracking properties used to compute them
+    left = (eye_left.origin[0] + eye_left.pupil.x, eye_left.origin[1] + eye_left.pupil.y)
+    right = (eye_right.origin[0] + eye_right.pupil.x, eye_right.origin[1] + eye_right.pupil.y)
+    horizontal = (eye_left.pupil.x / (eye_left.center[0] * 2 - 10) + eye_right.pupil.x / (eye_right.center[0] * 2 - 10)) / 2
+    vertical = (eye_left.pupil.y / (eye_left.center[1] * 2 - 10) + eye_right.pupil.y / (eye_right.center[1] * 2 - 10)) / 2
+    blinking = (eye_left.blinking + eye_right.blinking) / 2 > 3.8
+    distance = np.linalg.norm(np.array(left) - np.array(right))
+    return left, right, horizontal, vertical, blinking, distance
+
+
+def random_eyes(rng):
+    eyes = []
+    for x0 in (300, 400):
+        size = (int(rng.integers(30, 50)), int(rng.integers(16, 26)))
+        pupil = (int(rng.integers(0, size[0])), int(rng.integers(0, size[1])))
+        eyes.append(FakeEye((x0 + int(rng.integers(-20, 20)), 200), size, pupil, float(rng.uniform(2, 6))))
+    return eyes
+
+
+def test_sample_matches_previous_properties():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        eye_left, eye_right = random_eyes(rng)
+        gaze = tracker_with_eyes(eye_left, eye_right)
+        left, right, horizontal, vertical, blinking, distance = legacy_values(eye_left, eye_right)
+
+        assert gaze.pupils_located
+        assert gaze.pupil_left_coords() == left
+        assert gaze.pupil_right_coords() == right
+        assert gaze.horizontal_ratio() == horizontal
+        assert gaze.vertical_ratio() == vertical
+        assert gaze.is_blinking() == blinking
+        assert gaze.is_right() == (horizontal <= 0.35)
+        assert gaze.is_left() == (horizontal >= 0.65)
+        assert gaze.is_center() == (horizontal > 0.35 and horizontal < 0.65)
+        assert gaze.sample.distance == pytest.approx(distance)
+        assert gaze.sample.timestamp == 1.5
+
+
+def test_sample_is_empty_without_pupils():
+    eye_left = FakeEye((300, 200), (40, 20), (None, None), 3.0)
+    eye_right = FakeEye((400, 200), (40, 20), (10, 5), 3.0)
+    gaze = tracker_with_eyes(eye_left, eye_right)
+
+    assert not gaze.pupils_located
+    assert gaze.horizontal_ratio() is None
+    assert gaze.pupil_left_coords() is None
+    assert gaze.is_center() is None
+    assert gaze.sample.distance is None
+    assert tracker_with_eyes(None, None).sample == GazeSample.empty(1.5)
+
+
+if __name__ == "__main__":
+    # Per-frame Python overhead of what camera.py/ad.py read from the tracker on every frame
+    rng = np.random.default_rng(1)
+    eye_left, eye_right = random_eyes(rng)
+    gaze = tracker_with_eyes(eye_left, eye_right)
+    runs = 100000
+
+    def legacy_frame():
+        # The old properties re-ran pupils_located (4 int() conversions) on every call
+        for _ in range(6):
+            int(eye_left.pupil.x), int(eye_left.pupil.y), int(eye_right.pupil.x), int(eye_right.pupil.y)
+        legacy_values(eye_left, eye_right)
+
+    def sample_frame():
+        GazeSample.from_eyes(eye_left, eye_right, 0.0)
+        gaze.horizontal_ratio(), gaze.vertical_ratio()
+        gaze.pupil_left_coords(), gaze.pupil_right_coords()
+        gaze.is_blinking(), gaze.sample.distance
+
+    for name, fn in (("properties", legacy_frame), ("GazeSample", sample_frame)):
+        start = time.perf_counter()
+        for _ in range(runs):
+            fn()
+        elapsed = (time.perf_counter() - start) / runs
+        print(f"{name:<11} {elapsed * 1e6:6.2f} us/frame")
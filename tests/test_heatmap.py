@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from ad_tracking.heatmap import GazeLog, IncrementalHeatmap, blend_heatmap, build_heatmap
+
+
+def legacy_heatmap(points, width, height):
+    # Full-resolution rendering show_ad used to do
+    heatmap = np.zeros((height, width), dtype=np.float32)
+    for x, y in points:
+        if 0 <= x < width and 0 <= y < height:
+            cv2.circle(heatmap, (int(x), int(y)), 50, 1, -1)
+    return cv2.GaussianBlur(heatmap, (101, 101), 0)
+
+
+def gaze_points(n, width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(width * 0.45, width * 0.15, n)
+    y = rng.normal(height * 0.45, height * 0.2, n)
+    return np.column_stack([x, y]).astype(int)
+
+
+def displayed(heatmap, width, height):
+    # What display_heatmap shows: resized to the ad and min-max normalized
+    return cv2.normalize(cv2.resize(heatmap, (width, height)), None, 0, 255, cv2.NORM_MINMAX)
+
+
+def test_heatmap_matches_full_resolution_rendering():
+    width, height = 1920, 1080
+    for n in (5, 60, 400):
+        points = gaze_points(n, width, height, seed=n)
+        log = GazeLog()
+        for x, y in points:
+            log.append(x, y)
+
+        expected = displayed(legacy_heatmap(points, width, height), width, height)
+        actual = displayed(build_heatmap(log, width, height), width, height)
+        assert np.corrcoef(expected.ravel(), actual.ravel())[0, 1] > 0.99
+        assert np.abs(expected - actual).mean() < 5
+
+
+def test_log_grows_and_keeps_points():
+    log = GazeLog(capacity=2)
+    for i in range(5000):
+        log.append(i, 2 * i, t=i / 30)
+    assert len(log) == 5000
+    assert log.points["x"][-1] == 4999 and log.points["y"][-1] == 9998
+    assert log.points["t"][30] == 1.0
+
+
+def test_log_records_the_time_into_the_ad():
+    log = GazeLog(onset=100.0)
+    log.append(1, 2, t=100.5)
+    log.append(1, 2, t=101.0, pts=0.8)  # e.g. the presentation time of a video frame
+    assert log.points["t"].tolist() == [100.5, 101.0]
+    assert np.allclose(log.points["pts"], [0.5, 0.8])
+
+
+def test_incremental_heatmap_matches_build_heatmap():
+    width, height = 1920, 1080
+    points = gaze_points(300, width, height)
+    log = GazeLog()
+    live = IncrementalHeatmap(width, height, refresh_interval=0.25)
+    for x, y in points:
+        log.append(x, y)
+        live.add(x, y)
+    assert np.array_equal(live.heatmap(), build_heatmap(log, width, height))
+
+
+def test_live_overlay_is_throttled():
+    ad_img = np.full((1080, 1920, 3), 128, np.uint8)
+    live = IncrementalHeatmap(1920, 1080, refresh_interval=0.25)
+    assert live.overlay(ad_img, 0.0) is ad_img
+
+    live.add(500, 500)
+    first = live.overlay(ad_img, 1.0)
+    assert first is not ad_img
+    live.add(600, 600)
+    assert live.overlay(ad_img, 1.1) is first
+    assert live.overlay(ad_img, 1.3) is not first
+
+
+def test_live_overlay_follows_video_frames():
+    frames = [np.full((720, 1280, 3), value, np.uint8) for value in (0, 200)]
+    live = IncrementalHeatmap(1280, 720, refresh_interval=0.25)
+    live.add(500, 500)
+
+    first = live.overlay(frames[0], 1.0)
+    second = live.overlay(frames[1], 1.01)  # a new frame before the next refresh: same heatmap, new frame under it
+    assert second is not first
+    assert np.array_equal(second, blend_heatmap(frames[1], live.heatmap(), low_res=True))
+    assert live.overlay(frames[1], 1.02) is second
+
+
+def benchmark(width, height, n=600):
+    points = gaze_points(n, width, height)
+    log = GazeLog()
+    for x, y in points:
+        log.append(x, y)
+
+    for name, fn in (("full-res circle+blur", lambda: legacy_heatmap(points, width, height)),
+                     ("point log", lambda: build_heatmap(log, width, height))):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{width}x{height} {name:<22} {elapsed * 1e3:8.1f} ms {peak / 2 ** 20:8.2f} MiB peak")
+
+
+def benchmark_live(width, height, runs=50):
+    ad_img = np.full((height, width, 3), 128, np.uint8)
+    live = IncrementalHeatmap(width, height, refresh_interval=0)
+    points = gaze_points(1000, width, height)
+
+    start = time.perf_counter()
+    for x, y in points:
+        live.add(x, y)
+    add = (time.perf_counter() - start) / len(points)
+
+    start = time.perf_counter()
+    for i in range(runs):
+        live.add(*points[i])
+        live.overlay(ad_img, float(i))
+    render = (time.perf_counter() - start) / runs
+    print(f"{width}x{height} live overlay: {add * 1e6:.1f} us/point, {render * 1e3:.1f} ms/refresh")
+
+
+if __name__ == "__main__":
+    benchmark(1920, 1080)
+    benchmark(3840, 2160)
+    benchmark_live(1920, 1080)
+    benchmark_live(3840, 2160)
@@ -0,0 +1,128 @@
+import os
+import shutil
+import sys
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from ad_tracking.heatmap import GazeLog, build_heatmap
+from ad_tracking.heatmap_store import HeatmapStore
+from ad_tracking.mapping import RATIO_DTYPE, GazeMapper
+
+
+def session(seed, n=200, width=1920, height=1080):
+    rng = np.random.default_rng(seed)
+    log = GazeLog()
+    for x, y in zip(rng.normal(width / 2, 300, n), rng.normal(height / 2, 200, n)):
+        log.append(x, y, t=len(log) / 30)
+    return log
+
+
+def test_store_merges_sessions_without_raw_samples(tmp_path):
+    store = HeatmapStore(str(tmp_path))
+    logs = [session(seed) for seed in range(3)]
+    ids = [store.add_session("data/ad1.jpg", log, 1920, 1080) for log in logs]
+
+    # A single session renders like build_heatmap
+    single = store.heatmap("data/ad1.jpg", [ids[1]])
+    assert np.allclose(single, build_heatmap(logs[1], 1920, 1080), atol=1e-5)
+
+    # The merged heatmap is the sum of the session heatmaps
+    merged = store.heatmap("data/ad1.jpg")
+    expected = sum(build_heatmap(log, 1920, 1080) for log in logs)
+    assert np.allclose(merged, expected, atol=1e-4)
+    assert np.allclose(store.heatmap("data/ad1.jpg", ids), merged, atol=1e-4)
+
+
+def test_store_keeps_raw_points_per_session(tmp_path):
+    store = HeatmapStore(str(tmp_path))
+    first = store.add_session("data/ad2.jpg", session(0, n=10), 1920, 1080)
+    second = store.add_session("data/ad2.jpg", session(1, n=25), 1280, 720)
+
+    assert [s["count"] for s in store.sessions("data/ad2.jpg")] == [10, 25]
+    assert np.array_equal(store.session_points("data/ad2.jpg", second), session(1, n=25).points)
+    assert store.heatmap("data/ad2.jpg").shape == (135, 240)
+    assert store.heatmap("data/ad3.jpg") is None
+    assert first != second
+
+
+def test_sessions_can_be_mapped_again_with_a_new_calibration(tmp_path):
+    ratios = np.zeros(50, RATIO_DTYPE)
+    ratios["t"] = ratios["pts"] = np.arange(50) / 30
+    ratios["horizontal_ratio"], ratios["vertical_ratio"], ratios["distance"] = np.linspace(0.2, 0.8, 50), 0.5, 60.0
+    store = HeatmapStore(str(tmp_path))
+    without = store.add_session("data/ad1.jpg", session(0, n=10), 1920, 1080)
+    first = store.add_session("data/ad1.jpg", session(1, n=10), 1920, 1080, ratios=ratios[:20])
+    second = store.add_session("data/ad1.jpg", session(2, n=10), 1920, 1080, ratios=ratios[20:])
+
+    assert len(store.session_ratios("data/ad1.jpg", without)) == 0
+    assert np.array_equal(store.session_ratios("data/ad1.jpg", first), ratios[:20])
+    assert np.array_equal(store.session_ratios("data/ad1.jpg", second), ratios[20:])
+
+    recalibrated = GazeMapper(np.eye(3), 60.0, 1920, 1080)
+    points = recalibrated.map_log(store.session_ratios("data/ad1.jpg", second))
+    assert len(points) == 30 and np.array_equal(points["x"], np.trunc(ratios["horizontal_ratio"][20:] * 1920))
+
+
+def test_ads_with_the_same_file_name_are_kept_apart(tmp_path):
+    for folder, value in (("a", 0), ("b", 255)):
+        os.makedirs(str(tmp_path / folder))
+        cv2.imwrite(str(tmp_path / folder / "ad1.jpg"), np.full((10, 10, 3), value, np.uint8))
+    store = HeatmapStore(str(tmp_path / "store"))
+    store.add_session(str(tmp_path / "a" / "ad1.jpg"), session(0, n=10), 1920, 1080)
+
+    assert store.sessions(str(tmp_path / "b" / "ad1.jpg")) == []
+    shutil.copy(str(tmp_path / "a" / "ad1.jpg"), str(tmp_path / "ad1.jpg"))  # the same ad, from another folder
+    assert len(store.sessions(str(tmp_path / "ad1.jpg"))) == 1
+
+
+def test_unknown_sessions_raise_key_error(tmp_path):
+    store = HeatmapStore(str(tmp_path))
+    store.add_session("data/ad1.jpg", session(0, n=10), 1920, 1080)
+    with pytest.raises(KeyError):
+        store.session_points("data/ad1.jpg", "missing")
+
+
+def test_store_recovers_from_an_interrupted_writer(tmp_path):
+    store = HeatmapStore(str(tmp_path))
+    logs = [session(seed, n=20) for seed in range(3)]
+    store.add_session("data/ad1.jpg", logs[0], 1920, 1080)
+
+    # A writer that crashed after appending its rows, and one that crashed before updating the total
+    ad_dir = os.path.join(str(tmp_path), store.ad_key("data/ad1.jpg"))
+    for name in ("points.bin", "grids.bin"):
+        with open(os.path.join(ad_dir, name), "ab") as f:
+            f.write(b"\x01" * 37)
+    store.add_session("data/ad1.jpg", logs[1], 1920, 1080)
+    index = store._load_index("data/ad1.jpg")
+    index["total_sessions"] = 1
+    store._save_index("data/ad1.jpg", index)
+
+    expected = sum(build_heatmap(log, 1920, 1080) for log in logs[:2])
+    assert np.allclose(store.heatmap("data/ad1.jpg"), expected, atol=1e-4)
+    second = store.sessions("data/ad1.jpg")[1]["id"]
+    assert np.array_equal(store.session_points("data/ad1.jpg", second), logs[1].points)
+
+    store.add_session("data/ad1.jpg", logs[2], 1920, 1080)
+    assert np.allclose(store.heatmap("data/ad1.jpg"), expected + build_heatmap(logs[2], 1920, 1080), atol=1e-4)
+
+
+def test_concurrent_writers_add_every_session(tmp_path):
+    logs = [session(seed, n=30) for seed in range(8)]
+    threads = [threading.Thread(target=HeatmapStore(str(tmp_path)).add_session, args=("data/ad1.jpg", log, 1920, 1080))
+               for log in logs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    store = HeatmapStore(str(tmp_path))
+    assert sorted(s["count"] for s in store.sessions("data/ad1.jpg")) == [30] * 8
+    expected = sum(build_heatmap(log, 1920, 1080) for log in logs)
+    assert np.allclose(store.heatmap("data/ad1.jpg"), expected, atol=1e-3)
+    for entry in store.sessions("data/ad1.jpg"):
+        assert len(store.session_points("data/ad1.jpg", entry["id"])) == 30
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from ad_tracking.mapping import GazeMapper, RATIO_DTYPE, RatioLog, ratio_array
+
+MATRIX = np.array([[1.1, 0.02, -0.05], [0.01, 1.2, -0.1], [0.001, 0.01, 1.0]])
+Sample = namedtuple("Sample", ["timestamp", "horizontal_ratio", "vertical_ratio", "distance"])
+
+
+def reference(h, v, distance, screen_width=1920, screen_height=1080, avg_distance=60.0):
+    """The original per-sample mapping with cv2.perspectiveTransform"""
+    point = cv2.perspectiveTransform(np.array([[[h, v]]], dtype=np.float32), MATRIX).reshape(2)
+    factor = avg_distance / distance
+    return int(point[0] * screen_width * factor), int(point[1] * screen_height * factor)
+
+
+def test_single_and_batched_mapping_match_perspective_transform():
+    rng = np.random.default_rng(0)
+    h, v, d = rng.uniform(0.2, 0.8, 500), rng.uniform(0.3, 0.7, 500), rng.uniform(40, 80, 500)
+    mapper = GazeMapper(MATRIX, 60.0, 1920, 1080)
+
+    expected = np.array([reference(*args) for args in zip(h, v, d)])
+    single = np.array([mapper.map(*args) for args in zip(h.tolist(), v.tolist(), d.tolist())])
+    x, y = mapper.map_arrays(h, v, d)
+
+    # float32 (OpenCV) vs float64 rounding may move a point by one pixel
+    assert np.abs(single - expected).max() <= 1
+    assert np.array_equal(np.trunc(np.stack([x, y], axis=1)), single)
+
+
+def test_missing_values():
+    mapper = GazeMapper(MATRIX, 60.0, 1920, 1080)
+    assert mapper.map(None, 0.5, 60.0) == (None, None)
+    assert mapper.map(0.5, 0.5, None) == (None, None)
+
+    samples = [Sample(0.0, 0.5, 0.5, 60.0), Sample(0.1, None, None, None), Sample(0.2, 0.5, 0.5, None)]
+    ratios = ratio_array(samples)
+    x, y = mapper.map_arrays(ratios["horizontal_ratio"], ratios["vertical_ratio"], ratios["distance"])
+    assert np.isfinite(x[0]) and np.isnan(x[1:]).all() and np.isnan(y[1:]).all()
+
+    points = mapper.map_log(ratios)
+    assert len(points) == 1 and (points["x"][0], points["y"][0]) == mapper.map_sample(samples[0])
+
+
+def test_ratio_log_records_samples_for_remapping():
+    log = RatioLog(capacity=1, onset=10.0)
+    log.append(Sample(10.5, 0.5, 0.5, 60.0))
+    log.append(Sample(10.6, None, None, None))
+    log.append(Sample(10.7, 0.4, 0.6, 55.0), pts=0.3)  # e.g. the presentation time of a video frame
+    assert len(log) == 3 and np.isnan(log.points["horizontal_ratio"][1])
+
+    mapper = GazeMapper(MATRIX, 60.0, 1920, 1080)
+    points = mapper.map_log(log.points)
+    assert np.allclose(points["pts"], [0.5, 0.3])
+    assert (points["x"][1], points["y"][1]) == mapper.map(0.4, 0.6, 55.0)
+
+
+def test_remapping_a_million_samples_is_fast():
+    ratios = np.zeros(1000000, RATIO_DTYPE)
+    ratios["horizontal_ratio"] = np.linspace(0.2, 0.8, len(ratios))
+    ratios["vertical_ratio"] = 0.5
+    ratios["distance"] = 60.0
+    mapper = GazeMapper(MATRIX, 60.0, 1920, 1080)
+
+    start = time.perf_counter()
+    points = mapper.map_log(ratios)
+    assert time.perf_counter() - start < 1.0
+    assert len(points) == len(ratios)
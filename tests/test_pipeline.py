@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+pytest.importorskip("dlib")  # gaze_tracking imports dlib at package level
+
+from gaze_tracking import GazeSample, GazeTracking, models, pipeline
+from gaze_tracking.pipeline import GazePipeline
+
+# The workers inherit the stubs below, which needs the fork start method
+pytestmark = pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+
+
+@pytest.fixture(autouse=True)
+def fork_workers(monkeypatch):
+    monkeypatch.setattr(pipeline, "START_METHOD", "fork")
+
+
+class FakeCamera(object):
+    """Returns nb_frames numbered frames, one every period seconds, then fails like an unplugged camera"""
+
+    def __init__(self, nb_frames, period=0.0):
+        self.nb_frames = nb_frames
+        self.period = period
+        self.read_count = 0
+
+    def read(self):
+        time.sleep(self.period)
+        if self.read_count >= self.nb_frames:
+            return False, None
+        self.read_count += 1
+        return True, self.read_count
+
+
+def test_start_fails_when_a_worker_dies(monkeypatch):
+    def broken_model():
+        raise RuntimeError("corrupt model file")
+
+    monkeypatch.setattr(models, "shape_predictor", broken_model)
+    monkeypatch.setattr(pipeline, "READY_TIMEOUT", 30)
+
+    gaze_pipeline = GazePipeline(FakeCamera(10), workers=2)
+    with pytest.raises(RuntimeError):
+        gaze_pipeline.start()
+    assert gaze_pipeline._processes == []
+
+
+def fake_refresh(self, frame, timestamp=None):
+    """Tags the sample with the frame number instead of tracking a face. Frame 3 breaks the tracker."""
+    if frame == 3:
+        raise ValueError("tracker failure")
+    self.sample = GazeSample.empty(timestamp)._replace(horizontal_ratio=frame)
+
+
+def collect(gaze_pipeline, count, timeout=10.0):
+    samples = []
+    deadline = time.time() + timeout
+    while len(samples) < count and time.time() < deadline:
+        samples.extend(gaze_pipeline.samples())
+        time.sleep(0.01)
+    return samples
+
+
+def test_workers_detect_faces_at_the_given_scale(monkeypatch):
+    def scale_refresh(self, frame, timestamp=None):
+        self.sample = GazeSample.empty(timestamp)._replace(horizontal_ratio=self.detection_scale)
+
+    monkeypatch.setattr(GazeTracking, "refresh", scale_refresh)
+    with GazePipeline(FakeCamera(2), workers=1, detection_scale=0.5) as gaze_pipeline:
+        samples = collect(gaze_pipeline, 2)
+    assert [s.horizontal_ratio for s in samples] == [0.5, 0.5]
+
+
+def test_a_tracker_failure_yields_an_empty_sample(monkeypatch):
+    monkeypatch.setattr(GazeTracking, "refresh", fake_refresh)
+
+    with GazePipeline(FakeCamera(6), workers=2, max_pending=100) as gaze_pipeline:
+        samples = collect(gaze_pipeline, 6)
+    assert [s.horizontal_ratio for s in samples] == [1, 2, None, 4, 5, 6]
+
+
+def slow_refresh(self, frame, timestamp=None):
+    """Like fake_refresh, with analysis times that vary from frame to frame, so results arrive out of order"""
+    time.sleep((frame * 7 % 5) * 0.004)
+    self.sample = GazeSample.empty(timestamp)._replace(horizontal_ratio=frame)
+
+
+def test_samples_come_back_in_capture_order(monkeypatch):
+    monkeypatch.setattr(GazeTracking, "refresh", slow_refresh)
+
+    with GazePipeline(FakeCamera(40), workers=3, max_pending=100) as gaze_pipeline:
+        samples = collect(gaze_pipeline, 40)
+    assert [s.horizontal_ratio for s in samples] == list(range(1, 41))
+    assert gaze_pipeline.dropped == 0
+
+
+def test_frames_are_dropped_when_the_workers_fall_behind(monkeypatch):
+    monkeypatch.setattr(GazeTracking, "refresh", slow_refresh)
+
+    with GazePipeline(FakeCamera(200, period=0.002), workers=2, max_pending=2) as gaze_pipeline:
+        samples = []
+        while gaze_pipeline.running:
+            samples.extend(gaze_pipeline.samples())
+            time.sleep(0.01)
+        samples += collect(gaze_pipeline, gaze_pipeline._sent - len(samples))
+    frames = [s.horizontal_ratio for s in samples]
+    assert gaze_pipeline.dropped > 0
+    assert len(frames) + gaze_pipeline.dropped == 200
+    assert len(frames) > 2 and frames == sorted(frames)
+
+
+def test_drain_returns_the_samples_in_flight(monkeypatch):
+    monkeypatch.setattr(GazeTracking, "refresh", slow_refresh)
+
+    gaze_pipeline = GazePipeline(FakeCamera(30), workers=2, max_pending=100)
+    gaze_pipeline.start()
+    try:
+        while gaze_pipeline.running:
+            time.sleep(0.001)
+        samples = gaze_pipeline.drain()
+    finally:
+        gaze_pipeline.stop()
+    assert [s.horizontal_ratio for s in samples] == list(range(1, 31))
@@ -0,0 +1,82 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from ad_tracking.point_sampler import PointSampler, fit_homography
+
+GRID = np.array([(x, y) for y in (0.1, 0.5, 0.9) for x in (0.1, 0.5, 0.9)], dtype=np.float32)
+MATRIX = np.array([[3.2, 0.1, -1.1], [0.05, 3.5, -1.3], [0.02, 0.05, 1.0]])
+
+
+def feed(sampler, samples):
+    """Adds samples until the sampler converges, returns how many were used"""
+    for i, (h, v) in enumerate(samples):
+        sampler.add(h, v, 60.0)
+        if sampler.converged():
+            return i + 1
+    return None
+
+
+def test_running_mean_and_std_match_numpy():
+    samples = np.random.default_rng(0).normal((0.5, 0.4), 0.02, (200, 2))
+    sampler = PointSampler(outlier_sigma=np.inf)
+    for h, v in samples:
+        sampler.add(h, v, 60.0)
+    assert np.allclose(sampler.mean, samples.mean(axis=0))
+    assert np.allclose(sampler.std, samples.std(axis=0, ddof=1))
+    assert sampler.distance == 60.0
+
+
+def test_steady_gaze_converges_sooner_than_noisy_gaze():
+    rng = np.random.default_rng(1)
+    steady = feed(PointSampler(), rng.normal((0.5, 0.4), 0.005, (300, 2)))
+    noisy = feed(PointSampler(), rng.normal((0.5, 0.4), 0.03, (300, 2)))
+    assert steady == 10  # the minimum number of samples
+    assert noisy is not None and noisy > 3 * steady
+    assert feed(PointSampler(), rng.normal((0.5, 0.4), 0.2, (100, 2))) is None
+
+
+def test_outliers_are_rejected():
+    samples = np.random.default_rng(2).normal((0.5, 0.4), 0.01, (60, 2))
+    samples[20:25] = (0.9, 0.1)  # a glance away
+    sampler = PointSampler(std_error_target=0)
+    for h, v in samples:
+        sampler.add(h, v, 60.0)
+    assert sampler.rejected == 5
+    assert np.allclose(sampler.mean, (0.5, 0.4), atol=0.005)
+
+
+def test_a_glance_away_while_seeding_is_rejected():
+    samples = np.random.default_rng(3).normal((0.5, 0.4), 0.01, (60, 2))
+    samples[:2] = (0.9, 0.1)  # still on the previous dot
+    sampler = PointSampler()
+    assert feed(sampler, samples) is not None
+    assert sampler.rejected == 2
+    assert np.allclose(sampler.mean, (0.5, 0.4), atol=0.005)
+
+
+def test_estimate_starts_over_when_the_gaze_has_moved():
+    rng = np.random.default_rng(4)
+    samples = np.concatenate([rng.normal((0.9, 0.1), 0.01, (5, 2)), rng.normal((0.5, 0.4), 0.01, (100, 2))])
+    sampler = PointSampler()
+    assert feed(sampler, samples) is not None
+    assert np.allclose(sampler.mean, (0.5, 0.4), atol=0.005)
+    assert sampler.rejected == 5
+
+
+def test_robust_fit_ignores_a_bad_point():
+    gaze = cv2.perspectiveTransform(GRID.reshape(-1, 1, 2), np.linalg.inv(MATRIX)).reshape(-1, 2)
+    gaze[4] += 0.05  # the center point was looked at badly
+
+    matrix, inliers = fit_homography(gaze, GRID)
+    assert inliers.tolist() == [True] * 4 + [False] + [True] * 4
+    assert np.allclose(matrix / matrix[2, 2], MATRIX, atol=1e-3)
+
+    # With 4 points, it is the plain fit
+    matrix, inliers = fit_homography(gaze[:4], GRID[:4])
+    assert inliers.all()
+    assert fit_homography(gaze[:3], GRID[:3]) == (None, None)
@@ -0,0 +1,75 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from ad_tracking.profiles import apply_profile, list_profiles, load_profile, make_profile, profile_path, save_profile
+
+MATRIX = np.array([[1.1, 0.02, -0.05], [0.01, 1.2, -0.1], [0.001, 0.01, 1.0]])
+
+
+class FakeCalibration(object):
+    def __init__(self, left=(), right=()):
+        self.thresholds_left = list(left)
+        self.thresholds_right = list(right)
+
+    def seed(self, left, right):
+        self.thresholds_left = list(left)
+        self.thresholds_right = list(right)
+
+
+def tracker(left=(), right=()):
+    return SimpleNamespace(calibration=FakeCalibration(left, right))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    profile = make_profile("alice", MATRIX, 62.5, tracker([40, 42], [45, 47]))
+    save_profile(profile, str(tmp_path))
+
+    loaded = load_profile("alice", str(tmp_path))
+    assert loaded.name == "alice"
+    assert np.allclose(loaded.transformation_matrix, MATRIX)
+    assert loaded.avg_distance == 62.5
+    assert loaded.thresholds_left == [40, 42] and loaded.thresholds_right == [45, 47]
+    assert load_profile("bob", str(tmp_path)) is None
+
+
+def test_names_are_sanitized_and_listed_newest_first(tmp_path):
+    old = make_profile("old viewer/1", MATRIX, 60.0, tracker())
+    new = make_profile("new", MATRIX, 60.0, tracker())
+    save_profile(new._replace(created=old.created + 10), str(tmp_path))
+    save_profile(old, str(tmp_path))
+
+    assert os.path.dirname(profile_path("old viewer/1", str(tmp_path))) == str(tmp_path)
+    assert list_profiles(str(tmp_path)) == ["new", "old viewer/1"]
+    assert list_profiles(str(tmp_path / "missing")) == []
+
+
+def test_apply_profile_seeds_the_pupil_thresholds():
+    profile = make_profile("alice", MATRIX, 60.0, tracker([40], [45]))
+    gaze_tracking = apply_profile(profile, tracker())
+    assert gaze_tracking.calibration.thresholds_left == [40]
+    assert gaze_tracking.calibration.thresholds_right == [45]
+
+    # A profile without thresholds leaves the tracker learning them
+    gaze_tracking = apply_profile(make_profile("bob", MATRIX, 60.0, tracker()), tracker([1], [2]))
+    assert gaze_tracking.calibration.thresholds_left == [1]
+
+
+def test_unreadable_profiles_are_skipped(tmp_path):
+    save_profile(make_profile("alice", MATRIX, 60.0, tracker()), str(tmp_path))
+    (tmp_path / "truncated.npz").write_bytes(b"PK\x03\x04 not a profile")
+    np.savez(str(tmp_path / "other.npz"), something=np.zeros(3))
+
+    assert list_profiles(str(tmp_path)) == ["alice"]
+
+
+def test_oldest_profiles_are_pruned(tmp_path):
+    for i in range(5):
+        profile = make_profile("viewer{}".format(i), MATRIX, 60.0, tracker())
+        save_profile(profile._replace(created=1000.0 + i), str(tmp_path), max_profiles=3)
+    assert list_profiles(str(tmp_path)) == ["viewer4", "viewer3", "viewer2"]
+    assert not os.path.exists(profile_path("viewer0", str(tmp_path)))
@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from ad_tracking.heatmap import GazeLog, blend_heatmap, build_heatmap
+from ad_tracking.heatmap_store import HeatmapStore
+from render_heatmaps import plan_jobs, render_job
+
+
+def test_render_job_matches_display_blend(tmp_path):
+    ad = np.random.default_rng(0).integers(0, 256, (300, 400, 3), dtype=np.uint8)
+    cv2.imwrite(str(tmp_path / "ad.png"), ad)
+    log = GazeLog()
+    for i in range(50):
+        log.append(400 + i * 10, 300 + i * 5, i / 30)
+    log.save(str(tmp_path / "log.npy"))
+
+    options = {"store": None, "density": False, "fixations": False, "alpha": 0.5}
+    out_path = str(tmp_path / "out.png")
+    assert render_job((str(tmp_path / "ad.png"), str(tmp_path / "log.npy"), None, (1280, 720), options, out_path)) == (out_path, None)
+
+    expected = blend_heatmap(ad, build_heatmap(log, 1280, 720))
+    assert np.array_equal(cv2.imread(out_path), expected)
+
+
+def test_render_job_reports_unreadable_ads(tmp_path):
+    options = {"store": None, "density": False, "fixations": False, "alpha": 0.5}
+    out_path, error = render_job((str(tmp_path / "missing.jpg"), None, None, (1280, 720), options, str(tmp_path / "out.png")))
+    assert error and not os.path.exists(out_path)
+
+
+def test_render_job_uses_the_first_frame_of_stored_video_ads(tmp_path):
+    ad_path = str(tmp_path / "ad.avi")
+    writer = cv2.VideoWriter(ad_path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (160, 120))
+    if not writer.isOpened():
+        pytest.skip("no video encoder available")
+    for i in range(10):
+        writer.write(np.full((120, 160, 3), 50 + i * 10, np.uint8))
+    writer.release()
+
+    log = GazeLog()
+    for i in range(50):
+        log.append(600 + i * 5, 300, i / 30)
+    store = HeatmapStore(str(tmp_path / "store"))
+    store.add_session(ad_path, log, 1280, 720)
+
+    options = {"store": str(tmp_path / "store"), "density": False, "fixations": False, "alpha": 0.5}
+    out_path = str(tmp_path / "out.png")
+    assert render_job((ad_path, None, None, (1280, 720), options, out_path)) == (out_path, None)
+    assert cv2.imread(out_path).shape == (120, 160, 3)
+
+
+def test_plan_jobs_renders_every_stored_session(tmp_path):
+    cv2.imwrite(str(tmp_path / "ad1.jpg"), np.zeros((300, 400, 3), np.uint8))
+    store = HeatmapStore(str(tmp_path / "store"))
+    log = GazeLog()
+    for i in range(50):
+        log.append(600 + i * 5, 300, i / 30)
+    store.add_session(str(tmp_path / "ad1.jpg"), log, 1280, 720, session_id="viewer1")
+    store.add_session(str(tmp_path / "ad1.jpg"), log, 1920, 1080, session_id="viewer2")
+
+    args = argparse.Namespace(store_dir=str(tmp_path / "store"), density=False, fixations=True, alpha=0.5,
+                              store=False, sessions=True, ads=str(tmp_path), screen=(1280, 720), pairs=[],
+                              out=str(tmp_path / "out"))
+    jobs = plan_jobs(args)
+    assert [(job[2], job[3]) for job in jobs] == [("viewer1", (1280, 720)), ("viewer2", (1920, 1080))]
+
+    os.makedirs(args.out)
+    out_path, error = render_job(jobs[0])
+    assert error is None and out_path.endswith("ad1_viewer1_heatmap.png") and os.path.exists(out_path)
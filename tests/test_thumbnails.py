@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from ad_tracking.thumbnails import ThumbnailCache, decode_reduced, jpeg_size
+
+
+def write_ad(path, width, height, seed=0):
+    img = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    cv2.imwrite(str(path), img)
+
+
+def test_decode_reduced_picks_smallest_sufficient_factor(tmp_path):
+    write_ad(tmp_path / "big.jpg", 2488, 1400)
+    write_ad(tmp_path / "small.jpg", 1024, 646)
+    write_ad(tmp_path / "tiny.jpg", 320, 240)
+    write_ad(tmp_path / "other.png", 1024, 646)
+
+    assert jpeg_size(str(tmp_path / "big.jpg")) == (2488, 1400)
+    assert jpeg_size(str(tmp_path / "other.png")) is None
+
+    assert decode_reduced(str(tmp_path / "big.jpg")).shape[:2] == (350, 622)     # 1/4
+    assert decode_reduced(str(tmp_path / "small.jpg")).shape[:2] == (323, 512)   # 1/2
+    assert decode_reduced(str(tmp_path / "tiny.jpg")).shape[:2] == (240, 320)    # full size
+    assert decode_reduced(str(tmp_path / "other.png")).shape[:2] == (646, 1024)  # not a JPEG
+
+
+def test_thumbnails_are_cached_by_path_and_mtime(tmp_path):
+    ad = tmp_path / "ad1.jpg"
+    write_ad(ad, 1200, 675)
+    cache = ThumbnailCache(str(tmp_path / "cache"))
+
+    first = cache.load(str(ad))
+    assert first.shape == (200, 300, 3)
+    assert os.path.exists(cache.cache_path(str(ad)))
+
+    # Changing the image invalidates its cached thumbnail
+    old_path = cache.cache_path(str(ad))
+    write_ad(ad, 1200, 675, seed=1)
+    os.utime(ad, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+    assert cache.cache_path(str(ad)) != old_path
+
+
+def wait_loaded(cache, paths):
+    deadline = time.time() + 5
+    while any(cache.get(p) is None for p in paths) and time.time() < deadline:
+        time.sleep(0.01)
+    return all(cache.get(p) is not None for p in paths)
+
+
+def test_requested_thumbnails_load_in_background(tmp_path):
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / "ad{}.jpg".format(i)))
+        write_ad(paths[-1], 800, 600, seed=i)
+    cache = ThumbnailCache(str(tmp_path / "cache"))
+
+    cache.request(paths[:2])
+    assert wait_loaded(cache, paths[:2])
+    assert cache.get(paths[2]) is None
+
+    # A new page drops the previous thumbnails from memory
+    cache.request(paths[2:])
+    assert cache.get(paths[0]) is None
+    assert wait_loaded(cache, paths[2:])
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip("screeninfo")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from utils import ui_utils
+
+
+def test_screen_redraws_only_when_invalidated(monkeypatch):
+    shown = []
+    monkeypatch.setattr(ui_utils.cv2, "imshow", lambda name, canvas: shown.append(canvas.copy()))
+    monkeypatch.setattr(ui_utils.cv2, "waitKey", lambda timeout: -1)
+    draws = []
+
+    def draw(canvas):
+        draws.append(len(draws))
+        canvas[0, 0] = len(draws)
+
+    screen = ui_utils.Screen(40, 30, draw, background=(20, 20, 20))
+    for _ in range(5):
+        screen.wait_key()
+    assert len(draws) == len(shown) == 1
+
+    screen.invalidate()
+    screen.wait_key()
+    screen.wait_key()
+    assert len(draws) == len(shown) == 2
+    assert shown[1][0, 0].tolist() == [2, 2, 2]
+    assert np.all(shown[1][1:] == 20)
+
+
+def test_ask_text_reads_a_name(monkeypatch):
+    keys = iter([-1, ord("b"), ord("o"), ord("x"), 8, ord("b"), -1, 13])
+    monkeypatch.setattr(ui_utils.cv2, "imshow", lambda name, canvas: None)
+    monkeypatch.setattr(ui_utils.cv2, "waitKey", lambda timeout: next(keys))
+    monkeypatch.setattr(ui_utils, "init_fullscreen_window", lambda: None)
+    notes = []
+
+    assert ui_utils.ask_text(800, 600, ["Your name"], note=lambda text: notes.append(text) or "") == "bob"
+    assert notes == ["", "b", "bo", "box", "bo", "bob"]  # redrawn once per change
+
+    keys = iter([ord("a"), 27])
+    assert ui_utils.ask_text(800, 600, ["Your name"]) is None
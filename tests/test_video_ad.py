@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from ad_tracking.heatmap import GazeLog, build_heatmap
+from ad_tracking.video_ad import PresentationClock, VideoAdReader, segment_heatmaps
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "ad.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (160, 120))
+    if not writer.isOpened():
+        pytest.skip("no video encoder available")
+    for i in range(50):
+        writer.write(np.full((120, 160, 3), i * 5, np.uint8))
+    writer.release()
+    return path
+
+
+def test_reader_decodes_ahead_into_a_bounded_queue(video):
+    reader = VideoAdReader(video, 320, 240, queue_size=4).start()
+    try:
+        time.sleep(0.2)
+        assert reader._frames.qsize() == 4
+
+        pts, frame = reader.read()
+        assert pts == 0 and frame.shape == (240, 320, 3)
+
+        # Frames that are already late are skipped, only the last due one is returned
+        time.sleep(0.1)
+        assert reader.next_due(0.1)[0] == pytest.approx(0.08)
+        assert reader.next_due(0.1) is None
+    finally:
+        reader.stop()
+
+
+def test_clock_tags_samples_with_the_frame_on_screen():
+    clock = PresentationClock()
+    assert clock.pts_at(10.0) is None
+    for i in range(5):
+        clock.shown(100.0 + i * 0.04, i / 25)
+    assert clock.pts_at(100.05) == pytest.approx(0.04)
+    assert clock.pts_at(200.0) == pytest.approx(0.16)
+    assert clock.pts_at(99.0) is None
+
+
+def test_segment_heatmaps_split_the_session_heatmap():
+    log = GazeLog(onset=1000.0)  # capture timestamps t are wall-clock times, segments follow the time into the ad
+    rng = np.random.default_rng(0)
+    for t in np.arange(0, 6, 1 / 30):
+        log.append(rng.uniform(0, 1280), rng.uniform(0, 720), 1000.0 + t)
+
+    segments = list(segment_heatmaps(log, 1280, 720, segment_seconds=2.0, density=True))
+    assert [(start, end) for start, end, _ in segments] == [(0, 2), (2, 4), (4, 6)]
+    total = sum(heatmap for _, _, heatmap in segments)
+    assert np.allclose(total, build_heatmap(log, 1280, 720, density=True), atol=1e-3)